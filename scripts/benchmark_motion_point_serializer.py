@@ -0,0 +1,59 @@
+#! /usr/bin/env python
+from __future__ import print_function
+import timeit
+import numpy as np
+import rospy
+
+from io import BytesIO
+
+from iarc7_msgs.msg import MotionPointStamped
+
+from iarc7_motion.linear_motion_profile_generator import LinearMotionProfileGenerator
+from iarc7_motion.motion_point_serializer import MotionPointArraySerializer
+
+# Compares the packed motion point serializer against the generated genpy
+# serializer, first for byte equality and then for speed
+def benchmark_motion_point_serializer():
+    generator = LinearMotionProfileGenerator(MotionPointStamped(),
+                                             1.0,
+                                             3.0,
+                                             2.0,
+                                             0.02)
+    serializer = MotionPointArraySerializer()
+
+    for size in [1, 2, 10, 101, 1000]:
+        times = rospy.get_time() + 0.02 * np.arange(size)
+        positions = np.random.randn(size, 3)
+        velocities = np.random.randn(size, 3)
+        accelerations = np.random.randn(size, 3)
+
+        def genpy_serialize():
+            message = generator.get_plan_message(times,
+                                                 positions,
+                                                 velocities,
+                                                 accelerations)
+            buff = BytesIO()
+            message.serialize(buff)
+            return buff.getvalue()
+
+        def packed_serialize():
+            return serializer.serialize(times,
+                                        positions,
+                                        velocities,
+                                        accelerations)
+
+        assert genpy_serialize() == packed_serialize(), \
+            'Serialized motion points differ for {} points'.format(size)
+
+        number = 200
+        genpy_time = timeit.timeit(genpy_serialize, number=number) / number
+        packed_time = timeit.timeit(packed_serialize, number=number) / number
+        print('{:5d} points: genpy {:9.1f} us, packed {:9.1f} us, {:6.1f}x'
+              .format(size,
+                      genpy_time * 1e6,
+                      packed_time * 1e6,
+                      genpy_time / packed_time))
+
+if __name__ == '__main__':
+    rospy.init_node('benchmark_motion_point_serializer')
+    benchmark_motion_point_serializer()
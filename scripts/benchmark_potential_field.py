@@ -0,0 +1,81 @@
+#! /usr/bin/env python
+from __future__ import print_function
+import timeit
+import numpy as np
+
+from iarc7_motion.iarc_tasks.task_utilities.potential_field import apply_potential_field
+
+_AVOID_DISTANCE = 1.5
+_PREDICT_TIME = 0.5
+_RESPONSE_STRENGTH = 2.0
+_SIDE_STRENGTH = 0.5
+
+# The per obstacle loop that the obstacle avoiders used before the field was
+# vectorized
+def _reference_potential_field(obstacles, curr_vel, desired_vector):
+    curr_vel = np.array(curr_vel)
+    desired_vector = np.array(desired_vector)
+    for obstacle in obstacles:
+        unit_vector = obstacle / np.linalg.norm(obstacle)
+        away_unit_vector = -unit_vector
+
+        turn_dir = np.array([0, 0, np.cross(obstacle, curr_vel)])
+        if np.linalg.norm(turn_dir) < 1e-6:
+            turn_dir = np.array([0, 0, 1])
+
+        side_vector = np.cross(turn_dir, obstacle)
+        unit_side = side_vector / np.linalg.norm(side_vector)
+
+        rel_vel = np.dot(unit_vector, curr_vel)
+        violation = max(0,
+                        _AVOID_DISTANCE
+                      - np.linalg.norm(obstacle)
+                      + rel_vel * _PREDICT_TIME)
+
+        # Push away
+        desired_vector[:2] += away_unit_vector \
+                * _RESPONSE_STRENGTH * violation**2
+
+        # Push around
+        desired_vector += unit_side * violation * _SIDE_STRENGTH
+    return desired_vector
+
+def _vectorized_potential_field(obstacles, curr_vel, desired_vector):
+    return apply_potential_field(obstacles,
+                                 curr_vel,
+                                 desired_vector,
+                                 _AVOID_DISTANCE,
+                                 _PREDICT_TIME,
+                                 _RESPONSE_STRENGTH,
+                                 _SIDE_STRENGTH)
+
+# Times the vectorized potential field against the per obstacle loop,
+# test/test_potential_field.py checks that they agree
+def benchmark_potential_field():
+    random = np.random.RandomState(0)
+
+    for count in [4, 40, 400]:
+        obstacles = random.uniform(-3.0, 3.0, (count, 2))
+        curr_vel = random.uniform(-2.0, 2.0, 2)
+        desired_vector = random.uniform(-1.0, 1.0, 3)
+
+        number = 2000 if count < 400 else 200
+        loop_time = timeit.timeit(
+            lambda: _reference_potential_field(obstacles,
+                                               curr_vel,
+                                               desired_vector),
+            number=number) / number
+        vectorized_time = timeit.timeit(
+            lambda: _vectorized_potential_field(obstacles,
+                                                curr_vel,
+                                                desired_vector),
+            number=number) / number
+
+        print('{:4d} obstacles: loop {:9.1f} us, vectorized {:7.1f} us, {:5.1f}x'.format(
+            count,
+            loop_time * 1e6,
+            vectorized_time * 1e6,
+            loop_time / vectorized_time))
+
+if __name__ == '__main__':
+    benchmark_potential_field()
@@ -0,0 +1,284 @@
+#!/usr/bin/env python
+
+import collections
+import ctypes
+import errno
+import fcntl
+import os
+import select
+import time
+
+import rospy
+
+from diagnostic_msgs.msg import DiagnosticArray, DiagnosticStatus, KeyValue
+
+_OVERRUN_POLICIES = ('skip', 'catch_up', 'degrade')
+
+# Longest time to block waiting for a wakeup before checking the clock and
+# shutdown again
+_MAX_WAIT = 0.1
+
+
+# Get a monotonic wall clock time in seconds
+#
+# Python 2 has no time.monotonic, so fall back to calling clock_gettime
+# through ctypes
+if hasattr(time, 'monotonic'):
+    monotonic_time = time.monotonic
+else:
+    class _Timespec(ctypes.Structure):
+        _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+    _CLOCK_MONOTONIC = 1
+    _librt = ctypes.CDLL('librt.so.1', use_errno=True)
+    _clock_gettime = _librt.clock_gettime
+    _clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(_Timespec)]
+
+    def monotonic_time():
+        timespec = _Timespec()
+        if _clock_gettime(_CLOCK_MONOTONIC, ctypes.pointer(timespec)) != 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        return timespec.tv_sec + timespec.tv_nsec * 1e-9
+
+
+# Paces a control loop at a fixed rate and keeps track of how well it is
+# keeping up
+#
+# Call start once before the loop and sleep at the end of every iteration.
+# Every iteration has a deadline at the start of the next period. For each
+# iteration the scheduler records the start jitter (how late the iteration
+# started compared to its scheduled start), the execution time and whether
+# the deadline was missed. Rolling statistics over the last window_size
+# iterations are published on /diagnostics every diagnostics_period seconds.
+#
+# When an iteration overruns its deadline the overrun policy decides when the
+# next one starts:
+#   skip: start at the next period boundary that has not passed yet, the
+#         periods that were missed are dropped
+#   catch_up: keep the original schedule and run the late iterations back to
+#             back until the loop is on time again
+#   degrade: drop to degraded_rate until recovery_iterations iterations in a
+#            row fit in the nominal period
+#
+# Uses a monotonic clock, or ROS time when use_sim_time is set so that the
+# loop follows the simulated clock.
+#
+# Other threads can call wake to start the next iteration right away instead
+# of waiting for the next period, for example when a new goal arrives. The
+# fixed rate stays as a floor, a wakeup only adds an iteration and does not
+# move the schedule. Iterations never start less than min_wakeup_interval
+# seconds apart because of wakeups.
+#
+# Waiting is done with select on a pipe, since Condition.wait with a timeout
+# polls on Python 2 and would add latency to every wakeup.
+class ControlLoopScheduler(object):
+    def __init__(self,
+                 name,
+                 rate,
+                 overrun_policy,
+                 window_size,
+                 diagnostics_period,
+                 degraded_rate,
+                 recovery_iterations,
+                 min_wakeup_interval):
+        if overrun_policy not in _OVERRUN_POLICIES:
+            raise ValueError('Unknown control loop overrun policy: {}'.format(
+                overrun_policy))
+
+        self._name = name
+        self._period = 1.0 / rate
+        self._degraded_period = 1.0 / degraded_rate
+        self._overrun_policy = overrun_policy
+        self._diagnostics_period = diagnostics_period
+        self._recovery_iterations = recovery_iterations
+        self._min_wakeup_interval = min_wakeup_interval
+
+        if rospy.get_param('/use_sim_time', False):
+            self._now = rospy.get_time
+        else:
+            self._now = monotonic_time
+
+        self._wakeup_read, self._wakeup_write = os.pipe()
+        fcntl.fcntl(self._wakeup_write, fcntl.F_SETFL, os.O_NONBLOCK)
+
+        self._current_period = self._period
+        self._on_time_iterations = 0
+
+        self._iteration_start = None
+        self._deadline = None
+
+        self._jitters = collections.deque(maxlen=window_size)
+        self._execution_times = collections.deque(maxlen=window_size)
+        self._misses = collections.deque(maxlen=window_size)
+
+        self._iterations = 0
+        self._total_misses = 0
+        self._total_skipped = 0
+        self._total_wakeups = 0
+
+        self._last_diagnostics_time = None
+        self._diagnostics_sources = []
+
+        self._diagnostics_pub = rospy.Publisher('/diagnostics',
+                                                DiagnosticArray,
+                                                queue_size=1)
+
+    # Mark the start of the first iteration
+    def start(self):
+        self._iteration_start = self._now()
+        self._deadline = self._iteration_start + self._current_period
+        self._last_diagnostics_time = self._iteration_start
+        self._jitters.append(0.0)
+
+    # Start the next iteration as soon as possible, safe to call from any
+    # thread
+    def wake(self):
+        try:
+            os.write(self._wakeup_write, b'w')
+        except OSError as e:
+            # The pipe is full so a wakeup is already pending
+            if e.errno != errno.EAGAIN:
+                raise
+
+    # End the current iteration and sleep until the next one should start
+    # or until a wakeup
+    #
+    # Raises rospy.ROSInterruptException if ROS shuts down while sleeping
+    def sleep(self):
+        end = self._now()
+        execution_time = end - self._iteration_start
+        missed = end > self._deadline
+
+        self._iterations += 1
+        self._execution_times.append(execution_time)
+        self._misses.append(missed)
+        if missed:
+            self._total_misses += 1
+
+        next_start = self._get_next_start(end, execution_time, missed)
+
+        if end - self._last_diagnostics_time >= self._diagnostics_period:
+            self._last_diagnostics_time = end
+            self._publish_diagnostics()
+
+        woken = self._wait_until(next_start,
+                                 self._iteration_start + self._min_wakeup_interval)
+
+        if rospy.is_shutdown():
+            raise rospy.ROSInterruptException('ROS shutdown request')
+
+        self._iteration_start = self._now()
+        if woken:
+            # The scheduled iteration is still pending, so it is the
+            # deadline for this one
+            self._total_wakeups += 1
+            self._deadline = next_start
+        else:
+            self._jitters.append(max(self._iteration_start - next_start, 0.0))
+
+    # Add a function that returns a list of extra DiagnosticStatus messages
+    # to publish along with the control loop statistics
+    def add_diagnostics_source(self, source):
+        self._diagnostics_sources.append(source)
+
+    # Get the number of iterations run, deadlines missed, periods skipped and
+    # iterations started early by a wakeup
+    def get_counts(self):
+        return (self._iterations,
+                self._total_misses,
+                self._total_skipped,
+                self._total_wakeups)
+
+    # Wait until next_start or until a wakeup after earliest_wakeup
+    #
+    # Returns True if the wait ended because of a wakeup
+    def _wait_until(self, next_start, earliest_wakeup):
+        woken = False
+        while not rospy.is_shutdown():
+            now = self._now()
+            if now >= next_start:
+                return False
+            if woken and now >= earliest_wakeup:
+                return True
+
+            timeout = next_start - now
+            if woken:
+                timeout = earliest_wakeup - now
+            readable, _, _ = select.select([self._wakeup_read],
+                                           [],
+                                           [],
+                                           min(timeout, _MAX_WAIT))
+            if readable:
+                os.read(self._wakeup_read, 4096)
+                woken = True
+        return False
+
+    # Find the scheduled start of the next iteration and set its deadline
+    def _get_next_start(self, end, execution_time, missed):
+        next_start = self._deadline
+
+        if self._overrun_policy == 'skip':
+            if missed:
+                skipped = int((end - next_start) // self._current_period) + 1
+                self._total_skipped += skipped
+                next_start += skipped * self._current_period
+        elif self._overrun_policy == 'degrade':
+            if missed:
+                self._current_period = self._degraded_period
+                self._on_time_iterations = 0
+                next_start = end
+            elif self._current_period != self._period:
+                if execution_time <= self._period:
+                    self._on_time_iterations += 1
+                else:
+                    self._on_time_iterations = 0
+                if self._on_time_iterations >= self._recovery_iterations:
+                    self._current_period = self._period
+
+        self._deadline = next_start + self._current_period
+        return next_start
+
+    def _publish_diagnostics(self):
+        status = DiagnosticStatus()
+        status.name = self._name
+        status.hardware_id = 'none'
+
+        window_misses = sum(self._misses)
+        if window_misses == 0:
+            status.level = DiagnosticStatus.OK
+            status.message = 'Control loop on time'
+        else:
+            status.level = DiagnosticStatus.WARN
+            status.message = '{} of the last {} deadlines missed'.format(
+                window_misses, len(self._misses))
+
+        values = [
+            ('policy', self._overrun_policy),
+            ('nominal rate', 1.0 / self._period),
+            ('current rate', 1.0 / self._current_period),
+            ('iterations', self._iterations),
+            ('missed deadlines', self._total_misses),
+            ('skipped periods', self._total_skipped),
+            ('wakeups', self._total_wakeups),
+            ('window missed deadlines', window_misses),
+            ('mean execution time', _mean(self._execution_times)),
+            ('max execution time', _max(self._execution_times)),
+            ('mean start jitter', _mean(self._jitters)),
+            ('max start jitter', _max(self._jitters))]
+        status.values = [KeyValue(key, str(value)) for key, value in values]
+
+        diagnostics = DiagnosticArray()
+        diagnostics.header.stamp = rospy.Time.now()
+        diagnostics.status = [status]
+        for source in self._diagnostics_sources:
+            diagnostics.status.extend(source())
+        self._diagnostics_pub.publish(diagnostics)
+
+
+def _mean(values):
+    return sum(values) / len(values) if values else 0.0
+
+
+def _max(values):
+    return max(values) if values else 0.0
@@ -1,10 +1,10 @@
 #!/usr/bin/env python
 
-import threading
 import rospy
 import actionlib
 
 from iarc7_motion.msg import QuadMoveAction, QuadMoveResult
+from iarc7_motion.instrumented_lock import InstrumentedLock
 
 from iarc_tasks.takeoff_task import TakeoffTask
 from iarc_tasks.land_task import LandTask
@@ -19,6 +19,7 @@ from iarc_tasks.height_recovery_task import HeightRecoveryTask
 from iarc_tasks.velocity_task import VelocityTask
 from iarc_tasks.joystick_velocity_task import JoystickVelocityTask
 from iarc_tasks.go_to_roomba_task import GoToRoombaTask
+from iarc_tasks.path_task import PathTask
 
 class IarcTaskActionServer(object):
     def __init__(self):
@@ -34,7 +35,9 @@ class IarcTaskActionServer(object):
         self._current_task = None
         self._current_goal = None
         self._cancel_requested = False
-        self._lock = threading.RLock()
+        self._current_goal_time = None
+        self._wakeup_callback = None
+        self._lock = InstrumentedLock('task action server')
         # Start action server last to avoid race condition
         self._action_server.start()
 
@@ -50,42 +53,58 @@ class IarcTaskActionServer(object):
                            'test_task': TestTask,
                            'test_planner': TestPlannerTask,
                            'joystick_velocity_task': JoystickVelocityTask,
-                           'go_to_roomba': GoToRoombaTask}
+                           'go_to_roomba': GoToRoombaTask,
+                           'path': PathTask}
 
-    # Private method
-    def _new_goal(self, goal):
-        with self._lock:
-            rospy.logdebug("_new_goal: %s", goal.get_goal_id().id)
-
-            task_request = goal.get_goal()
+    # Set a function to call when a new goal or cancel request arrives
+    def set_wakeup_callback(self, callback):
+        self._wakeup_callback = callback
 
-            try:
-                new_task_type = self._task_dict[task_request.movement_type]
-            except KeyError as e:
-                rospy.logerr("Goal has invalid movement_type: %s", task_request.movement_type)
-                goal.set_rejected()
-                return
+    # Private method
+    def _wakeup(self):
+        if self._wakeup_callback is not None:
+            self._wakeup_callback()
 
-            try:
-                new_task = new_task_type(task_request)
-            except Exception as e:
-                rospy.logerr("Could not construct task: %s", task_request.movement_type)
-                rospy.logerr(str(e))
-                goal.set_rejected()
-                return
+    # Private method
+    def _new_goal(self, goal):
+        receive_time = rospy.Time.now()
+        rospy.logdebug("_new_goal: %s", goal.get_goal_id().id)
+
+        task_request = goal.get_goal()
+
+        try:
+            new_task_type = self._task_dict[task_request.movement_type]
+        except KeyError as e:
+            rospy.logerr("Goal has invalid movement_type: %s", task_request.movement_type)
+            goal.set_rejected()
+            return
+
+        # Tasks are constructed outside of the lock, constructing one can
+        # take a while and the task queue is not touched until it is done
+        try:
+            new_task = new_task_type(task_request)
+        except Exception as e:
+            rospy.logerr("Could not construct task: %s", task_request.movement_type)
+            rospy.logerr(str(e))
+            goal.set_rejected()
+            return
 
+        with self._lock:
             # Support simple queue destroying preempting for now
             if task_request.preempt :
                 if len(self._goal_tasks) > 0:
-                    for x, _ in  self._goal_tasks:
+                    for x, task, _ in  self._goal_tasks:
                         x.set_cancel_requested()
                         x.set_canceled()
+                        task.shutdown()
                     self._goal_tasks = []
                 if self._current_goal:
                     self._cancel_requested = True
                     self._current_goal.set_cancel_requested()
 
-            self._goal_tasks.append((goal, new_task))
+            self._goal_tasks.append((goal, new_task, receive_time))
+
+        self._wakeup()
 
     # Private method
     def _cancel_request(self, cancel):
@@ -96,6 +115,7 @@ class IarcTaskActionServer(object):
                 rospy.logdebug("Cancel requested on current goal")
                 self._current_goal.set_cancel_requested()
                 self._cancel_requested = True
+                self._wakeup()
                 return
 
             length = len(self._goal_tasks)
@@ -112,6 +132,7 @@ class IarcTaskActionServer(object):
         if goal == cancel:
             goal.set_cancel_requested()
             goal.set_canceled()
+            goal_task[1].shutdown()
             return True
         return False
 
@@ -163,7 +184,9 @@ class IarcTaskActionServer(object):
             if len(self._goal_tasks) == 0:
                 return None
 
-            self._current_goal, self._current_task = self._goal_tasks.pop(0)
+            (self._current_goal,
+             self._current_task,
+             self._current_goal_time) = self._goal_tasks.pop(0)
             self._cancel_requested = False
 
             rospy.logdebug("New task accepted")
@@ -171,6 +194,12 @@ class IarcTaskActionServer(object):
 
             return self._current_task
 
+    # Time that the goal for the last task returned by get_new_task
+    # was received
+    def get_current_goal_time(self):
+        with self._lock:
+            return self._current_goal_time
+
     def has_new_task(self):
         with self._lock:
             return (len(self._goal_tasks) > 0)
@@ -12,20 +12,21 @@ from task_utilities.task_topic_buffer import TaskTopicBuffer
 
 class AbstractTask(object):
 
-    topic_buffer = None
-
     def __init__(self):
-        if AbstractTask.topic_buffer is None:
-            AbstractTask.topic_buffer = TaskTopicBuffer()
-        self.topic_buffer = AbstractTask.topic_buffer
+        self.topic_buffer = TaskTopicBuffer.get_task_topic_buffer()
 
     # Abstract method
-    def get_desired_command(self):
+    def get_desired_command(self, world_state):
         '''
         This is the "main" function of a task. This method is called 
         to get the next command desired by the task that the rest of 
         the stack is to implement/act upon. 
 
+        Args:
+            world_state: WorldState snapshot for this tick, tasks should
+                read odometry, roombas, obstacles, landing status and the
+                current time from it instead of the topic buffer
+
         Returns: 
             TaskState: instance of whatever state the task is in
             Task Command: desired command of the task
@@ -51,3 +52,13 @@ class AbstractTask(object):
 
         '''
         raise NotImplementedError("Subclass must implement abstract method")
+
+    def shutdown(self):
+        '''
+        Releases anything the task registered with shared resources, such
+        as odometry listeners. Called once when the task will not be run
+        anymore, whether it ran to completion, was canceled or never
+        started. The default does nothing.
+
+        '''
+        pass
@@ -2,14 +2,11 @@
 
 import math
 import rospy
-import tf2_ros
-import tf2_geometry_msgs
 import threading
 import numpy as np
 
 from geometry_msgs.msg import TwistStamped
 from geometry_msgs.msg import Point
-from geometry_msgs.msg import PointStamped
 from geometry_msgs.msg import Vector3Stamped
 from geometry_msgs.msg import Vector3
 
@@ -40,7 +37,8 @@ class BlockRoombaTask(AbstractTask):
             raise ValueError('An invalid roomba id was provided to BlockRoombaTask')
 
         self._roomba_odometry = None
-        self._roomba_point = None
+        self._roomba_offset = None
+        self._distance_to_roomba = None
         self._limiter = AccelerationLimiter()
 
         self._canceled = False
@@ -51,10 +49,10 @@ class BlockRoombaTask(AbstractTask):
         self._lock = threading.RLock()
 
         try:
-            self._TRANSFORM_TIMEOUT = rospy.get_param('~transform_timeout')
             self._MIN_MANEUVER_HEIGHT = rospy.get_param('~min_maneuver_height')
             self._MAX_TRANSLATION_SPEED = rospy.get_param('~max_translation_speed')
             self._MAX_START_TASK_DIST = rospy.get_param('~block_roomba_max_start_dist')
+            self._MAX_PREDICTION_TIME = rospy.get_param('~roomba_max_prediction_time')
             self._MAX_Z_VELOCITY = rospy.get_param('~max_z_velocity')
             self._K_X = rospy.get_param('~k_term_tracking_x')
             self._K_Y = rospy.get_param('~k_term_tracking_y')
@@ -67,76 +65,73 @@ class BlockRoombaTask(AbstractTask):
         self._overshoot = (_roomba_diameter + _drone_width)/2
         self._state = BlockRoombaTaskState.init
 
-    def get_desired_command(self):
+    def get_desired_command(self, world_state):
         with self._lock:
             if self._canceled:
                 return (TaskCanceled(),)
 
             if (self._state == BlockRoombaTaskState.init):
-                if (not self.topic_buffer.has_roomba_message()
-                 or not self.topic_buffer.has_odometry_message()
-                 or not self.topic_buffer.has_landing_message()):
+                if (not world_state.has_roomba_message()
+                 or not world_state.has_odometry_message()
+                 or not world_state.has_landing_message()):
                     self._state = BlockRoombaTaskState.waiting
                 else:
                     self._state = BlockRoombaTaskState.descent
 
             if (self._state == BlockRoombaTaskState.waiting):
-                if (not self.topic_buffer.has_roomba_message()
-                 or not self.topic_buffer.has_odometry_message()
-                 or not self.topic_buffer.has_landing_message()):
+                if (not world_state.has_roomba_message()
+                 or not world_state.has_odometry_message()
+                 or not world_state.has_landing_message()):
                     return (TaskRunning(), NopCommand())
                 else:
                     self._state = BlockRoombaTaskState.descent
 
             if (self._state == BlockRoombaTaskState.descent):
-                try:
-                    roomba_transform = self.topic_buffer.get_tf_buffer().lookup_transform(
-                                        'level_quad',
-                                        self._roomba_id,
-                                        rospy.Time(0),
-                                        rospy.Duration(self._TRANSFORM_TIMEOUT))
-                    drone_transform = self.topic_buffer.get_tf_buffer().lookup_transform(
-                                        'level_quad',
-                                        'map',
-                                        rospy.Time(0),
-                                        rospy.Duration(self._TRANSFORM_TIMEOUT))
-                except (tf2_ros.LookupException,
-                        tf2_ros.ConnectivityException,
-                        tf2_ros.ExtrapolationException) as ex:
-                    rospy.logerr('Block Roomba Task: Exception when looking up transform')
-                    rospy.logerr(ex.message)
+                relative_roombas = world_state.get_relative_roombas()
+                if relative_roombas is None:
                     return (TaskAborted(msg='Exception when looking up transform during block roomba'),)
 
-                # Creat point centered at drone's center
-                stamped_point = PointStamped()
-                stamped_point.point.x = 0
-                stamped_point.point.y = 0
-                stamped_point.point.z = 0
-
-                # returns point distances of roomba to center point of level quad
-                self._roomba_point = tf2_geometry_msgs.do_transform_point(
-                                                    stamped_point, roomba_transform)
-
-                if not self._check_max_roomba_range():
+                if not self._check_max_roomba_range(world_state):
                     return (TaskAborted(msg='The provided roomba is not close enough to the quad'),)
-                if self._on_ground():
+                if self._on_ground(world_state):
                     return (TaskDone(),)
 
                 roomba_x_velocity = self._roomba_odometry.twist.twist.linear.x
                 roomba_y_velocity = self._roomba_odometry.twist.twist.linear.y
-                roomba_velocity = math.sqrt(roomba_x_velocity**2 + roomba_y_velocity**2)
+
+                # Aim at where the roomba will be when the drone gets there
+                lookahead = min(self._distance_to_roomba / self._MAX_TRANSLATION_SPEED,
+                                self._MAX_PREDICTION_TIME)
+                predicted, target_offset, target_velocity = \
+                    world_state.predict_relative_roomba(
+                        self._roomba_id,
+                        world_state.time + rospy.Duration(lookahead))
+                if not predicted:
+                    target_offset = self._roomba_offset
+                    target_velocity = (roomba_x_velocity, roomba_y_velocity)
+                target_x_velocity, target_y_velocity = target_velocity
+
+                # Block in the direction the roomba will be moving in, or
+                # the current one while it turns around
+                if target_x_velocity != 0.0 or target_y_velocity != 0.0:
+                    heading_x_velocity = target_x_velocity
+                    heading_y_velocity = target_y_velocity
+                else:
+                    heading_x_velocity = roomba_x_velocity
+                    heading_y_velocity = roomba_y_velocity
+                roomba_velocity = math.sqrt(heading_x_velocity**2 + heading_y_velocity**2)
 
                 roomba_vector = Vector3Stamped()
 
-                roomba_vector.vector.x = roomba_x_velocity/roomba_velocity
-                roomba_vector.vector.y = roomba_y_velocity/roomba_velocity
+                roomba_vector.vector.x = heading_x_velocity/roomba_velocity
+                roomba_vector.vector.y = heading_y_velocity/roomba_velocity
                 roomba_vector.vector.z = 0.0
 
                 # p-controller
-                x_vel_target = ((self._roomba_point.point.x + self._overshoot * roomba_vector.vector.x)
-                                    * self._K_X + roomba_x_velocity)
-                y_vel_target = ((self._roomba_point.point.y + self._overshoot * roomba_vector.vector.y)
-                                    * self._K_Y + roomba_y_velocity)
+                x_vel_target = ((target_offset[0] + self._overshoot * roomba_vector.vector.x)
+                                    * self._K_X + target_x_velocity)
+                y_vel_target = ((target_offset[1] + self._overshoot * roomba_vector.vector.y)
+                                    * self._K_Y + target_y_velocity)
                 
                 z_vel_target = self._descent_velocity
 
@@ -153,7 +148,7 @@ class BlockRoombaTask(AbstractTask):
 
                 desired_vel = [x_vel_target, y_vel_target, z_vel_target]
                
-                odometry = self.topic_buffer.get_odometry_message()
+                odometry = world_state.odometry
                 drone_vel_x = odometry.twist.twist.linear.x
                 drone_vel_y = odometry.twist.twist.linear.y
                 drone_vel_z = odometry.twist.twist.linear.z
@@ -165,7 +160,7 @@ class BlockRoombaTask(AbstractTask):
 
                 velocity = TwistStamped()
                 velocity.header.frame_id = 'level_quad'
-                velocity.header.stamp = rospy.Time.now()
+                velocity.header.stamp = world_state.time
                 velocity.twist.linear.x = desired_vel[0]
                 velocity.twist.linear.y = desired_vel[1]
                 velocity.twist.linear.z = desired_vel[2]
@@ -179,14 +174,17 @@ class BlockRoombaTask(AbstractTask):
     # checks to see if passed in roomba id is available and
     # that the drone and roomba are both within a specified distance
     # in order to start/continue the task
-    def _check_max_roomba_range(self):
-        for odometry in self.topic_buffer.get_roomba_message().data:
-            if odometry.child_frame_id == self._roomba_id:
-                self._roomba_odometry = odometry
-                self._roomba_found =  True 
-                _distance_to_roomba = math.sqrt(self._roomba_point.point.x**2 + 
-                            self._roomba_point.point.y**2)
-                return (_distance_to_roomba <= (self._MAX_START_TASK_DIST + self._overshoot))
+    def _check_max_roomba_range(self, world_state):
+        found, odometry = world_state.get_roomba_odometry(self._roomba_id)
+        if found:
+            relative_roombas = world_state.get_relative_roombas()
+            _, row = relative_roombas.get_row(self._roomba_id)
+            self._roomba_odometry = odometry
+            self._roomba_found =  True 
+            # point distances of roomba to center point of level quad
+            self._roomba_offset = relative_roombas.positions[row, :2]
+            self._distance_to_roomba = relative_roombas.horizontal_distances[row]
+            return (self._distance_to_roomba <= (self._MAX_START_TASK_DIST + self._overshoot))
         return False
 
     def cancel(self):
@@ -194,8 +192,8 @@ class BlockRoombaTask(AbstractTask):
         self._canceled = True
         return True
 
-    def _on_ground(self):
-        return self.topic_buffer.get_landing_message().data
+    def _on_ground(self, world_state):
+        return world_state.landing_message.data
 
     def set_incoming_transition(self, transition):
         self._transition = transition
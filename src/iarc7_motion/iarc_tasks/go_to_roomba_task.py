@@ -1,6 +1,4 @@
 import rospy
-import tf2_ros
-import tf2_geometry_msgs
 import threading
 
 from .abstract_task import AbstractTask
@@ -11,6 +9,7 @@ from iarc_tasks.task_states import (TaskRunning,
                                     TaskFailed)
 from iarc_tasks.task_commands import (VelocityCommand, NopCommand)
 
+from task_utilities.intercept_solver import InterceptSolver
 from task_utilities.translate_stop_planner import TranslateStopPlanner
 
 class GoToRoombaState(object):
@@ -40,7 +39,6 @@ class GoToRoombaTask(AbstractTask):
         self._y_position = None
 
         try:
-            self._TRANSFORM_TIMEOUT = rospy.get_param('~transform_timeout')
             self._MIN_MANEUVER_HEIGHT = rospy.get_param('~min_maneuver_height')
             self._z_position = rospy.get_param('~track_roomba_height')
             ending_radius = rospy.get_param('~go_to_roomba_tolerance')
@@ -58,47 +56,46 @@ class GoToRoombaTask(AbstractTask):
                                                     self._y_position,
                                                     self._z_position,
                                                     ending_radius)
+        # Intercepts are planned with the acceleration the drone is actually
+        # commanded with, not max_translation_acceleration
+        self._intercept_solver = InterceptSolver(
+            *self._path_holder.get_motion_limits())
 
         self._state = GoToRoombaState.init
 
-    def get_desired_command(self):
+    def get_desired_command(self, world_state):
         with self._lock:
             if self._canceled:
                 return (TaskCanceled(),)
             if self._state == GoToRoombaState.init:
-                if (not self.topic_buffer.has_roomba_message()
-                  or not self.topic_buffer.has_odometry_message()):
+                if (not world_state.has_roomba_message()
+                  or not world_state.has_odometry_message()):
                     self._state = GoToRoombaState.waiting
                 else:
                     self._state = GoToRoombaState.translate
 
             if self._state == GoToRoombaState.waiting:
-                if (not self.topic_buffer.has_roomba_message()
-                  or not self.topic_buffer.has_odometry_message()):
+                if (not world_state.has_roomba_message()
+                  or not world_state.has_odometry_message()):
                     return (TaskRunning(),NopCommand())
                 else:
                     self._state = GoToRoombaState.translate
 
             if self._state == GoToRoombaState.translate:
-                try:
-                    transStamped = self.topic_buffer.get_tf_buffer().lookup_transform(
-                            'map',
-                            'quad',
-                            rospy.Time(0),
-                            rospy.Duration(self._TRANSFORM_TIMEOUT))
-                except (tf2_ros.LookupException,
-                        tf2_ros.ConnectivityException,
-                        tf2_ros.ExtrapolationException) as ex:
-                    rospy.logerr('GoToRoombaTask: Exception when looking up transform')
-                    rospy.logerr(ex.message)
+                transStamped, staleness = self.topic_buffer.get_transform_cache().get_transform(
+                        'map',
+                        'quad',
+                        world_state.time)
+                if not self.topic_buffer.get_transform_cache().is_fresh(staleness):
+                    rospy.logerr('GoToRoombaTask: Transform is not available or too old')
+                    rospy.logerr('Transform staleness: %s', staleness)
                     return (TaskAborted(msg = 'Exception when looking up transform during go_to_roomba'),)
 
                 if (transStamped.transform.translation.z > self._MIN_MANEUVER_HEIGHT):
-                    if not self._check_roomba_in_sight():
+                    if not self._check_roomba_in_sight(world_state):
                         return (TaskAborted(msg='The provided roomba is not in sight of quad'),)
 
-                    roomba_x = self._roomba_odometry.pose.pose.position.x
-                    roomba_y = self._roomba_odometry.pose.pose.position.y
+                    roomba_x, roomba_y = self._get_intercept_point(world_state)
 
                     self._path_holder.reinit_translation_stop_planner(roomba_x,
                                                                       roomba_y,
@@ -115,12 +112,37 @@ class GoToRoombaTask(AbstractTask):
 
             return (TaskAborted(msg='Impossible state in go to roomba task reached'))
 
-    def _check_roomba_in_sight(self):
-        for odometry in self.topic_buffer.get_roomba_message().data:
-            if odometry.child_frame_id == self._roomba_id:
-                self._roomba_odometry = odometry
-                return True
-        return False
+    # Get the earliest map position where the drone can meet the roomba,
+    # or the current roomba position if there is no prediction for it
+    def _get_intercept_point(self, world_state):
+        roomba_x = self._roomba_odometry.pose.pose.position.x
+        roomba_y = self._roomba_odometry.pose.pose.position.y
+
+        prediction = world_state.roomba_prediction
+        if prediction is None:
+            return roomba_x, roomba_y
+        found, row = prediction.get_row(self._roomba_id)
+        if not found:
+            return roomba_x, roomba_y
+
+        odometry = world_state.odometry
+        found, intercept_time, intercept_point = self._intercept_solver.solve(
+            prediction,
+            row,
+            world_state.time,
+            (odometry.pose.pose.position.x, odometry.pose.pose.position.y),
+            (odometry.twist.twist.linear.x, odometry.twist.twist.linear.y))
+        if not found:
+            rospy.logwarn_throttle(1.0,
+                'GoToRoombaTask: roomba can not be intercepted within {} seconds'.format(
+                    intercept_time))
+        return intercept_point
+
+    def _check_roomba_in_sight(self, world_state):
+        found, odometry = world_state.get_roomba_odometry(self._roomba_id)
+        if found:
+            self._roomba_odometry = odometry
+        return found
 
     def cancel(self):
         rospy.loginfo('GoToRoombaTask canceled')
@@ -129,3 +151,6 @@ class GoToRoombaTask(AbstractTask):
 
     def set_incoming_transition(self, transition):
         self._transition = transition
+
+    def shutdown(self):
+        self._path_holder.shutdown()
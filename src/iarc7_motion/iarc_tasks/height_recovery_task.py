@@ -1,6 +1,5 @@
 #!/usr/bin/env python
 import rospy
-import tf2_ros
 
 from geometry_msgs.msg import TwistStamped
 from actionlib_msgs.msg import GoalStatus
@@ -37,7 +36,6 @@ class HeightRecoveryTask(AbstractTask):
             self._TAKEOFF_VELOCITY = rospy.get_param('~takeoff_velocity')
             self._MIN_MAN_HEIGHT = rospy.get_param('~min_maneuver_height')
             HEIGHT_OFFSET = rospy.get_param('~recover_height_offset')
-            self._TRANSFORM_TIMEOUT = rospy.get_param('~transform_timeout')
         except KeyError as e:
             rospy.logerr('Could not lookup a parameter for HeightRecoveryTask')
             raise
@@ -46,7 +44,7 @@ class HeightRecoveryTask(AbstractTask):
 
         self._state = HeightRecoveryTaskState.init
 
-    def get_desired_command(self):
+    def get_desired_command(self, world_state):
         if self._canceled:
             return (TaskCanceled(),)
 
@@ -54,18 +52,14 @@ class HeightRecoveryTask(AbstractTask):
             self._state = HeightRecoveryTaskState.recover
 
         if (self._state == HeightRecoveryTaskState.recover):
-            try:
-                transStamped = self.topic_buffer.get_tf_buffer().lookup_transform(
-                                    'map',
-                                    'base_footprint',
-                                    rospy.Time(0),
-                                    rospy.Duration(self._TRANSFORM_TIMEOUT))
-            except (tf2_ros.LookupException,
-                    tf2_ros.ConnectivityException,
-                    tf2_ros.ExtrapolationException) as ex:
+            transStamped, staleness = self.topic_buffer.get_transform_cache().get_transform(
+                                'map',
+                                'base_footprint',
+                                world_state.time)
+            if not self.topic_buffer.get_transform_cache().is_fresh(staleness):
                 msg = 'Exception when looking up transform during height recovery'
                 rospy.logerr('HeightRecoveryTask: {}'.format(msg))
-                rospy.logerr(ex.message)
+                rospy.logerr('Transform staleness: %s', staleness)
                 return (TaskAborted(msg=msg),)
 
              # Check if we are above minimum maneuver height
@@ -78,7 +72,7 @@ class HeightRecoveryTask(AbstractTask):
             else:
                 velocity = TwistStamped()
                 velocity.header.frame_id = 'level_quad'
-                velocity.header.stamp = rospy.Time.now()
+                velocity.header.stamp = world_state.time
                 velocity.twist.linear.z = self._TAKEOFF_VELOCITY
                 return (TaskRunning(), VelocityCommand(velocity))
 
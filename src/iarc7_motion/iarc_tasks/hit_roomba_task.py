@@ -2,12 +2,10 @@
 
 import math
 import rospy
-import tf2_ros
-import tf2_geometry_msgs
 import threading
 
 from nav_msgs.msg import Odometry
-from geometry_msgs.msg import TwistStamped, PointStamped
+from geometry_msgs.msg import TwistStamped
 
 from .abstract_task import AbstractTask
 from iarc_tasks.task_states import (TaskRunning,
@@ -53,13 +51,13 @@ class HitRoombaTask(AbstractTask):
         self._lock = threading.RLock()
 
         try:
-            self._TRANSFORM_TIMEOUT = rospy.get_param('~transform_timeout')
             self._MAX_HORIZ_SPEED = rospy.get_param('~max_translation_speed')
             self._MAX_Z_VELOCITY = rospy.get_param('~max_z_velocity')
             self._DESCENT_VELOCITY = rospy.get_param('~hit_descent_velocity')
             self._SAFE_ASCENT_VELOCITY = rospy.get_param('~hit_safe_ascent_velocity')
             self._ASCENT_ACCELERATION = rospy.get_param('~hit_ascent_acceleration')
             self._MAX_ROOMBA_DESCENT_DIST = rospy.get_param('~max_roomba_descent_dist')
+            self._MAX_PREDICTION_TIME = rospy.get_param('~roomba_max_prediction_time')
             self._ROOMBA_HIT_ARM_THRESHOLD = rospy.get_param('~roomba_hit_arm_threshold')
             self._ROOMBA_HIT_DETECTED_THRESHOLD = rospy.get_param('~roomba_hit_detected_threshold')
             self._ASCENT_HEIGHT = rospy.get_param('~hit_ascent_height')
@@ -90,15 +88,15 @@ class HitRoombaTask(AbstractTask):
         self._hit_detection_state = HitDetectionState.disarmed
         self._state = HitRoombaTaskState.init
 
-    def get_desired_command(self):
+    def get_desired_command(self, world_state):
         with self._lock:
             if self._canceled:
                 return (TaskCanceled(),)
 
             if (self._state == HitRoombaTaskState.init):
-                if (not self.topic_buffer.has_roomba_message()
-                 or not self.topic_buffer.has_odometry_message()
-                 or not self.topic_buffer.has_landing_message()):
+                if (not world_state.has_roomba_message()
+                 or not world_state.has_odometry_message()
+                 or not world_state.has_landing_message()):
                     return (TaskRunning(), NopCommand())
                 else:
                     self._hit_detection_state = HitDetectionState.disarmed
@@ -108,15 +106,15 @@ class HitRoombaTask(AbstractTask):
 
                 # Check and see if the roomba's odometry is available
                 (roomba_odom_available, roomba_odometry) = \
-                    self.topic_buffer.get_roomba_odometry(self._roomba_id)
+                    world_state.get_roomba_odometry(self._roomba_id)
                 if not roomba_odom_available:
                     return (TaskAborted(msg='The provided roomba is not in sight of quad'),)
 
-                odometry = self.topic_buffer.get_odometry_message()
+                odometry = world_state.odometry
 
                 # If we have landed transition to ascension
-                if self.topic_buffer.get_landing_message().data:
-                    return self._transition_to_ascension()
+                if world_state.landing_message.data:
+                    return self._transition_to_ascension(world_state)
 
                 # If the hit detector has gone off transition to ascension
                 if self._hit_detection_state == HitDetectionState.disarmed:
@@ -125,43 +123,27 @@ class HitRoombaTask(AbstractTask):
                 elif self._hit_detection_state == HitDetectionState.armed:
                     if odometry.twist.twist.linear.z > self._ROOMBA_HIT_DETECTED_THRESHOLD:
                         self._hit_detection_state == HitDetectionState.hit_detected
-                        return self._transition_to_ascension()
+                        return self._transition_to_ascension(world_state)
 
                 # Get the roomba's relative distance to the drone
-                try:
-                    roomba_transform = self.topic_buffer.get_tf_buffer().lookup_transform(
-                                        'level_quad',
-                                        self._roomba_id,
-                                        rospy.Time(0),
-                                        rospy.Duration(self._TRANSFORM_TIMEOUT))
-                except (tf2_ros.LookupException,
-                        tf2_ros.ConnectivityException,
-                        tf2_ros.ExtrapolationException) as ex:
-                    rospy.logerr('HitRoombaTask: Exception when looking up transform')
-                    rospy.logerr(ex.message)
+                relative_roombas = world_state.get_relative_roombas()
+                if relative_roombas is None:
                     return (TaskAborted(msg='Exception when looking up transform during hit roomba'),)
-                # Creat point centered at drone's center
-                stamped_point = PointStamped()
-                stamped_point.point.x = 0
-                stamped_point.point.y = 0
-                stamped_point.point.z = 0
-                # returns point distances of roomba to center point of level quad
-                self._roomba_point = tf2_geometry_msgs.do_transform_point(
-                                                    stamped_point, roomba_transform)
-                x_p_diff = self._roomba_point.point.x
-                y_p_diff = self._roomba_point.point.y
-                roomba_h_distance = math.sqrt(x_p_diff**2 + y_p_diff**2)
-
-                roomba_x_velocity = roomba_odometry.twist.twist.linear.x
-                roomba_y_velocity = roomba_odometry.twist.twist.linear.y
-
-                x_v_diff = odometry.twist.twist.linear.x - roomba_x_velocity
-                y_v_diff = odometry.twist.twist.linear.y - roomba_y_velocity
+                _, row = relative_roombas.get_row(self._roomba_id)
+
+                # point distances of roomba to center point of level quad
+                x_p_diff, y_p_diff = relative_roombas.positions[row, :2]
+                roomba_h_distance = relative_roombas.horizontal_distances[row]
+
+                roomba_x_velocity, roomba_y_velocity = \
+                    relative_roombas.velocities[row]
+
+                x_v_diff, y_v_diff = relative_roombas.velocity_differences[row]
                 h_v_diff_mag = math.sqrt(x_v_diff**2 + y_v_diff**2)
 
                 # Publish roomba tracking debugging information
                 roomba_track_msg = Odometry()
-                roomba_track_msg.header.stamp = rospy.Time.now()
+                roomba_track_msg.header.stamp = world_state.time
                 roomba_track_msg.pose.pose.position.x = x_p_diff
                 roomba_track_msg.pose.pose.position.y = y_p_diff
                 roomba_track_msg.pose.pose.position.x = roomba_h_distance
@@ -172,11 +154,22 @@ class HitRoombaTask(AbstractTask):
 
                 # Make sure that the drone is close enough to the roomba
                 if roomba_h_distance <= self._MAX_ROOMBA_DESCENT_DIST:
-                    x_success, x_response = self._x_pid.update(x_p_diff, rospy.Time.now(), False)
-                    y_success, y_response = self._y_pid.update(y_p_diff, rospy.Time.now(), False)
+                    # Aim at where the roomba will be when the drone gets there
+                    lookahead = min(roomba_h_distance / self._MAX_HORIZ_SPEED,
+                                    self._MAX_PREDICTION_TIME)
+                    predicted, target_diff, target_velocity = \
+                        world_state.predict_relative_roomba(
+                            self._roomba_id,
+                            world_state.time + rospy.Duration(lookahead))
+                    if predicted:
+                        x_p_diff, y_p_diff = target_diff
+                        roomba_x_velocity, roomba_y_velocity = target_velocity
+
+                    x_success, x_response = self._x_pid.update(x_p_diff, world_state.time, False)
+                    y_success, y_response = self._y_pid.update(y_p_diff, world_state.time, False)
 
                     # PID controller does setpoint - current;
-                    # the difference from do_transform_point is from the drone to the roomba,
+                    # the difference from the roomba table is from the drone to the roomba,
                     # which is the equivalent of current-setpoint, so take the negative response
                     # This is done so that  the drones position in the map frame doesn't
                     # have to be calculated
@@ -205,7 +198,7 @@ class HitRoombaTask(AbstractTask):
 
                     velocity = TwistStamped()
                     velocity.header.frame_id = 'level_quad'
-                    velocity.header.stamp = rospy.Time.now()
+                    velocity.header.stamp = world_state.time
                     velocity.twist.linear.x = desired_vel[0]
                     velocity.twist.linear.y = desired_vel[1]
                     velocity.twist.linear.z = desired_vel[2]
@@ -217,35 +210,35 @@ class HitRoombaTask(AbstractTask):
 
             # Ascend very fast
             if (self._state == HitRoombaTaskState.ascent):
-                odometry = self.topic_buffer.get_odometry_message()
+                odometry = world_state.odometry
 
                 if odometry.pose.pose.position.z > self._ascension_begin_deceleration_height:
                     return (TaskDone(), VelocityCommand(acceleration=self._ASCENT_ACCELERATION))
                 else:
                     velocity = TwistStamped()
                     velocity.header.frame_id = 'level_quad'
-                    velocity.header.stamp = rospy.Time.now()
+                    velocity.header.stamp = world_state.time
                     velocity.twist.linear.z = self._ascent_velocity
                     return (TaskRunning(),
                             VelocityCommand(velocity, acceleration=self._ASCENT_ACCELERATION))
 
             # Ascend at a safe speed
             if (self._state == HitRoombaTaskState.failure):
-                odometry = self.topic_buffer.get_odometry_message()
+                odometry = world_state.odometry
 
                 if odometry.pose.pose.position.z > self._ASCENT_HEIGHT:
                     return (TaskDone(), VelocityCommand())
                 else:
                     velocity = TwistStamped()
                     velocity.header.frame_id = 'level_quad'
-                    velocity.header.stamp = rospy.Time.now()
+                    velocity.header.stamp = world_state.time
                     velocity.twist.linear.z = self._SAFE_ASCENT_VELOCITY
                     return (TaskAborted(), VelocityCommand(velocity))
 
             return (TaskAborted(msg='Illegal state reached in Hit Roomba Task' ),)
 
-    def _transition_to_ascension(self):
-        odometry = self.topic_buffer.get_odometry_message()
+    def _transition_to_ascension(self, world_state):
+        odometry = world_state.odometry
 
         self._ascension_begin_deceleration_height = \
             (self._ASCENT_HEIGHT - odometry.pose.pose.position.z) / 2.0
@@ -264,7 +257,7 @@ class HitRoombaTask(AbstractTask):
 
         velocity = TwistStamped()
         velocity.header.frame_id = 'level_quad'
-        velocity.header.stamp = rospy.Time.now()
+        velocity.header.stamp = world_state.time
         velocity.twist.linear.z = self._ascent_velocity
 
         self._state = HitRoombaTaskState.ascent
@@ -2,12 +2,10 @@
 
 import math
 import rospy
-import tf2_geometry_msgs
 import threading
 
 from geometry_msgs.msg import TwistStamped
 from geometry_msgs.msg import Point
-from geometry_msgs.msg import PointStamped
 
 from .abstract_task import AbstractTask
 from iarc_tasks.task_states import (TaskRunning,
@@ -63,33 +61,33 @@ class HoldPositionTask(AbstractTask):
 
         self._state = HoldPositionTaskStates.init
 
-    def get_desired_command(self):
+    def get_desired_command(self, world_state):
         with self._lock:
             if (self._state == HoldPositionTaskStates.init
              or self._state == HoldPositionTaskStates.waiting):
-                if not self.topic_buffer.has_odometry_message():
+                if not world_state.has_odometry_message():
                     self._state = HoldPositionTaskStates.waiting
                     return (TaskRunning(), NopCommand())
                 else:
-                    self._set_targets()
+                    self._set_targets(world_state)
                     self._state = HoldPositionTaskStates.holding
 
-                    if not self._check_max_error():
+                    if not self._check_max_error(world_state):
                         return (TaskAborted(msg='Desired position is too far away, task not for translation.'),)
 
             if (self._state == HoldPositionTaskStates.holding):
                 if not (self._height_checker.above_min_maneuver_height(
-                        self.topic_buffer.get_odometry_message().pose.pose.position.z)):
+                        world_state.odometry.pose.pose.position.z)):
                     return (TaskAborted(msg='Drone is too low'),)
 
-                if not (self._check_max_error()):
+                if not (self._check_max_error(world_state)):
                     return (TaskAborted(msg='Error from desired point is too great'),)
 
                 if self._canceled:
                     return (TaskCanceled(),)
 
                 # p-controller
-                odometry = self.topic_buffer.get_odometry_message()
+                odometry = world_state.odometry
                 x_vel_target = ((self._x_position - odometry.pose.pose.position.x)
                                     * self._K_X)
                 y_vel_target = ((self._y_position - odometry.pose.pose.position.y) 
@@ -109,7 +107,7 @@ class HoldPositionTask(AbstractTask):
 
                 velocity = TwistStamped()
                 velocity.header.frame_id = 'level_quad'
-                velocity.header.stamp = rospy.Time.now()
+                velocity.header.stamp = world_state.time
                 velocity.twist.linear.x = x_vel_target
                 velocity.twist.linear.y = y_vel_target
                 velocity.twist.linear.z = z_vel_target
@@ -123,8 +121,8 @@ class HoldPositionTask(AbstractTask):
         self._canceled = True
         return True
 
-    def _check_max_error(self):
-        odometry = self.topic_buffer.get_odometry_message()
+    def _check_max_error(self, world_state):
+        odometry = world_state.odometry
         x_vel_target = (self._x_position - odometry.pose.pose.position.x)
         y_vel_target = (self._y_position - odometry.pose.pose.position.y)
         z_vel_target = (self._z_position - odometry.pose.pose.position.z)
@@ -133,10 +131,10 @@ class HoldPositionTask(AbstractTask):
         
         return (_distance_to_point <= self._MAX_RANGE)
 
-    def _set_targets(self):
+    def _set_targets(self, world_state):
         if (self._x_position is None and self._y_position is None
                                      and self._z_position is None):
-            odometry = self.topic_buffer.get_odometry_message()
+            odometry = world_state.odometry
             self._x_position = odometry.pose.pose.position.x
             self._y_position = odometry.pose.pose.position.y
             self._z_position = odometry.pose.pose.position.z
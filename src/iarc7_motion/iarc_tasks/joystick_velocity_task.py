@@ -2,11 +2,9 @@
 
 import math
 import rospy
-import tf2_ros
-import tf2_geometry_msgs
 import threading
 
-from geometry_msgs.msg import TwistStamped, PointStamped, Point
+from geometry_msgs.msg import TwistStamped
 
 from .abstract_task import AbstractTask
 
@@ -44,7 +42,6 @@ class JoystickVelocityTask(AbstractTask):
             self._controller_callback)
 
         try:
-            self._TRANSFORM_TIMEOUT = rospy.get_param('~transform_timeout')
             self._MAX_TRANSLATION_SPEED = rospy.get_param('~max_translation_speed')
             self._MAX_Z_VELOCITY = rospy.get_param('~max_z_velocity')
 
@@ -77,20 +74,20 @@ class JoystickVelocityTask(AbstractTask):
             rospy.loginfo('JoystickVelocityTask Exiting')
 
 
-    def get_desired_command(self):
+    def get_desired_command(self, world_state):
         with self._lock:
 
             if self._canceled:
                 return (TaskCanceled(),)
 
             if (self._state == JoystickVelocityTaskState.init):
-                if not self.topic_buffer.has_odometry_message():
+                if not world_state.has_odometry_message():
                     self._state = JoystickVelocityTaskState.waiting
                 else:
                     self._state = JoystickVelocityTaskState.moving
 
             if (self._state == JoystickVelocityTaskState.waiting):
-                if not self.topic_buffer.has_odometry_message():
+                if not world_state.has_odometry_message():
                     return (TaskRunning(), NopCommand())
                 else:
                     self._state = JoystickVelocityTaskState.moving
@@ -98,9 +95,9 @@ class JoystickVelocityTask(AbstractTask):
             if self._state == JoystickVelocityTaskState.moving:
 
                 predicted_motion_point = self._linear_motion_profile_generator.expected_point_at_time(
-                                           rospy.Time.now())
+                                           world_state.time)
 
-                odometry = self.topic_buffer.get_odometry_message()
+                odometry = world_state.odometry
 
                 current_height = odometry.pose.pose.position.z
 
@@ -110,7 +107,7 @@ class JoystickVelocityTask(AbstractTask):
 
                 velocity = TwistStamped()
                 velocity.header.frame_id = 'level_quad'
-                velocity.header.stamp = rospy.Time.now()
+                velocity.header.stamp = world_state.time
                 velocity.twist.linear.x = self._x_vel
                 velocity.twist.linear.y = self._y_vel
                 velocity.twist.linear.z = self._z_vel
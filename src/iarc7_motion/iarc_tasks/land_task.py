@@ -57,7 +57,7 @@ class LandTask(AbstractTask):
             # Land request failed
             self._state = LandTaskState.failed
 
-    def get_desired_command(self):
+    def get_desired_command(self, world_state):
 
         if self._state == LandTaskState.init:
             # Change state to land
@@ -88,7 +88,7 @@ class LandTask(AbstractTask):
         # Tell linear profile  to get to a recovery height
         if self._state == LandTaskState.recovering:
             rospy.loginfo('LandTask is in recovering state')
-            odometry = self.topic_buffer.get_odometry_message()
+            odometry = world_state.odometry
             # time to deccelerate to recover height
             if odometry.pose.pose.position.z > self._RECOVERY_HEIGHT:
                 self._state = LandTaskState.cancelled
@@ -97,7 +97,7 @@ class LandTask(AbstractTask):
             # time to accelerate up
             else:
                 velocity = TwistStamped()
-                velocity.header.stamp = rospy.Time.now()
+                velocity.header.stamp = world_state.time
                 velocity.twist.linear.z = self._RECOVERY_VELOCITY
                 return(TaskRunning(),
                         VelocityCommand(
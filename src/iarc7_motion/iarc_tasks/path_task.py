@@ -0,0 +1,266 @@
+import math
+import numpy as np
+import rospy
+import threading
+
+from geometry_msgs.msg import TwistStamped
+
+from .abstract_task import AbstractTask
+from iarc_tasks.task_states import (TaskRunning,
+                                    TaskDone,
+                                    TaskCanceled,
+                                    TaskAborted,
+                                    TaskFailed)
+from iarc_tasks.task_commands import (VelocityCommand, NopCommand)
+
+from task_utilities.path_speed_planner import plan_path_speeds
+from task_utilities.synchronized_profile import SynchronizedProfile
+
+class PathTaskState(object):
+    init = 0
+    follow = 1
+    stop = 2
+
+# Flies through a list of map waypoints without stopping until the last one
+#
+# The path starts at the position of the drone when the task starts. Along
+# every segment but the last the drone flies as fast as it can while still
+# being able to slow down to the speed limit of the next corner, with a
+# correction back towards the segment. Once the arc around a corner starts
+# the drone switches to the next segment, and limiting the change in
+# velocity to the acceleration limit rounds the corner. The last segment is
+# flown with a SynchronizedProfile that stops on the last waypoint, which
+# is solved again if the drone drifts away from it.
+#
+# Everything is planned at desired_translation_acceleration, the
+# acceleration the coordinator ramps the requested velocities at.
+class PathTask(AbstractTask):
+
+    def __init__(self, task_request):
+        super(PathTask, self).__init__()
+
+        self._canceled = False
+        self._transition = None
+
+        self._lock = threading.RLock()
+
+        self._waypoints = [(point.x, point.y, point.z)
+                           for point in task_request.waypoints]
+
+        try:
+            self._MIN_MANEUVER_HEIGHT = rospy.get_param('~min_maneuver_height')
+            self._MAX_SPEED = rospy.get_param('~max_translation_speed')
+            self._MAX_Z_VELOCITY = rospy.get_param('~max_z_velocity')
+            self._ACCELERATION = rospy.get_param('~desired_translation_acceleration')
+            self._POSITION_TOLERANCE = rospy.get_param('~translation_position_hold_tolerance')
+            self._CORNER_TOLERANCE = rospy.get_param('~path_corner_tolerance')
+            self._CROSS_TRACK_GAIN = rospy.get_param('~path_cross_track_gain')
+            self._UPDATE_PERIOD = 1.0 / rospy.get_param('~update_rate')
+            self._CONTROL_LAG = rospy.get_param('~control_lag')
+            self._REPLAN_DISTANCE = rospy.get_param('~translation_replan_distance')
+            self._REPLAN_VELOCITY = rospy.get_param('~path_replan_velocity')
+        except KeyError as e:
+            rospy.logerr('Could not lookup a parameter for path task')
+            raise
+
+        if len(self._waypoints) == 0:
+            raise ValueError('No waypoints were provided to PathTask')
+
+        # Check that we aren't being requested to go below the minimum maneuver height
+        # Error straight out if that's the case. If we are currently below the minimum height
+        # It will be caught and handled on the next update
+        for waypoint in self._waypoints:
+            if waypoint[2] < self._MIN_MANEUVER_HEIGHT:
+                raise ValueError('Requested z height was below the minimum maneuver height')
+
+        # Path points, segment directions, lengths and speed limits, and the
+        # planned blend distance and speed at every point
+        self._points = None
+        self._directions = None
+        self._lengths = None
+        self._segment_speeds = None
+        self._blend_distances = None
+        self._speeds = None
+
+        # Index of the segment being flown
+        self._segment = 0
+        self._profile = None
+
+        self._last_velocity = None
+        self._last_time = None
+
+        self._state = PathTaskState.init
+
+    def get_desired_command(self, world_state):
+        with self._lock:
+            if self._canceled:
+                return (TaskCanceled(),)
+
+            if self._state == PathTaskState.init:
+                if not world_state.has_odometry_message():
+                    return (TaskRunning(), NopCommand())
+                self._plan_path(world_state)
+
+            odometry = world_state.odometry
+            position = odometry.pose.pose.position
+            position = np.array((position.x, position.y, position.z))
+
+            if position[2] <= self._MIN_MANEUVER_HEIGHT:
+                return (TaskFailed(msg='Fell below minimum manuever height during path'),)
+
+            if self._state == PathTaskState.follow:
+                self._advance_segment(position)
+                if self._segment == len(self._lengths) - 1:
+                    self._state = PathTaskState.stop
+                else:
+                    velocity = self._get_follow_velocity(position)
+                    return (TaskRunning(),
+                            VelocityCommand(self._limit_and_make_twist(velocity,
+                                                                       world_state.time)))
+
+            if self._state == PathTaskState.stop:
+                distance = np.linalg.norm(self._points[-1] - position)
+                finished = (self._profile is not None
+                            and world_state.time - self._profile.start_time
+                                >= rospy.Duration(self._profile.duration))
+
+                if finished and distance <= self._POSITION_TOLERANCE:
+                    return (TaskDone(), VelocityCommand(self._make_twist(np.zeros(3),
+                                                                         world_state.time)))
+
+                velocity = odometry.twist.twist.linear
+                velocity = np.array((velocity.x, velocity.y, velocity.z))
+                if (self._profile is None
+                        or finished
+                        or self._is_off_profile(world_state.time,
+                                                position,
+                                                velocity)):
+                    self._profile = SynchronizedProfile(world_state.time,
+                                                        position,
+                                                        self._last_velocity,
+                                                        self._points[-1],
+                                                        self._MAX_SPEED,
+                                                        self._ACCELERATION)
+
+                # Request the velocity the profile has at the next update
+                _, velocity = self._profile.sample(
+                    world_state.time + rospy.Duration(self._UPDATE_PERIOD))
+                return (TaskRunning(),
+                        VelocityCommand(self._limit_and_make_twist(velocity,
+                                                                   world_state.time)))
+
+            return (TaskAborted(msg='Impossible state in path task reached'),)
+
+    # Build the path from the current position through the waypoints
+    def _plan_path(self, world_state):
+        odometry = world_state.odometry
+        position = odometry.pose.pose.position
+        velocity = odometry.twist.twist.linear
+        self._last_velocity = np.array((velocity.x, velocity.y, velocity.z))
+        self._last_time = world_state.time
+
+        # Drop points that do not move anywhere
+        points = [np.array((position.x, position.y, position.z))]
+        for waypoint in self._waypoints:
+            waypoint = np.array(waypoint)
+            if np.linalg.norm(waypoint - points[-1]) > 1e-6:
+                points.append(waypoint)
+        if len(points) == 1:
+            points.append(points[0])
+        self._points = np.array(points)
+
+        segments = np.diff(self._points, axis=0)
+        self._lengths = np.linalg.norm(segments, axis=1)
+        self._directions = segments / np.maximum(self._lengths, 1e-6)[:, np.newaxis]
+
+        if len(self._lengths) > 1:
+            start_speed = max(self._last_velocity.dot(self._directions[0]), 0.0)
+            (self._blend_distances,
+             self._speeds,
+             self._segment_speeds) = plan_path_speeds(self._points,
+                                                      start_speed,
+                                                      self._MAX_SPEED,
+                                                      self._MAX_Z_VELOCITY,
+                                                      self._ACCELERATION,
+                                                      self._CORNER_TOLERANCE)
+
+        self._state = PathTaskState.follow
+
+    # Move on to the next segment once the drone is past the start of the
+    # arc around the end of the current one
+    def _advance_segment(self, position):
+        while self._segment < len(self._lengths) - 1:
+            i = self._segment
+            along = (position - self._points[i]).dot(self._directions[i])
+            if self._lengths[i] - along > self._blend_distances[i + 1]:
+                break
+            self._segment += 1
+
+    # Whether the drone is further than translation_replan_distance or
+    # path_replan_velocity from where the stop profile was one control lag
+    # ago, the lag the drone follows the requested velocities with
+    def _is_off_profile(self, time, position, velocity):
+        expected_position, expected_velocity = self._profile.sample(
+            time - rospy.Duration(self._CONTROL_LAG))
+        return (np.linalg.norm(position - expected_position)
+                    > self._REPLAN_DISTANCE
+                or np.linalg.norm(velocity - expected_velocity)
+                    > self._REPLAN_VELOCITY)
+
+    # Velocity along the current segment, as fast as possible while still
+    # being able to slow down to the speed of the next corner before its
+    # arc starts, and back towards the segment
+    def _get_follow_velocity(self, position):
+        i = self._segment
+        offset = position - self._points[i]
+        along = offset.dot(self._directions[i])
+        remaining = max(self._lengths[i] - along - self._blend_distances[i + 1], 0.0)
+
+        speed = min(self._segment_speeds[i],
+                    math.sqrt(self._speeds[i + 1]**2
+                              + 2.0 * self._ACCELERATION * remaining))
+
+        cross_track = self._directions[i] * along - offset
+        return self._directions[i] * speed + self._CROSS_TRACK_GAIN * cross_track
+
+    # Cap the speed, the vertical velocity and the change from the last
+    # requested velocity, then fill out the twist
+    def _limit_and_make_twist(self, velocity, time):
+        speed = np.linalg.norm(velocity)
+        if speed > self._MAX_SPEED:
+            velocity = velocity * (self._MAX_SPEED / speed)
+        if abs(velocity[2]) > self._MAX_Z_VELOCITY:
+            velocity = velocity.copy()
+            velocity[2] = math.copysign(self._MAX_Z_VELOCITY, velocity[2])
+
+        dt = (time - self._last_time).to_sec()
+        if dt <= 0.0:
+            dt = self._UPDATE_PERIOD
+        change = velocity - self._last_velocity
+        change_size = np.linalg.norm(change)
+        if change_size > self._ACCELERATION * dt:
+            velocity = (self._last_velocity
+                        + change * (self._ACCELERATION * dt / change_size))
+
+        self._last_velocity = velocity
+        self._last_time = time
+        return self._make_twist(velocity, time)
+
+    def _make_twist(self, velocity, time):
+        twist = TwistStamped()
+        twist.header.stamp = time
+        twist.header.frame_id = 'level_quad'
+        twist.twist.linear.x = velocity[0]
+        twist.twist.linear.y = velocity[1]
+        twist.twist.linear.z = velocity[2]
+        return twist
+
+    def cancel(self):
+        with self._lock:
+            rospy.loginfo('PathTask canceled')
+            self._canceled = True
+            return True
+
+    def set_incoming_transition(self, transition):
+        with self._lock:
+            self._transition = transition
@@ -1,6 +1,5 @@
 #!/usr/bin/env python
 import rospy
-import tf2_ros
 
 from geometry_msgs.msg import TwistStamped
 from actionlib_msgs.msg import GoalStatus
@@ -41,7 +40,6 @@ class TakeoffTask(AbstractTask):
             self._TAKEOFF_ACCELERATION = rospy.get_param('~takeoff_acceleration')
             self._TAKEOFF_COMPLETE_HEIGHT = rospy.get_param('~takeoff_complete_height')
             self._DELAY_BEFORE_TAKEOFF = rospy.get_param('~delay_before_takeoff')
-            self._TRANSFORM_TIMEOUT = rospy.get_param('~transform_timeout')
             self._MIN_MANEUVER_HEIGHT = rospy.get_param('~min_maneuver_height')
             self._TAKEOFF_COMPLETE_HEIGHT_TOLERANCE = rospy.get_param('~takeoff_complete_height_tolerance')
             self._TAKEOFF_STABILIZE_DELAY = rospy.get_param('~takeoff_stabilize_delay')
@@ -63,7 +61,7 @@ class TakeoffTask(AbstractTask):
             rospy.logerr('Takeoff task failed during call to low level motion')
             self._state = TakeoffTaskState.failed
 
-    def get_desired_command(self):
+    def get_desired_command(self, world_state):
         if self._canceled:
             return (TaskCanceled(),)
 
@@ -85,18 +83,14 @@ class TakeoffTask(AbstractTask):
             return (TaskRunning(),)
 
         if (self._state == TakeoffTaskState.ascend):
-            try:
-                transStamped = self.topic_buffer.get_tf_buffer().lookup_transform(
-                                    'map',
-                                    'base_footprint',
-                                    rospy.Time(0),
-                                    rospy.Duration(self._TRANSFORM_TIMEOUT))
-            except (tf2_ros.LookupException,
-                    tf2_ros.ConnectivityException,
-                    tf2_ros.ExtrapolationException) as ex:
+            transStamped, staleness = self.topic_buffer.get_transform_cache().get_transform(
+                                'map',
+                                'base_footprint',
+                                world_state.time)
+            if not self.topic_buffer.get_transform_cache().is_fresh(staleness):
                 msg = 'Exception when looking up transform during takeoff'
                 rospy.logerr('Takeofftask: {}'.format(msg))
-                rospy.logerr(ex.message)
+                rospy.logerr('Transform staleness: %s', staleness)
                 return (TaskAborted(msg=msg),)
 
             # Check if we reached the target distance from height
@@ -104,22 +98,22 @@ class TakeoffTask(AbstractTask):
                + self._TAKEOFF_COMPLETE_HEIGHT_TOLERANCE
                >= self._TAKEOFF_COMPLETE_HEIGHT):
                 self._state = TakeoffTaskState.stabilize
-                self._time_of_stabilize = rospy.Time.now()
+                self._time_of_stabilize = world_state.time
             else:
                 velocity = TwistStamped()
                 velocity.header.frame_id = 'level_quad'
-                velocity.header.stamp = rospy.Time.now()
+                velocity.header.stamp = world_state.time
                 velocity.twist.linear.z = min(self._TAKEOFF_VELOCITY,
-                    (rospy.Time.now() - self._time_of_ascension).to_sec()
+                    (world_state.time - self._time_of_ascension).to_sec()
                     * self._TAKEOFF_ACCELERATION)
                 return (TaskRunning(), VelocityCommand(velocity))
 
         if self._state == TakeoffTaskState.stabilize:
-            if (rospy.Time.now() - self._time_of_stabilize
+            if (world_state.time - self._time_of_stabilize
                 < rospy.Duration(self._TAKEOFF_STABILIZE_DELAY)):
                 velocity = TwistStamped()
                 velocity.header.frame_id = 'level_quad'
-                velocity.header.stamp = rospy.Time.now()
+                velocity.header.stamp = world_state.time
                 velocity.twist.linear.z = 0
                 return (TaskRunning(), VelocityCommand(velocity))
             else:
@@ -13,7 +13,8 @@ class VelocityCommand(object):
                  start_velocity_x=None,
                  start_velocity_y=None,
                  start_velocity_z=None,
-                 acceleration=None):
+                 acceleration=None,
+                 profile_mode=None):
 
         self.start_position = Vector3()
         self.start_position.x = start_position_x
@@ -27,6 +28,9 @@ class VelocityCommand(object):
 
         self.acceleration = acceleration
 
+        # 'linear' or 's_curve', None uses the default profile mode
+        self.profile_mode = profile_mode
+
         if target_twist is None:
             self.target_twist = TwistStamped()
             self.target_twist.header.stamp = rospy.Time.now()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+import numpy as np
+import rospy
+
+# Finds the earliest point where the drone can meet a predicted roomba
+#
+# The drone is modelled as moving straight at the point, accelerating and
+# decelerating at a fixed acceleration up to a maximum speed and stopping
+# on the point. Velocity across the line to the point is ignored, the
+# solution is recomputed every tick so the error does not build up.
+#
+# Candidate meeting times are checked on a grid with one call to the
+# prediction, then the first feasible step is bisected down to the
+# tolerance.
+class InterceptSolver(object):
+    def __init__(self, max_speed, acceleration):
+        try:
+            self._MAX_TIME = rospy.get_param('~intercept_max_time')
+            self._TIME_STEP = rospy.get_param('~intercept_time_step')
+            self._TIME_TOLERANCE = rospy.get_param('~intercept_time_tolerance')
+        except KeyError as e:
+            rospy.logerr('Could not lookup a parameter for intercept solver')
+            raise
+
+        self._max_speed = max_speed
+        self._acceleration = acceleration
+        self._offsets = np.arange(0.0,
+                                  self._MAX_TIME + self._TIME_STEP / 2.0,
+                                  self._TIME_STEP)
+
+    # Solve for the meeting point with the roomba in row of prediction
+    #
+    # Args:
+    #     time: rospy.Time to start from
+    #     drone_position: horizontal map position of the drone
+    #     drone_velocity: horizontal velocity of the drone
+    #
+    # Returns: (found, seconds after time, (x, y) map position), if the
+    #     roomba can not be reached within intercept_max_time found is False
+    #     and the position is where the roomba will be at that time
+    def solve(self, prediction, row, time, drone_position, drone_velocity):
+        drone_position = np.asarray(drone_position, dtype=np.float64)
+        drone_velocity = np.asarray(drone_velocity, dtype=np.float64)
+        start = time.to_sec()
+
+        positions, _ = prediction.predict(start + self._offsets)
+        positions = positions[row]
+        feasible = (self._time_to_reach(positions, drone_position, drone_velocity)
+                    <= self._offsets)
+
+        if not np.any(feasible):
+            return False, self._offsets[-1], tuple(positions[-1])
+
+        first = np.argmax(feasible)
+        if first == 0:
+            return True, 0.0, tuple(positions[0])
+
+        # The roomba can not be met at low and can be met at high
+        low = self._offsets[first - 1]
+        high = self._offsets[first]
+        position = positions[first]
+        while high - low > self._TIME_TOLERANCE:
+            middle = (low + high) / 2.0
+            candidate = prediction.predict(start + middle)[0][row]
+            if (self._time_to_reach(candidate, drone_position, drone_velocity)[0]
+                    <= middle):
+                high = middle
+                position = candidate[0]
+            else:
+                low = middle
+        return True, high, tuple(position)
+
+    # Shortest time for the drone to get to and stop on each of the (N, 2)
+    # targets
+    def _time_to_reach(self, targets, drone_position, drone_velocity):
+        offsets = np.asarray(targets).reshape(-1, 2) - drone_position
+        distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        safe_distances = np.where(distances > 0.0, distances, 1.0)
+        speeds = np.where(distances > 0.0,
+                          offsets.dot(drone_velocity) / safe_distances,
+                          0.0)
+        return minimum_stop_time(distances,
+                                 speeds,
+                                 self._max_speed,
+                                 self._acceleration)
+
+
+# Shortest time to cover distances along a line and stop, starting with
+# speeds along the line, accelerating and decelerating at acceleration and
+# moving no faster than max_speed
+#
+# Negative speeds are moving away from the target, which is first braked
+# to a stop. Speeds too high to stop before the target brake to a stop
+# past it and come back.
+def minimum_stop_time(distances, speeds, max_speed, acceleration):
+    distances = np.asarray(distances, dtype=np.float64)
+    speeds = np.minimum(np.asarray(speeds, dtype=np.float64), max_speed)
+
+    # Stop first if moving away or if the target can not be stopped on
+    braking_distances = speeds**2 / (2.0 * acceleration)
+    stop_first = (speeds < 0.0) | (braking_distances > distances)
+    braking_times = np.where(stop_first, np.abs(speeds) / acceleration, 0.0)
+    distances = np.where(stop_first,
+                         np.abs(distances - np.sign(speeds) * braking_distances),
+                         distances)
+    speeds = np.where(stop_first, 0.0, speeds)
+
+    # Triangle profile, or trapezoid if the peak is over the max speed
+    peak_speeds = np.sqrt(acceleration * distances + speeds**2 / 2.0)
+    triangle_times = (2.0 * peak_speeds - speeds) / acceleration
+    ramp_distances = (2.0 * max_speed**2 - speeds**2) / (2.0 * acceleration)
+    trapezoid_times = ((2.0 * max_speed - speeds) / acceleration
+                       + (distances - ramp_distances) / max_speed)
+    return braking_times + np.where(peak_speeds <= max_speed,
+                                    triangle_times,
+                                    trapezoid_times)
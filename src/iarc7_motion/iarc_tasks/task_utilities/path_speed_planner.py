@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+import numpy as np
+
+# Plan the speeds for flying through a list of points without stopping
+# until the last one
+#
+# Every corner is rounded with an arc that stays within corner_tolerance of
+# the corner and starts no further than half way along either of the
+# segments next to it. The drone can go around an arc of radius R at
+# sqrt(acceleration * R), which is the speed limit at the corner.
+#
+# Each segment has a speed limit of max_speed, lowered on climbing and
+# descending segments so the vertical velocity stays within max_z_speed.
+# The speed at a point is limited by both of the segments next to it.
+#
+# A backward pass then makes sure the drone can always slow down in time
+# for the next corner and stop on the last point, and a forward pass makes
+# sure every corner speed can be reached from start_speed. Both only count
+# the straight part of each segment between the arcs, since the speed is
+# held around the arcs.
+#
+# Args:
+#     points: (N, 3) points of the path, N >= 2
+#     start_speed: speed along the first segment at the first point
+#
+# Returns: (blend_distances, speeds, segment_speeds), the distance before
+#     each point where the arc around it starts and the speed at each
+#     point, both (N,), and the (N - 1,) speed limits of the segments
+def plan_path_speeds(points,
+                     start_speed,
+                     max_speed,
+                     max_z_speed,
+                     acceleration,
+                     corner_tolerance):
+    points = np.asarray(points, dtype=np.float64)
+    segments = np.diff(points, axis=0)
+    lengths = np.linalg.norm(segments, axis=1)
+    directions = segments / lengths[:, np.newaxis]
+
+    with np.errstate(divide='ignore'):
+        segment_speeds = np.minimum(max_speed,
+                                    max_z_speed / np.abs(directions[:, 2]))
+
+    # Half of the angle the path turns through at each corner
+    cos_turns = np.clip(np.sum(directions[:-1] * directions[1:], axis=1),
+                        -1.0,
+                        1.0)
+    half_turns = np.arccos(cos_turns) / 2.0
+    turning = half_turns > 1e-6
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # An arc of radius R misses the corner by R * (1 / cos - 1) and
+        # touches the segments R * tan from the corner
+        tolerance_radii = (corner_tolerance * np.cos(half_turns)
+                           / (1.0 - np.cos(half_turns)))
+        length_radii = (np.minimum(lengths[:-1], lengths[1:]) / 2.0
+                        / np.tan(half_turns))
+        radii = np.minimum(tolerance_radii, length_radii)
+        corner_blends = np.where(turning, radii * np.tan(half_turns), 0.0)
+        corner_speeds = np.where(turning,
+                                 np.sqrt(acceleration * radii),
+                                 max_speed)
+
+    blend_distances = np.zeros(len(points))
+    blend_distances[1:-1] = corner_blends
+
+    speeds = np.empty(len(points))
+    speeds[0] = min(start_speed, segment_speeds[0])
+    speeds[1:-1] = np.minimum(corner_speeds,
+                              np.minimum(segment_speeds[:-1], segment_speeds[1:]))
+    speeds[-1] = 0.0
+    speeds = np.clip(speeds, 0.0, max_speed)
+
+    # Speed only changes on the straight part of a segment between the arcs
+    straight_lengths = np.maximum(
+        lengths - blend_distances[:-1] - blend_distances[1:], 0.0)
+    for i in range(len(points) - 2, -1, -1):
+        speeds[i] = min(speeds[i],
+                        np.sqrt(speeds[i + 1]**2
+                                + 2.0 * acceleration * straight_lengths[i]))
+    for i in range(1, len(points)):
+        speeds[i] = min(speeds[i],
+                        np.sqrt(speeds[i - 1]**2
+                                + 2.0 * acceleration * straight_lengths[i - 1]))
+
+    return blend_distances, speeds, segment_speeds
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+import numpy as np
+
+# Push away / push around potential field used by the obstacle avoiders
+#
+# Every obstacle closer than avoid_distance (with the distance shortened by
+# the speed towards it times predict_time) pushes the desired vector
+# directly away from itself with strength response_strength * violation**2,
+# and around itself, perpendicular to the obstacle and turning the way the
+# drone is already moving, with strength side_strength * violation.
+#
+# The whole obstacle array is handled with numpy at once. The contributions
+# are still added to the desired vector one obstacle at a time in the same
+# order as the original per obstacle loop, but that loop took its norms
+# with np.linalg.norm, whose BLAS dot product can round differently than
+# the plain sqrt used here, so the result is equal to that loop to within
+# floating point rounding.
+#
+# An obstacle exactly at the drone has no direction, it is treated as if it
+# was straight ahead along x.
+#
+# Args:
+#     obstacles: (N, 2) obstacle positions relative to the drone
+#     curr_vel: current horizontal velocity of the drone
+#     desired_vector: 3 element vector that the field is added to
+#
+# Returns: new 3 element desired vector
+def apply_potential_field(obstacles,
+                          curr_vel,
+                          desired_vector,
+                          avoid_distance,
+                          predict_time,
+                          response_strength,
+                          side_strength):
+    obstacles = np.asarray(obstacles, dtype=np.float64).reshape(-1, 2)
+    desired_vector = np.array(desired_vector, dtype=np.float64)
+    if len(obstacles) == 0:
+        return desired_vector
+
+    curr_vel = np.asarray(curr_vel, dtype=np.float64)
+    x = obstacles[:, 0]
+    y = obstacles[:, 1]
+
+    distances = np.sqrt(x * x + y * y)
+    degenerate = distances == 0
+    safe_distances = np.where(degenerate, 1.0, distances)
+    unit_x = np.where(degenerate, 1.0, x / safe_distances)
+    unit_y = np.where(degenerate, 0.0, y / safe_distances)
+
+    # Degenerate obstacles turn around the x axis instead of the obstacle
+    side_x = np.where(degenerate, unit_x, x)
+    side_y = np.where(degenerate, unit_y, y)
+
+    # z component of the cross product of the obstacle and the velocity
+    turn = x * curr_vel[1] - y * curr_vel[0]
+    turn = np.where(np.abs(turn) < 1e-6, 1.0, turn)
+
+    # Cross product of (0, 0, turn) and the obstacle, normalized
+    side_x, side_y = -(turn * side_y), turn * side_x
+    side_norm = np.sqrt(side_x * side_x + side_y * side_y)
+    unit_side_x = side_x / side_norm
+    unit_side_y = side_y / side_norm
+
+    rel_vel = unit_x * curr_vel[0] + unit_y * curr_vel[1]
+    violation = avoid_distance - distances + rel_vel * predict_time
+    violation = np.where(violation > 0, violation, 0.0)
+
+    push_away = violation**2
+    push_around = violation
+
+    # Rows alternate push away and push around for each obstacle, so one
+    # accumulate adds them in the same order as a loop would
+    terms = np.zeros((2 * len(obstacles) + 1, 3))
+    terms[0] = desired_vector
+    terms[1::2, 0] = (-unit_x * response_strength) * push_away
+    terms[1::2, 1] = (-unit_y * response_strength) * push_away
+    terms[2::2, 0] = (unit_side_x * push_around) * side_strength
+    terms[2::2, 1] = (unit_side_y * push_around) * side_strength
+    return np.add.accumulate(terms, axis=0)[-1]
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+import numpy as np
+
+from iarc_tasks.task_utilities.transform_utilities import transform_points
+
+# The state of every visible roomba relative to the drone
+#
+# Built once per tick from the roomba odometry, the drone odometry and the
+# map to level_quad transform, so the tasks that follow roombas do not each
+# look up a transform for their roomba.
+#
+# Attributes:
+#     ids: list of roomba ids, row i of every array belongs to ids[i]
+#     positions: (N, 3) roomba positions in the level_quad frame, which is
+#         the offset from the drone to the roomba
+#     velocities: (N, 2) horizontal roomba velocities
+#     velocity_differences: (N, 2) drone horizontal velocity minus the
+#         roomba horizontal velocity
+#     horizontal_distances: (N,) horizontal distance from the drone to each
+#         roomba
+class RelativeRoombaTable(object):
+    def __init__(self, roomba_array, drone_odometry, map_to_level_quad):
+        self.ids = [odometry.child_frame_id for odometry in roomba_array.data]
+        self._index = dict((id, i) for i, id in enumerate(self.ids))
+
+        count = len(self.ids)
+        map_positions = np.empty((count, 3))
+        self.velocities = np.empty((count, 2))
+        for i, odometry in enumerate(roomba_array.data):
+            position = odometry.pose.pose.position
+            map_positions[i] = (position.x, position.y, position.z)
+            velocity = odometry.twist.twist.linear
+            self.velocities[i] = (velocity.x, velocity.y)
+
+        drone_velocity = drone_odometry.twist.twist.linear
+        self._map_to_level_quad = map_to_level_quad
+        self.positions = transform_points(map_to_level_quad, map_positions)
+        self.velocity_differences = (np.array((drone_velocity.x,
+                                               drone_velocity.y))
+                                     - self.velocities)
+        self.horizontal_distances = np.hypot(self.positions[:, 0],
+                                             self.positions[:, 1])
+
+    # Returns (found, row) for the roomba with the given id, row indexes the
+    # arrays of the table
+    def get_row(self, id):
+        row = self._index.get(id)
+        return row is not None, row
+
+    # Convert (N, 2) horizontal map positions into horizontal offsets from
+    # the drone in the level_quad frame, level_quad is level so the height
+    # of the points does not matter
+    def to_level_quad(self, map_positions):
+        map_positions = np.asarray(map_positions, dtype=np.float64).reshape(-1, 2)
+        points = np.zeros((len(map_positions), 3))
+        points[:, :2] = map_positions
+        return transform_points(self._map_to_level_quad, points)[:, :2]
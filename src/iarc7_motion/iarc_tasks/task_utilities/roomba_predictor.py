@@ -0,0 +1,290 @@
+#!/usr/bin/env python
+import numpy as np
+import rospy
+
+# Constant velocity Kalman filter for every roomba in the roombas topic
+#
+# Every roomba id gets a filter over its map position and velocity, all of
+# the filters are stored in stacked arrays and updated together when an
+# OdometryArray arrives.
+#
+# The known IARC roomba behaviour is built in:
+#     Reversals: every roomba_reversal_period seconds a roomba stops and
+#         turns around in place, which takes roomba_reversal_duration
+#         seconds. The filter follows the roomba through the turn, a
+#         filtered velocity pointing against the direction the roomba was
+#         last seen moving in is taken as a reversal and its time is used as
+#         the phase of the reversal timer. Bumps into other roombas reverse
+#         a roomba as well but do not reset its timer, so the phase only
+#         moves to a reversal that lines up with an earlier one.
+#     Noise turns: every roomba_noise_period seconds the heading changes by
+#         a random angle of up to roomba_noise_angle. The turns have no
+#         mean so they only add process noise, perpendicular to the
+#         direction the roomba is moving.
+#
+# update returns a RoombaPrediction, which predicts the positions of all of
+# the roombas at any future time, reversals included.
+class RoombaPredictor(object):
+    def __init__(self):
+        try:
+            self._REVERSAL_PERIOD = rospy.get_param('~roomba_reversal_period')
+            self._REVERSAL_DURATION = rospy.get_param('~roomba_reversal_duration')
+            self._REVERSAL_MIN_SPEED = rospy.get_param('~roomba_reversal_min_speed')
+            noise_period = rospy.get_param('~roomba_noise_period')
+            noise_angle = rospy.get_param('~roomba_noise_angle')
+            acceleration_noise = rospy.get_param('~roomba_acceleration_noise')
+            position_noise = rospy.get_param('~roomba_position_noise')
+            velocity_noise = rospy.get_param('~roomba_velocity_noise')
+            self._TIMEOUT = rospy.get_param('~roomba_prediction_timeout')
+        except KeyError as e:
+            rospy.logerr('Could not lookup a parameter for roomba predictor')
+            raise
+
+        # White acceleration noise and heading noise per second, a uniform
+        # turn of up to noise_angle has a variance of noise_angle**2 / 3
+        self._ACCELERATION_VARIANCE = acceleration_noise**2
+        self._HEADING_VARIANCE_RATE = noise_angle**2 / 3.0 / noise_period
+
+        self._MEASUREMENT_COVARIANCE = np.diag((position_noise**2,
+                                                position_noise**2,
+                                                velocity_noise**2,
+                                                velocity_noise**2))
+
+        self._ids = []
+        # Filter state (x, y, vx, vy) and covariance of every roomba
+        self._states = np.zeros((0, 4))
+        self._covariances = np.zeros((0, 4, 4))
+        # Time in seconds of the last measurement of every roomba
+        self._stamps = np.zeros(0)
+        # Unit vector of the last direction every roomba was seen moving in,
+        # zero if it has not been seen moving yet
+        self._headings = np.zeros((0, 2))
+        # Start of the last periodic reversal and of the last reversal of
+        # any kind, NaN if none has been seen
+        self._reversal_phases = np.zeros(0)
+        self._last_reversals = np.zeros(0)
+
+    # Filter a roomba OdometryArray, must only be called from one thread
+    #
+    # Returns the RoombaPrediction after the update
+    def update(self, roomba_array):
+        ids = [odometry.child_frame_id for odometry in roomba_array.data]
+        count = len(ids)
+        measurements = np.empty((count, 4))
+        stamps = np.empty(count)
+        for i, odometry in enumerate(roomba_array.data):
+            position = odometry.pose.pose.position
+            velocity = odometry.twist.twist.linear
+            measurements[i] = (position.x, position.y, velocity.x, velocity.y)
+            stamps[i] = odometry.header.stamp.to_sec()
+
+        self._add_roombas(ids, measurements, stamps)
+
+        index = dict((id, i) for i, id in enumerate(self._ids))
+        rows = np.array([index[id] for id in ids], dtype=int)
+        self._predict(rows, stamps)
+        self._correct(rows, measurements, stamps)
+        self._remove_lost_roombas(stamps)
+
+        return RoombaPrediction(list(self._ids),
+                                self._stamps.copy(),
+                                self._states.copy(),
+                                self._reversal_phases.copy(),
+                                self._REVERSAL_PERIOD,
+                                self._REVERSAL_DURATION)
+
+    # Start filters for roombas that have not been seen before, their first
+    # predict and correct steps leave them at the measurement
+    def _add_roombas(self, ids, measurements, stamps):
+        known = set(self._ids)
+        new = [i for i, id in enumerate(ids) if id not in known]
+        if not new:
+            return
+
+        self._ids.extend(ids[i] for i in new)
+        self._states = np.vstack((self._states, measurements[new]))
+        self._covariances = np.vstack((
+            self._covariances,
+            np.tile(self._MEASUREMENT_COVARIANCE, (len(new), 1, 1))))
+        self._stamps = np.append(self._stamps, stamps[new])
+        self._headings = np.vstack((self._headings, np.zeros((len(new), 2))))
+        self._reversal_phases = np.append(self._reversal_phases,
+                                          np.full(len(new), np.nan))
+        self._last_reversals = np.append(self._last_reversals,
+                                         np.full(len(new), np.nan))
+
+    # Move the filters of rows forward to the measurement stamps
+    def _predict(self, rows, stamps):
+        dt = np.maximum(stamps - self._stamps[rows], 0.0)
+        states = self._states[rows]
+        states[:, :2] += states[:, 2:] * dt[:, np.newaxis]
+
+        transition = np.tile(np.identity(4), (len(rows), 1, 1))
+        transition[:, 0, 2] = dt
+        transition[:, 1, 3] = dt
+        covariances = np.matmul(np.matmul(transition, self._covariances[rows]),
+                                transition.transpose(0, 2, 1))
+
+        # Noise turns rotate the velocity, which is noise along
+        # (-vy, vx) with a variance that grows with the speed squared
+        perpendicular = np.stack((-states[:, 3], states[:, 2]), axis=1)
+        noise = (self._ACCELERATION_VARIANCE * np.identity(2)
+                 + self._HEADING_VARIANCE_RATE
+                   * perpendicular[:, :, np.newaxis]
+                   * perpendicular[:, np.newaxis, :])
+        dt = dt[:, np.newaxis, np.newaxis]
+        covariances[:, :2, :2] += noise * dt**3 / 3.0
+        covariances[:, :2, 2:] += noise * dt**2 / 2.0
+        covariances[:, 2:, :2] += noise * dt**2 / 2.0
+        covariances[:, 2:, 2:] += noise * dt
+
+        self._states[rows] = states
+        self._covariances[rows] = covariances
+        self._stamps[rows] = stamps
+
+    # Fuse the measurements into the filters of rows and look for reversals
+    def _correct(self, rows, measurements, stamps):
+        states = self._states[rows]
+        covariances = self._covariances[rows]
+
+        innovation_covariances = covariances + self._MEASUREMENT_COVARIANCE
+        # Both covariances are symmetric, so P * S^-1 = (S^-1 * P)^T
+        gains = np.linalg.solve(innovation_covariances,
+                                covariances).transpose(0, 2, 1)
+        states += np.einsum('nij,nj->ni', gains, measurements - states)
+        covariances = np.matmul(np.identity(4) - gains, covariances)
+        covariances = (covariances + covariances.transpose(0, 2, 1)) / 2.0
+
+        # Roombas only count as moving above the minimum speed, so the
+        # noise while they stand still turning around is ignored
+        speeds = np.hypot(states[:, 2], states[:, 3])
+        moving = speeds > self._REVERSAL_MIN_SPEED
+        headings = self._headings[rows]
+        reversals = moving & (np.sum(states[:, 2:] * headings, axis=1) < 0.0)
+
+        self._states[rows] = states
+        self._covariances[rows] = covariances
+        self._headings[rows] = np.where(
+            moving[:, np.newaxis],
+            states[:, 2:] / np.maximum(speeds, self._REVERSAL_MIN_SPEED)[:, np.newaxis],
+            headings)
+        self._update_reversal_phases(rows[reversals], stamps[reversals])
+
+    # The turn is over by the time the filtered velocity has flipped. A
+    # reversal is periodic if it lines up with the current phase or with the
+    # last reversal, otherwise it was a bump and the phase is kept.
+    def _update_reversal_phases(self, rows, stamps):
+        starts = stamps - self._REVERSAL_DURATION
+        phases = self._reversal_phases[rows]
+        last_reversals = self._last_reversals[rows]
+
+        periodic = (np.isnan(phases)
+                    | self._in_phase(starts, phases)
+                    | self._in_phase(starts, last_reversals))
+        self._reversal_phases[rows] = np.where(periodic, starts, phases)
+        self._last_reversals[rows] = starts
+
+    # Whether times are within a reversal duration of a whole number of
+    # reversal periods after references, False for NaN references
+    def _in_phase(self, times, references):
+        with np.errstate(invalid='ignore'):
+            offsets = np.mod(times - references, self._REVERSAL_PERIOD)
+            return ((offsets < self._REVERSAL_DURATION)
+                    | (offsets > self._REVERSAL_PERIOD - self._REVERSAL_DURATION))
+
+    # Forget roombas that have not been measured for a while
+    def _remove_lost_roombas(self, stamps):
+        if len(stamps) == 0:
+            return
+        keep = self._stamps >= np.max(stamps) - self._TIMEOUT
+        if np.all(keep):
+            return
+
+        self._ids = [id for id, kept in zip(self._ids, keep) if kept]
+        self._states = self._states[keep]
+        self._covariances = self._covariances[keep]
+        self._stamps = self._stamps[keep]
+        self._headings = self._headings[keep]
+        self._reversal_phases = self._reversal_phases[keep]
+        self._last_reversals = self._last_reversals[keep]
+
+
+# The filtered roombas after one update of the RoombaPredictor
+#
+# Never modified after it is built, so it can be shared between threads.
+#
+# Attributes:
+#     ids: list of roomba ids, row i of every array belongs to ids[i]
+#     stamps: (N,) time in seconds of the last measurement of each roomba
+#     positions: (N, 2) filtered map positions at the stamps
+#     velocities: (N, 2) filtered map velocities at the stamps
+class RoombaPrediction(object):
+    def __init__(self,
+                 ids,
+                 stamps,
+                 states,
+                 reversal_phases,
+                 reversal_period,
+                 reversal_duration):
+        self.ids = ids
+        self._index = dict((id, i) for i, id in enumerate(ids))
+        self.stamps = stamps
+        self.positions = states[:, :2]
+        self.velocities = states[:, 2:]
+        self._reversal_phases = reversal_phases
+        self._reversal_period = reversal_period
+        self._reversal_duration = reversal_duration
+
+    # Returns (found, row) for the roomba with the given id, row indexes the
+    # arrays of the prediction
+    def get_row(self, id):
+        row = self._index.get(id)
+        return row is not None, row
+
+    # Predict every roomba at each of times, given in seconds like
+    # rospy.Time.to_sec()
+    #
+    # Roombas keep their filtered velocity, reversing and standing still
+    # while they turn around if the phase of their reversals is known.
+    # Times before the stamp of a roomba give its filtered state.
+    #
+    # Returns (positions, velocities), both (N, len(times), 2) map arrays
+    def predict(self, times):
+        times = np.asarray(times, dtype=np.float64).reshape(-1)
+        dt = np.maximum(times[np.newaxis, :] - self.stamps[:, np.newaxis], 0.0)
+
+        known = ~np.isnan(self._reversal_phases)
+        since_reversal = np.where(
+            known,
+            np.mod(self.stamps - np.where(known, self._reversal_phases, 0.0),
+                   self._reversal_period),
+            0.0)[:, np.newaxis]
+
+        start_travel, _ = self._travel(since_reversal)
+        end_travel, direction = self._travel(since_reversal + dt)
+        travel = np.where(known[:, np.newaxis], end_travel - start_travel, dt)
+        direction = np.where(known[:, np.newaxis], direction, 1.0)
+
+        positions = (self.positions[:, np.newaxis, :]
+                     + self.velocities[:, np.newaxis, :] * travel[:, :, np.newaxis])
+        velocities = self.velocities[:, np.newaxis, :] * direction[:, :, np.newaxis]
+        return positions, velocities
+
+    # Distance travelled along the velocity at the start of a reversal
+    # period, in units of speed * seconds, and the direction of travel,
+    # times seconds after the start of the period
+    def _travel(self, times):
+        period = self._reversal_period
+        moving = period - self._reversal_duration
+
+        periods = np.floor(times / period)
+        odd = np.mod(periods, 2.0)
+        moved = np.clip(times - periods * period - self._reversal_duration,
+                        0.0,
+                        moving)
+        direction = 1.0 - 2.0 * odd
+
+        # Whole periods cancel out in pairs
+        travel = moving * odd + direction * moved
+        direction = np.where(moved > 0.0, direction, 0.0)
+        return travel, direction
@@ -0,0 +1,274 @@
+#!/usr/bin/env python
+import numpy as np
+
+# Axes are never given less than this fraction of the acceleration limit,
+# or of the speed limit unless that takes the drone over the max speed, so
+# an axis with almost no distance to cover can still cancel its starting
+# velocity
+_MIN_AXIS_SCALE = 0.1
+
+# Fraction that the combined acceleration may be over the limit by before
+# the profile is slowed down, so rounding does not trigger a second solve
+_ACCELERATION_TOLERANCE = 1e-9
+
+# Fraction that the speed may be over the max speed by before the profile
+# is solved again with tighter axis speed limits
+_SPEED_TOLERANCE = 1e-9
+
+# Largest speed scales max(k * shares, minimums) with k <= 1 that have a
+# norm of at most 1, the minimums must have a norm under 1
+#
+# Axes whose share is under their minimum sit at the minimum and the rest
+# grow with k, so going through the axes in the order they start growing
+# the norm can be solved for k on each interval.
+def _fit_speed_scales(shares, minimums):
+    scales = np.maximum(shares, minimums)
+    if np.linalg.norm(scales) <= 1.0:
+        return scales
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        breakpoints = np.where(shares > 0.0, minimums / shares, np.inf)
+    order = np.argsort(breakpoints)
+    for i in range(1, len(order) + 1):
+        growing = order[:i]
+        k = np.sqrt((1.0 - np.sum(minimums[order[i:]]**2))
+                    / np.sum(shares[growing]**2))
+        if i == len(order) or k <= breakpoints[order[i]]:
+            break
+    return np.maximum(k * shares, minimums)
+
+# Time optimal bang-coast-bang velocity profile from a position and velocity
+# to a stop on a target, with all of the axes finishing together
+#
+# Every axis accelerates at its acceleration limit to a coast velocity,
+# coasts and then decelerates to a stop on the target. The profile is solved
+# in closed form once and can then be sampled at any time.
+#
+# Each axis gets the speed and acceleration limits scaled by its share of
+# the straight line distance to the target, so a move that starts at rest
+# follows the straight line and stays within the limits. An axis that
+# starts out moving gets at least its share of the max speed, so it is not
+# left with too little acceleration to cancel its velocity, and the axis
+# speed limits are then normalized so they never add up to more than the
+# max speed. If an axis still slowing down to its limit takes a drone that
+# started under the max speed over it, the moving axes keep limits of at
+# least their starting speed instead and the other axes share the rest.
+# The slowest axis sets the duration, and the other axes are slowed down to
+# finish at the same time. The axis accelerations are then scaled down if
+# needed so the norm of the combined acceleration never goes over the
+# limit.
+#
+# Per axis the profile is normalized by s = sign(d - ds), where d is the
+# distance to the target and ds the stopping distance, so the first bang is
+# an acceleration towards the target. In the normalized frame:
+#     minimum time: vc = sqrt(a * d + v0**2 / 2), capped at vmax
+#     finishing at T with vc < v0: vc = (d - v0**2 / 2a) / (T - v0 / a)
+#     finishing at T with vc >= v0: the smaller root of
+#         vc**2 - vc * (v0 + a * T) + (v0**2 / 2 + a * d) = 0
+#
+# Attributes:
+#     start_time: rospy.Time that the profile starts at
+#     target: target position the profile stops on
+#     duration: length of the profile in seconds
+class SynchronizedProfile(object):
+    def __init__(self,
+                 start_time,
+                 positions,
+                 velocities,
+                 target,
+                 max_speed,
+                 acceleration):
+        self.start_time = start_time
+        self.target = np.array(target, dtype=np.float64)
+        self._start = np.array(positions, dtype=np.float64)
+        velocities = np.array(velocities, dtype=np.float64)
+
+        distances = self.target - self._start
+        distance = np.linalg.norm(distances)
+        if distance > 0.0:
+            shares = np.abs(distances) / distance
+        else:
+            shares = np.zeros(len(distances))
+        minimums = np.abs(velocities) / max_speed
+
+        # Raising the moving axes can make the axis speed limits add up to
+        # more than the max speed, so they are scaled back onto the unit
+        # sphere
+        scales = np.clip(np.maximum(shares, minimums), _MIN_AXIS_SCALE, 1.0)
+        self._solve_within_acceleration(
+            distances,
+            velocities,
+            scales / max(np.linalg.norm(scales), 1.0),
+            max_speed,
+            acceleration)
+
+        # An axis whose limit was scaled under its starting speed can still
+        # be slowing down while the others speed up to their limits. If
+        # that takes the drone over the max speed, every moving axis keeps
+        # a limit of at least its starting speed and the others share what
+        # is left, which bounds the speed at any time.
+        start_speed = np.linalg.norm(velocities)
+        if (start_speed < max_speed
+                and self._get_peak_speed()
+                    > max_speed * (1.0 + _SPEED_TOLERANCE)):
+            self._solve_within_acceleration(
+                distances,
+                velocities,
+                _fit_speed_scales(shares, minimums),
+                max_speed,
+                acceleration)
+
+    # Solve the phases with axis speed and acceleration limits scaled from
+    # the max speed and acceleration, then slow the profile down if the
+    # combined acceleration is over the limit
+    def _solve_within_acceleration(self,
+                                   distances,
+                                   velocities,
+                                   scales,
+                                   max_speed,
+                                   acceleration):
+        max_speeds = max_speed * scales
+        self._solve(distances,
+                    velocities,
+                    acceleration * np.clip(scales, _MIN_AXIS_SCALE, 1.0),
+                    max_speeds)
+
+        # The bangs of the axes do not all line up, so the combined
+        # acceleration is only known once the phases are solved. If it is
+        # over the limit every axis is slowed down by the same factor and
+        # the profile is solved again. The phases move when the profile is
+        # solved again, so if it is still over the limit the axis
+        # accelerations are scaled to add up to the limit, which bounds the
+        # combined acceleration at any time.
+        limit = acceleration * (1.0 + _ACCELERATION_TOLERANCE)
+        peak = self._get_peak_acceleration()
+        if peak > limit:
+            self._solve(distances,
+                        velocities,
+                        self._accelerations * (acceleration / peak),
+                        max_speeds)
+            if self._get_peak_acceleration() > limit:
+                self._solve(distances,
+                            velocities,
+                            self._accelerations
+                                * (acceleration
+                                   / np.linalg.norm(self._accelerations)),
+                            max_speeds)
+
+    # Solve the phases of every axis with the given axis acceleration and
+    # speed limits
+    def _solve(self, distances, velocities, accelerations, max_speeds):
+        self._accelerations = accelerations
+        a = self._accelerations
+
+        stopping_distances = velocities * np.abs(velocities) / (2.0 * a)
+        self._signs = np.where(distances >= stopping_distances, 1.0, -1.0)
+        d = self._signs * distances
+        v0 = self._signs * velocities
+        self._v0 = v0
+
+        coast = np.minimum(np.sqrt(np.maximum(a * d + v0**2 / 2.0, 0.0)),
+                           max_speeds)
+        self.duration = np.max(self._phase_times(coast, d)[3])
+
+        # Slow every axis down to finish at the duration
+        T = self.duration
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slow_denominators = T - v0 / a
+            slow = np.where(slow_denominators > 1e-9,
+                            (d - v0**2 / (2.0 * a)) / slow_denominators,
+                            v0)
+        b = v0 + a * T
+        c = v0**2 / 2.0 + a * d
+        fast = (b - np.sqrt(np.maximum(b**2 - 4.0 * c, 0.0))) / 2.0
+        use_slow = (v0 > 0.0) & (d <= v0 * T - v0**2 / (2.0 * a))
+        self._coast = np.maximum(np.where(use_slow, slow, fast), 0.0)
+
+        (self._ramp_accelerations,
+         self._ramp_times,
+         self._ramp_distances,
+         _) = self._phase_times(self._coast, d)
+        self._coast_times = np.maximum(
+            T - self._ramp_times - self._coast / a, 0.0)
+
+    # Times that each axis ends its first bang, starts its second bang and
+    # ends its second bang, and the sorted times in the profile where any
+    # axis changes phase
+    def _get_phase_changes(self):
+        ramp_ends = self._ramp_times
+        stop_starts = ramp_ends + self._coast_times
+        stop_ends = stop_starts + self._coast / self._accelerations
+
+        changes = np.unique(np.concatenate(
+            ((0.0, self.duration), ramp_ends, stop_starts, stop_ends)))
+        changes = changes[changes <= self.duration]
+        return ramp_ends, stop_starts, stop_ends, changes
+
+    # Largest norm of the combined acceleration of the axes, which only
+    # changes when one of the axes starts or ends a bang
+    def _get_peak_acceleration(self):
+        a = self._accelerations
+        ramp_ends, stop_starts, stop_ends, changes = self._get_phase_changes()
+        if len(changes) < 2:
+            return 0.0
+
+        middles = ((changes[:-1] + changes[1:]) / 2.0)[:, np.newaxis]
+        active = ((middles < ramp_ends)
+                  | ((middles > stop_starts) & (middles < stop_ends)))
+        return np.max(np.sqrt(np.sum(np.where(active, a**2, 0.0), axis=1)))
+
+    # Largest speed of the profile, every axis velocity is linear between
+    # phase changes so the squared speed is convex there and peaks at one
+    # of the changes
+    def _get_peak_speed(self):
+        return max(np.linalg.norm(self._sample(t)[1])
+                   for t in self._get_phase_changes()[3])
+
+    # Acceleration, time and distance of the first bang and the total time
+    # of the profile for each axis with coast velocities
+    def _phase_times(self, coast, d):
+        a = self._accelerations
+        ramp_accelerations = np.where(coast >= self._v0, a, -a)
+        ramp_times = np.abs(coast - self._v0) / a
+        ramp_distances = (coast**2 - self._v0**2) / (2.0 * ramp_accelerations)
+        stop_distances = coast**2 / (2.0 * a)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            coast_times = np.where(
+                coast > 0.0,
+                (d - ramp_distances - stop_distances) / coast,
+                0.0)
+        total_times = ramp_times + np.maximum(coast_times, 0.0) + coast / a
+        return ramp_accelerations, ramp_times, ramp_distances, total_times
+
+    # Get (positions, velocities) of the profile at a rospy.Time, holding
+    # the target once the profile is finished
+    def sample(self, time):
+        return self._sample((time - self.start_time).to_sec())
+
+    # Get (positions, velocities) of the profile t seconds after the start
+    def _sample(self, t):
+        t = min(max(t, 0.0), self.duration)
+        a = self._accelerations
+        v0 = self._v0
+        ramp_times = self._ramp_times
+        coast_ends = ramp_times + self._coast_times
+
+        # Ramp
+        ramp_t = np.minimum(t, ramp_times)
+        positions = v0 * ramp_t + self._ramp_accelerations * ramp_t**2 / 2.0
+        velocities = v0 + self._ramp_accelerations * ramp_t
+
+        # Coast
+        coast_t = np.clip(t - ramp_times, 0.0, self._coast_times)
+        positions += self._coast * coast_t
+        velocities = np.where(t > ramp_times, self._coast, velocities)
+
+        # Stop
+        stop_t = np.clip(t - coast_ends, 0.0, self._coast / a)
+        positions += self._coast * stop_t - a * stop_t**2 / 2.0
+        velocities = np.where(t > coast_ends, self._coast - a * stop_t, velocities)
+
+        if t >= self.duration:
+            return self.target.copy(), np.zeros(len(self.target))
+        return (self._start + self._signs * positions,
+                self._signs * velocities)
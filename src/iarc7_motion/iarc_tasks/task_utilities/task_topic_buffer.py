@@ -2,24 +2,40 @@ from nav_msgs.msg import Odometry
 
 from iarc7_msgs.msg import BoolStamped
 from iarc7_msgs.msg import OdometryArray
+from iarc7_safety.iarc_safety_exception import IARCFatalSafetyException
 from iarc7_motion.linear_motion_profile_generator import LinearMotionProfileGenerator
+from iarc7_motion.obstacle_cache import ObstacleCache
+from iarc7_motion.odometry_hub import OdometryHub
 
 from iarc_tasks.task_utilities.obstacle_avoid_helper import ObstacleAvoider
+from iarc_tasks.task_utilities.relative_roomba_table import RelativeRoombaTable
+from iarc_tasks.task_utilities.roomba_predictor import RoombaPredictor
+from iarc_tasks.task_utilities.transform_cache import TransformCache
+from iarc_tasks.task_utilities.transform_utilities import transform_to_matrix
+from iarc_tasks.task_utilities.world_state import WorldState
 
 import rospy
 import tf2_ros
 
 class TaskTopicBuffer(object):
+    task_topic_buffer = None
+
     def __init__(self):
         try:
             # startup timeout
             self._startup_timeout = rospy.Duration(rospy.get_param('~startup_timeout'))
+            # oldest transform that is still used, in seconds
+            transform_max_staleness = rospy.get_param('~transform_max_staleness')
         except KeyError as e:
             rospy.logerr('Could not lookup a parameter for task topic buffer')
             raise
         
         self._landed_message = None
-        self._roomba_array = None
+        # (generation, roomba array, dict of roomba odometry keyed by id,
+        # roomba prediction), replaced as a whole so readers always see a
+        # matching array, index and prediction
+        self._roombas = (0, None, {}, None)
+        self._roomba_predictor = RoombaPredictor()
         self._drone_odometry = None
         self._obstacle_avoider = None
 
@@ -31,16 +47,17 @@ class TaskTopicBuffer(object):
             'roombas', OdometryArray,
             self._receive_roomba_status)
 
-        self._current_velocity_sub = rospy.Subscriber(
-            '/odometry/filtered', Odometry,
+        OdometryHub.get_odometry_hub().add_listener(
             self._current_velocity_callback)
 
         self._tf_buffer = tf2_ros.Buffer()
         self._tf_listener = tf2_ros.TransformListener(self._tf_buffer)
+        self._transform_cache = TransformCache(self._tf_buffer,
+                                               transform_max_staleness)
         self._motion_profile_generator = LinearMotionProfileGenerator.get_linear_motion_profile_generator()
-        self._obstacle_avoider = ObstacleAvoider(self._tf_buffer)
-        self._obstacle_avoider.wait_until_ready(self._startup_timeout)
-
+        self._obstacle_cache = ObstacleCache(self._tf_buffer,
+                                             self._transform_cache)
+        self._obstacle_avoider = ObstacleAvoider(self._obstacle_cache)
 
         self._task_message_dictionary = {}
 
@@ -48,22 +65,37 @@ class TaskTopicBuffer(object):
             'roomba_tracking_status', Odometry,
             queue_size=10)
 
+    # The buffer shared by the coordinator and every task
+    @staticmethod
+    def get_task_topic_buffer():
+        if TaskTopicBuffer.task_topic_buffer is None:
+            TaskTopicBuffer.task_topic_buffer = TaskTopicBuffer()
+        return TaskTopicBuffer.task_topic_buffer
+
     def wait_until_ready(self, timeout):
         start_time = rospy.Time.now()
         rate = rospy.Rate(30)
         while not rospy.is_shutdown() and rospy.Time.now() - start_time < timeout:
             if (self.has_landing_message()
                     and self.has_odometry_message()
-                    and self.has_roomba_message()):
+                    and self.has_roomba_message()
+                    and self._obstacle_cache.has_obstacle_message()):
                 return
             rate.sleep()
         rospy.logerr('Have landing: %s', self.has_landing_message())
         rospy.logerr('Have odom: %s', self.has_odometry_message())
         rospy.logerr('Have roomba: %s', self.has_roomba_message())
+        rospy.logerr('Have obstacles: %s', self._obstacle_cache.has_obstacle_message())
         raise IARCFatalSafetyException('TaskTopicBuffer not ready')
 
+    # Indexes the roombas by id when the message arrives so lookups by id
+    # are constant time, and runs the roomba predictor
     def _receive_roomba_status(self, data):
-        self._roomba_array = data
+        roombas = {}
+        for odometry in data.data:
+            roombas[odometry.child_frame_id] = odometry
+        prediction = self._roomba_predictor.update(data)
+        self._roombas = (self._roombas[0] + 1, data, roombas, prediction)
 
     def _receive_landing_status(self, data):
         self._landed_message = data
@@ -75,7 +107,7 @@ class TaskTopicBuffer(object):
         return self._landed_message is not None
 
     def has_roomba_message(self):
-        return self._roomba_array is not None
+        return self._roombas[1] is not None
 
     def has_odometry_message(self):
         return self._drone_odometry is not None
@@ -84,21 +116,68 @@ class TaskTopicBuffer(object):
         return self._landed_message
 
     def get_roomba_message(self):
-        return self._roomba_array
+        return self._roombas[1]
 
     def get_roomba_odometry(self, id):
-        if self.has_roomba_message():
-            for odometry in self._roomba_array.data:
-                if odometry.child_frame_id == id:
-                    return True, odometry
-        return False, None
+        odometry = self._roombas[2].get(id)
+        return odometry is not None, odometry
+
+    # Latest RoombaPrediction or None
+    def get_roomba_prediction(self):
+        return self._roombas[3]
+
+    # Number of roomba messages received, changes whenever the roomba index
+    # is replaced
+    def get_roomba_generation(self):
+        return self._roombas[0]
 
     def get_odometry_message(self):
         return self._drone_odometry
 
+    # Take a snapshot of the latest messages for one coordinator tick
+    def get_world_state(self):
+        roomba_generation, roomba_array, roombas, roomba_prediction = \
+            self._roombas
+        drone_odometry = self._drone_odometry
+
+        time = rospy.Time.now()
+
+        return WorldState(time,
+                          drone_odometry,
+                          roomba_array,
+                          roombas,
+                          roomba_generation,
+                          roomba_prediction,
+                          lambda: self._get_relative_roomba_table(
+                              roomba_array, drone_odometry, time),
+                          self._obstacle_avoider.get_obstacle_points(),
+                          self._landed_message)
+
+    # Computes the state of all roombas relative to the drone with a single
+    # transform, extrapolated to the time of the tick
+    #
+    # Returns None if there is no data yet or the transform is not available
+    # or too old
+    def _get_relative_roomba_table(self, roomba_array, drone_odometry, time):
+        if roomba_array is None or drone_odometry is None:
+            return None
+
+        transform, staleness = self._transform_cache.get_transform(
+            'level_quad', 'map', time, extrapolate=True)
+        if not self._transform_cache.is_fresh(staleness):
+            rospy.logerr('TaskTopicBuffer: level_quad transform is not available or too old, staleness: %s', staleness)
+            return None
+
+        return RelativeRoombaTable(roomba_array,
+                                   drone_odometry,
+                                   transform_to_matrix(transform))
+
     def get_tf_buffer(self):
         return self._tf_buffer
 
+    def get_transform_cache(self):
+        return self._transform_cache
+
     def get_linear_motion_profile_generator(self):
         return self._motion_profile_generator
 
@@ -110,3 +189,6 @@ class TaskTopicBuffer(object):
 
     def get_obstacle_avoider(self):
         return self._obstacle_avoider
+
+    def get_obstacle_cache(self):
+        return self._obstacle_cache
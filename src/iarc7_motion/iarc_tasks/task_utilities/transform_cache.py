@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+import threading
+
+import rospy
+import tf2_ros
+
+from iarc_tasks.task_utilities.transform_utilities import extrapolate_transform
+
+# Non blocking access to the latest transforms in a tf2 buffer
+#
+# The control loop must never wait on TF, so get_transform only asks the
+# buffer for the latest transform it already has and returns right away.
+# The result comes with its staleness, the age of the newest transform data
+# it is based on, and the caller decides whether that is too old. The last
+# transform found for every pair of frames is kept, so a frame that stops
+# being published still gets an answer whose staleness keeps growing.
+#
+# The transform can also be extrapolated to the requested time using the
+# motion between the last two different transforms seen for the pair.
+class TransformCache(object):
+    def __init__(self, tf_buffer, max_staleness):
+        self._tf_buffer = tf_buffer
+        self._max_staleness = max_staleness
+        self._lock = threading.Lock()
+
+        # (target, source) -> (older transform or None, latest transform)
+        self._transforms = {}
+
+    # Get the latest transform from source to target
+    #
+    # Args:
+    #     now: rospy.Time to measure the staleness from and to extrapolate
+    #         to, defaults to rospy.Time.now()
+    #     extrapolate: extrapolate the transform to now
+    #
+    # Returns: (transform, staleness in seconds), or (None, None) if the
+    #     transform has never been available
+    def get_transform(self, target, source, now=None, extrapolate=False):
+        if now is None:
+            now = rospy.Time.now()
+
+        key = (target, source)
+        try:
+            transform = self._tf_buffer.lookup_transform(target,
+                                                         source,
+                                                         rospy.Time(0))
+        except (tf2_ros.LookupException,
+                tf2_ros.ConnectivityException,
+                tf2_ros.ExtrapolationException) as ex:
+            transform = None
+
+        with self._lock:
+            older, latest = self._transforms.get(key, (None, None))
+            if (transform is not None
+                and (latest is None
+                     or transform.header.stamp > latest.header.stamp)):
+                older, latest = latest, transform
+                self._transforms[key] = (older, latest)
+
+        if latest is None:
+            return None, None
+
+        staleness = (now - latest.header.stamp).to_sec()
+        if extrapolate and older is not None:
+            return extrapolate_transform(older, latest, now), staleness
+        return latest, staleness
+
+    # Check whether a staleness returned by get_transform is within the
+    # configured limit
+    def is_fresh(self, staleness):
+        return staleness is not None and staleness <= self._max_staleness
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+import copy
+import numpy as np
+
+# Helpers for working with TransformStamped messages in numpy, applying a
+# transform to many points at once instead of calling
+# tf2_geometry_msgs.do_transform_point for every point and extrapolating
+# transforms
+
+
+# Convert a geometry_msgs TransformStamped into a 4x4 homogeneous matrix
+def transform_to_matrix(transform):
+    q = transform.transform.rotation
+    t = transform.transform.translation
+    x, y, z, w = q.x, q.y, q.z, q.w
+
+    matrix = np.identity(4)
+    matrix[0, 0] = 1.0 - 2.0 * (y * y + z * z)
+    matrix[0, 1] = 2.0 * (x * y - z * w)
+    matrix[0, 2] = 2.0 * (x * z + y * w)
+    matrix[1, 0] = 2.0 * (x * y + z * w)
+    matrix[1, 1] = 1.0 - 2.0 * (x * x + z * z)
+    matrix[1, 2] = 2.0 * (y * z - x * w)
+    matrix[2, 0] = 2.0 * (x * z - y * w)
+    matrix[2, 1] = 2.0 * (y * z + x * w)
+    matrix[2, 2] = 1.0 - 2.0 * (x * x + y * y)
+    matrix[:3, 3] = (t.x, t.y, t.z)
+    return matrix
+
+
+# Transform an (N, 3) array of points with a 4x4 homogeneous matrix
+def transform_points(matrix, points):
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    return points.dot(matrix[:3, :3].T) + matrix[:3, 3]
+
+
+# Multiply two (x, y, z, w) quaternions
+def _quaternion_multiply(q1, q2):
+    x1, y1, z1, w1 = q1
+    x2, y2, z2, w2 = q2
+    return np.array((w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2,
+                     w1 * y2 - x1 * z2 + y1 * w2 + z1 * x2,
+                     w1 * z2 + x1 * y2 - y1 * x2 + z1 * w2,
+                     w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2))
+
+
+# Extrapolate a transform to time assuming it keeps moving with the constant
+# linear and angular velocity it had between older and newer
+#
+# Returns a copy of newer with the extrapolated translation, rotation and
+# stamp
+def extrapolate_transform(older, newer, time):
+    duration = (newer.header.stamp - older.header.stamp).to_sec()
+    result = copy.deepcopy(newer)
+    result.header.stamp = time
+    if duration <= 0.0:
+        return result
+    ratio = (time - newer.header.stamp).to_sec() / duration
+
+    t0 = older.transform.translation
+    t1 = newer.transform.translation
+    result.transform.translation.x = t1.x + (t1.x - t0.x) * ratio
+    result.transform.translation.y = t1.y + (t1.y - t0.y) * ratio
+    result.transform.translation.z = t1.z + (t1.z - t0.z) * ratio
+
+    r0 = older.transform.rotation
+    r1 = newer.transform.rotation
+    q0 = np.array((r0.x, r0.y, r0.z, r0.w))
+    q1 = np.array((r1.x, r1.y, r1.z, r1.w))
+
+    # Rotation from older to newer, taking the short way around
+    delta = _quaternion_multiply(q1, q0 * (-1.0, -1.0, -1.0, 1.0))
+    if delta[3] < 0.0:
+        delta = -delta
+    sin_half_angle = np.linalg.norm(delta[:3])
+    if sin_half_angle < 1e-12:
+        return result
+
+    # Scale the rotation angle by ratio and apply it after newer
+    half_angle = np.arctan2(sin_half_angle, delta[3]) * ratio
+    axis = delta[:3] / sin_half_angle
+    delta = np.append(axis * np.sin(half_angle), np.cos(half_angle))
+    q = _quaternion_multiply(delta, q1)
+    q /= np.linalg.norm(q)
+    (result.transform.rotation.x,
+     result.transform.rotation.y,
+     result.transform.rotation.z,
+     result.transform.rotation.w) = q
+    return result
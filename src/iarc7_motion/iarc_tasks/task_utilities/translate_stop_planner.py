@@ -6,10 +6,14 @@
 import math
 import threading
 
+import numpy as np
 import rospy
 
 from geometry_msgs.msg import TwistStamped
-from nav_msgs.msg import Odometry
+
+from iarc7_motion.odometry_hub import OdometryHub
+
+from iarc_tasks.task_utilities.synchronized_profile import SynchronizedProfile
 
 class TranslateStopPlanner():
     def __init__(self, x=None, y=None, z=None, ending_radius = None):
@@ -24,20 +28,30 @@ class TranslateStopPlanner():
         self._max_acceleration = rospy.get_param('~max_translation_acceleration', 0.0)
         self._desired_acceleration = rospy.get_param('~desired_translation_acceleration', 0.0)
         self._max_speed = rospy.get_param('~max_translation_speed', 0.0)
+        # trapezoidal or bang_coast_bang
+        self._mode = rospy.get_param('~translation_planner_mode', 'trapezoidal')
+        self._replan_distance = rospy.get_param('~translation_replan_distance', 0.0)
         if ending_radius is None:
             self._position_tolerance = rospy.get_param('~translation_position_hold_tolerance', 0.0)
         else: 
             self._position_tolerance = ending_radius
 
-        self._current_velocity_sub = rospy.Subscriber('/odometry/filtered',
-                                              Odometry,
-                                              self._current_velocity_callback)
         self._last_vel_x = None
         self._last_vel_y = None
         self._last_vel_z = None
         self._done = False
         self._last_actual_twist = None
         self._last_target_acceleration = 0.0
+        self._profile = None
+
+        # Registered last so the callback never sees a partly built planner
+        self._odometry_hub = OdometryHub.get_odometry_hub()
+        self._odometry_hub.add_listener(self._current_velocity_callback)
+
+    # Stop receiving odometry, must be called once the planner is no longer
+    # used or the planner will never be garbage collected
+    def shutdown(self):
+        self._odometry_hub.remove_listener(self._current_velocity_callback)
 
     def get_xyz_hold_response(self):
         with self._lock:
@@ -45,9 +59,14 @@ class TranslateStopPlanner():
                 delta_x = self._hold_x - self._odometry.pose.pose.position.x
                 delta_y = self._hold_y - self._odometry.pose.pose.position.y
                 delta_z = self._hold_z - self._odometry.pose.pose.position.z
-                response = self._get_next_acceleration_target_trapezoidal(delta_x,
-                                                                          delta_y,
-                                                                          delta_z)
+                if self._mode == 'bang_coast_bang':
+                    response = self._get_next_velocity_target_profile(delta_x,
+                                                                      delta_y,
+                                                                      delta_z)
+                else:
+                    response = self._get_next_acceleration_target_trapezoidal(delta_x,
+                                                                              delta_y,
+                                                                              delta_z)
             else:
                 rospy.logerr('get_xy_hold_response called before odometry published')
                 response = TwistStamped()
@@ -55,6 +74,13 @@ class TranslateStopPlanner():
                 response.header.frame_id = 'level_quad'
             return response
 
+    # Returns (max speed, acceleration) that the drone actually flies with.
+    # Tasks send the planner's velocities without an acceleration, so the
+    # coordinator ramps to them at its default acceleration, which
+    # desired_translation_acceleration matches in every mode.
+    def get_motion_limits(self):
+        return self._max_speed, self._desired_acceleration
+
     def reinit_translation_stop_planner(self, x=None, y=None, z=None):
         with self._lock:
             if not x is None:
@@ -221,5 +247,75 @@ class TranslateStopPlanner():
 
         return target_twist
 
+    # Follow a SynchronizedProfile to the hold position
+    #
+    # The profile is solved when the planner starts, when the hold position
+    # moves by more than half of the position tolerance, when the profile
+    # ends outside of the position tolerance and when the drone is further
+    # than translation_replan_distance from where the profile was one
+    # control lag ago. It starts from the current position and the last
+    # requested velocity, so the requests stay continuous. The profile is
+    # planned at desired_translation_acceleration, which is what the
+    # coordinator ramps the requested velocities at.
+    def _get_next_velocity_target_profile(self, x, y, z):
+        now = rospy.Time.now()
+        position = self._odometry.pose.pose.position
+        position = np.array((position.x, position.y, position.z))
+        target = np.array((self._hold_x, self._hold_y, self._hold_z))
+        distance = math.sqrt(x**2 + y**2 + z**2)
+
+        replan = (self._profile is None
+                  or (np.linalg.norm(target - self._profile.target)
+                      > self._position_tolerance / 2.0)
+                  or (self._profile_finished(now)
+                      and distance > self._position_tolerance)
+                  or (np.linalg.norm(
+                          position
+                          - self._profile.sample(
+                              now - rospy.Duration(self._control_lag))[0])
+                      > self._replan_distance))
+        if replan:
+            self._profile = SynchronizedProfile(
+                now,
+                position,
+                (self._last_vel_x, self._last_vel_y, self._last_vel_z),
+                target,
+                self._max_speed,
+                self._desired_acceleration)
+
+        # Request the velocity the profile has at the next update
+        _, velocity = self._profile.sample(
+            now + rospy.Duration(self._update_period))
+
+        target_twist = TwistStamped()
+        target_twist.header.stamp = now
+        target_twist.header.frame_id = 'level_quad'
+
+        if (distance <= self._position_tolerance
+            and self._profile_finished(now)):
+            self._done = True
+            rospy.logdebug('tolerance hit')
+        else:
+            target_twist.twist.linear.x = velocity[0]
+            target_twist.twist.linear.y = velocity[1]
+            target_twist.twist.linear.z = velocity[2]
+
+        # Cap the final speed request
+        requested_speed = np.linalg.norm(velocity)
+        if requested_speed > self._max_speed:
+            target_twist.twist.linear.x *= self._max_speed / requested_speed
+            target_twist.twist.linear.y *= self._max_speed / requested_speed
+            target_twist.twist.linear.z *= self._max_speed / requested_speed
+
+        self._last_vel_x = target_twist.twist.linear.x
+        self._last_vel_y = target_twist.twist.linear.y
+        self._last_vel_z = target_twist.twist.linear.z
+
+        return target_twist
+
+    def _profile_finished(self, time):
+        return (time - self._profile.start_time
+                >= rospy.Duration(self._profile.duration))
+
     def is_done(self):
         return self._done
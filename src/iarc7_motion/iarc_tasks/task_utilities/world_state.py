@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+
+# A snapshot of everything a task needs to know about the world for one
+# coordinator tick
+#
+# Built once per tick by TaskTopicBuffer.get_world_state and passed to
+# every task, so all of the decisions in a tick are made with the same data
+# and the same time. The snapshot is not updated after it is built and
+# should not be modified.
+#
+# Attributes:
+#     time: rospy.Time that the snapshot was taken, tasks should use this
+#         instead of rospy.Time.now()
+#     odometry: latest drone Odometry or None
+#     roomba_array: latest roomba OdometryArray or None
+#     roombas: dict of roomba Odometry messages keyed by child_frame_id,
+#         shared with the topic buffer so it must not be modified
+#     roomba_generation: number of roomba messages received when the
+#         snapshot was taken, equal generations mean the same roomba data
+#     roomba_prediction: RoombaPrediction made from the roomba data or None
+#     relative_roomba_source: function that builds the RelativeRoombaTable,
+#         called at most once by get_relative_roombas
+#     obstacles: (N, 2) numpy array of obstacle positions in level_quad
+#     landing_message: latest landing detected BoolStamped or None
+class WorldState(object):
+    def __init__(self,
+                 time,
+                 odometry,
+                 roomba_array,
+                 roombas,
+                 roomba_generation,
+                 roomba_prediction,
+                 relative_roomba_source,
+                 obstacles,
+                 landing_message):
+        self.time = time
+        self.odometry = odometry
+        self.roomba_array = roomba_array
+        self.roombas = roombas
+        self.roomba_generation = roomba_generation
+        self.roomba_prediction = roomba_prediction
+        self._relative_roomba_source = relative_roomba_source
+        self._relative_roombas = None
+        self.obstacles = obstacles
+        self.landing_message = landing_message
+
+    def has_odometry_message(self):
+        return self.odometry is not None
+
+    def has_roomba_message(self):
+        return self.roomba_array is not None
+
+    def has_landing_message(self):
+        return self.landing_message is not None
+
+    # Returns (found, odometry) for the roomba with the given id
+    def get_roomba_odometry(self, id):
+        odometry = self.roombas.get(id)
+        return odometry is not None, odometry
+
+    # Get the RelativeRoombaTable for this tick, or None if the transform to
+    # level_quad was not available
+    #
+    # The table is built the first time it is asked for, every later call
+    # in the same tick gets the same table
+    def get_relative_roombas(self):
+        if self._relative_roomba_source is not None:
+            self._relative_roombas = self._relative_roomba_source()
+            self._relative_roomba_source = None
+        return self._relative_roombas
+
+    # Predict the roomba with the given id at time
+    #
+    # Returns (found, position, velocity), the horizontal offset from the
+    # drone to where the roomba will be in the level_quad frame and the
+    # horizontal velocity it will have then. found is False if there is no
+    # prediction for the roomba or no RelativeRoombaTable.
+    def predict_relative_roomba(self, id, time):
+        relative_roombas = self.get_relative_roombas()
+        if self.roomba_prediction is None or relative_roombas is None:
+            return False, None, None
+
+        found, row = self.roomba_prediction.get_row(id)
+        if not found:
+            return False, None, None
+
+        positions, velocities = self.roomba_prediction.predict(time.to_sec())
+        position = relative_roombas.to_level_quad(positions[row])[0]
+        return True, position, velocities[row, 0]
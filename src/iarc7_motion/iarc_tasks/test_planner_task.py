@@ -22,7 +22,7 @@ class TestPlannerTask(AbstractTask):
         self._client.wait_for_server()
         self._plan_canceled = False
 
-    def get_desired_command(self):
+    def get_desired_command(self, world_state):
         goal = PlanGoal()
         goal.goal.motion_point.pose.position.x = 5
         goal.goal.motion_point.pose.position.y = 5
@@ -23,15 +23,15 @@ class TestTask(AbstractTask):
         self.aborted = False
         self.canceled = False
 
-    def get_desired_command(self):
+    def get_desired_command(self, world_state):
         if self.target is None:
-            self.target = rospy.Time.now() + rospy.Duration(1.5)
-            self.abort_time = rospy.Time.now() + rospy.Duration(0.75)
+            self.target = world_state.time + rospy.Duration(1.5)
+            self.abort_time = world_state.time + rospy.Duration(0.75)
 
-        result = self.target - rospy.Time.now()
+        result = self.target - world_state.time
 
         if self.abort > 0.5:
-            if self.abort_time < rospy.Time.now():
+            if self.abort_time < world_state.time:
                 rospy.loginfo("TestTask aborted")
                 return (TaskAborted(), result)
 
@@ -39,7 +39,7 @@ class TestTask(AbstractTask):
             rospy.loginfo("TestTask canceled")
             return (TaskCanceled(),)
 
-        if self.target  < rospy.Time.now():
+        if self.target  < world_state.time:
             rospy.loginfo("TestTask done")
             return (TaskDone(), result)
         else:
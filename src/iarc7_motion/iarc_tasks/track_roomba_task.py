@@ -2,12 +2,10 @@
 
 import math
 import rospy
-import tf2_ros
-import tf2_geometry_msgs
 import threading
 
 from nav_msgs.msg import Odometry
-from geometry_msgs.msg import TwistStamped, PointStamped
+from geometry_msgs.msg import TwistStamped
 
 from .abstract_task import AbstractTask
 from iarc_tasks.task_states import (TaskRunning,
@@ -52,10 +50,10 @@ class TrackRoombaTask(AbstractTask):
         self._lock = threading.RLock()
 
         try:
-            self._TRANSFORM_TIMEOUT = rospy.get_param('~transform_timeout')
             self._MAX_HORIZ_SPEED = rospy.get_param('~max_translation_speed')
             self._MAX_Z_VELOCITY = rospy.get_param('~max_z_velocity')
             self._MAX_ROOMBA_DIST = rospy.get_param('~max_roomba_dist')
+            self._MAX_PREDICTION_TIME = rospy.get_param('~roomba_max_prediction_time')
             TRACK_HEIGHT = rospy.get_param('~track_roomba_height')
             X_PID_SETTINGS = PidSettings(rospy.get_param('~track_roomba_pid_settings/x_terms'))
             Y_PID_SETTINGS = PidSettings(rospy.get_param('~track_roomba_pid_settings/y_terms'))
@@ -80,12 +78,12 @@ class TrackRoombaTask(AbstractTask):
         self._linear_motion_profile_generator = \
                 self.topic_buffer.get_linear_motion_profile_generator()
 
-    def get_desired_command(self):
+    def get_desired_command(self, world_state):
         with self._lock:
             if self._task_start_time is None:
-                self._task_start_time = rospy.Time.now()
+                self._task_start_time = world_state.time
 
-            if self._time_to_track != 0 and (rospy.Time.now()
+            if self._time_to_track != 0 and (world_state.time
                 - self._task_start_time >= rospy.Duration(self._time_to_track)):
                 rospy.loginfo('TrackRoombaTask has tracked the roomba for the specified duration')
                 return (TaskDone(),)
@@ -94,14 +92,14 @@ class TrackRoombaTask(AbstractTask):
                 return (TaskCanceled(),)
 
             if (self._state == TrackRoombaTaskState.init):
-                if (not self.topic_buffer.has_roomba_message()
-                 or not self.topic_buffer.has_odometry_message()):
+                if (not world_state.has_roomba_message()
+                 or not world_state.has_odometry_message()):
                     return (TaskRunning(), NopCommand())
                 else:
                     self._state = TrackRoombaTaskState.track
 
             if self._state == TrackRoombaTaskState.track:
-                odometry = self.topic_buffer.get_odometry_message()
+                odometry = world_state.odometry
 
                 # Check conditions that require aborting
                 if not (self._height_checker.above_min_maneuver_height(
@@ -112,50 +110,36 @@ class TrackRoombaTask(AbstractTask):
                     return (TaskAborted(msg='TrackRoombaTask: Z height error is too high'),)
 
                 (roomba_odom_available, roomba_odometry) = \
-                    self.topic_buffer.get_roomba_odometry(self._roomba_id)
+                    world_state.get_roomba_odometry(self._roomba_id)
 
                 if not roomba_odom_available:
                     return (TaskAborted(msg='TrackRoombaTask: The tracked roombas odometry is not available'),)
 
                 # Get the roomba's relative location
-                try:
-                    roomba_transform = self.topic_buffer.get_tf_buffer().lookup_transform(
-                                        'level_quad',
-                                        self._roomba_id,
-                                        rospy.Time(0),
-                                        rospy.Duration(self._TRANSFORM_TIMEOUT))
-                except (tf2_ros.LookupException,
-                        tf2_ros.ConnectivityException,
-                        tf2_ros.ExtrapolationException) as ex:
-                    rospy.logerr('TrackRoombaTask: Exception when looking up transform')
-                    rospy.logerr(ex.message)
+                relative_roombas = world_state.get_relative_roombas()
+                if relative_roombas is None:
                     return (TaskAborted(msg='Exception when looking up transform during TrackRoombaTask'),)
-                # Create point centered at drone's center (0,0,0)
-                stamped_point = PointStamped()
-                stamped_point.point.x = 0
-                stamped_point.point.y = 0
-                stamped_point.point.z = 0
-                # returns point distances of roomba to center point of level quad
-                roomba_point = tf2_geometry_msgs.do_transform_point(
-                                                    stamped_point, roomba_transform)
-                roomba_h_distance = math.sqrt(roomba_point.point.x**2 + roomba_point.point.y**2)
+                _, row = relative_roombas.get_row(self._roomba_id)
+
+                # point distances of roomba to center point of level quad
+                roomba_x_diff, roomba_y_diff = relative_roombas.positions[row, :2]
+                roomba_h_distance = relative_roombas.horizontal_distances[row]
 
                 if roomba_h_distance > self._MAX_ROOMBA_DIST:
                     return (TaskAborted(msg='The provided roomba is not found \
                                             or not close enough to the quad'),)
 
-                odometry = self.topic_buffer.get_odometry_message()
-                roomba_x_velocity = roomba_odometry.twist.twist.linear.x
-                roomba_y_velocity = roomba_odometry.twist.twist.linear.y
+                odometry = world_state.odometry
+                roomba_x_velocity, roomba_y_velocity = \
+                    relative_roombas.velocities[row]
 
-                x_v_diff = odometry.twist.twist.linear.x - roomba_x_velocity
-                y_v_diff = odometry.twist.twist.linear.y - roomba_y_velocity
+                x_v_diff, y_v_diff = relative_roombas.velocity_differences[row]
                 h_v_diff_mag = math.sqrt(x_v_diff**2 + y_v_diff**2)
 
                 roomba_track_msg = Odometry()
-                roomba_track_msg.header.stamp = rospy.Time.now()
-                roomba_track_msg.pose.pose.position.x = roomba_point.point.x
-                roomba_track_msg.pose.pose.position.y = roomba_point.point.y
+                roomba_track_msg.header.stamp = world_state.time
+                roomba_track_msg.pose.pose.position.x = roomba_x_diff
+                roomba_track_msg.pose.pose.position.y = roomba_y_diff
                 roomba_track_msg.pose.pose.position.z = roomba_h_distance
                 roomba_track_msg.twist.twist.linear.x = x_v_diff
                 roomba_track_msg.twist.twist.linear.y = y_v_diff
@@ -167,7 +151,7 @@ class TrackRoombaTask(AbstractTask):
                    and roomba_h_distance <= self._LOCK_DISTANCE \
                    and h_v_diff_mag <= self._LOCK_VELOCITY:
                     if self._lock_start_time is not None:
-                        if rospy.Time.now() - self._lock_start_time > self._LOCK_REQUIRED_DURATION:
+                        if world_state.time - self._lock_start_time > self._LOCK_REQUIRED_DURATION:
                             rospy.loginfo('TrackRoombaTask has locked on the roomba for the required amount of time')
 
                             task_messages = self.topic_buffer.get_task_message_dictionary()
@@ -176,43 +160,62 @@ class TrackRoombaTask(AbstractTask):
 
                             return (TaskDone(),)
                     else:
-                        self._lock_start_time = rospy.Time.now()
+                        self._lock_start_time = world_state.time
                 else:
                     self._lock_start_time = None
 
+                # Aim at where the roomba will be when the drone gets there
+                lookahead = min(roomba_h_distance / self._MAX_HORIZ_SPEED,
+                                self._MAX_PREDICTION_TIME)
+                predicted, target_diff, target_velocity = \
+                    world_state.predict_relative_roomba(
+                        self._roomba_id,
+                        world_state.time + rospy.Duration(lookahead))
+                if not predicted:
+                    target_diff = (roomba_x_diff, roomba_y_diff)
+                    target_velocity = (roomba_x_velocity, roomba_y_velocity)
+                target_x_velocity, target_y_velocity = target_velocity
+
+                # The overshoot follows the direction the roomba will be
+                # moving in, or the current one while it turns around
+                if target_x_velocity == 0.0 and target_y_velocity == 0.0:
+                    heading = math.atan2(roomba_y_velocity, roomba_x_velocity)
+                else:
+                    heading = math.atan2(target_y_velocity, target_x_velocity)
+
                 # Calculate the overshoot distance in the drones frame
                 overshoot = math.sqrt(self._x_overshoot**2 + self._y_overshoot**2)
-                x_overshoot = overshoot * math.cos(math.atan2(roomba_y_velocity, roomba_x_velocity)
-                                                        + math.atan2(self._y_overshoot, self._x_overshoot))
-                y_overshoot = overshoot * math.sin(math.atan2(roomba_y_velocity, roomba_x_velocity )
-                                                        + math.atan2(self._y_overshoot, self._x_overshoot))
+                x_overshoot = overshoot * math.cos(heading
+                                                   + math.atan2(self._y_overshoot, self._x_overshoot))
+                y_overshoot = overshoot * math.sin(heading
+                                                   + math.atan2(self._y_overshoot, self._x_overshoot))
 
                 # Find distance between the drones position and the desired position
-                x_p_diff = roomba_point.point.x + x_overshoot
-                y_p_diff = roomba_point.point.y + y_overshoot
+                x_p_diff = target_diff[0] + x_overshoot
+                y_p_diff = target_diff[1] + y_overshoot
 
-                x_success, x_response = self._x_pid.update(x_p_diff, rospy.Time.now(), False)
-                y_success, y_response = self._y_pid.update(y_p_diff, rospy.Time.now(), False)
+                x_success, x_response = self._x_pid.update(x_p_diff, world_state.time, False)
+                y_success, y_response = self._y_pid.update(y_p_diff, world_state.time, False)
 
                 # PID controller does setpoint - current;
-                # the difference from do_transform_point is from the drone to the roomba,
+                # the difference from the roomba table is from the drone to the roomba,
                 # which is the equivalent of current-setpoint, so take the negative response
                 # This is done so that  the drones position in the map frame doesn't
                 # have to be calculated
                 if x_success:
-                    x_vel_target = -x_response + roomba_x_velocity
+                    x_vel_target = -x_response + target_x_velocity
                 else:
-                    x_vel_target = roomba_x_velocity
+                    x_vel_target = target_x_velocity
 
                 if y_success:
-                    y_vel_target = -y_response + roomba_y_velocity
+                    y_vel_target = -y_response + target_y_velocity
                 else:
-                    y_vel_target = roomba_y_velocity
+                    y_vel_target = target_y_velocity
 
                 # Get the z response
                 predicted_motion_point = \
                     self._linear_motion_profile_generator.expected_point_at_time(
-                        rospy.Time.now())
+                        world_state.time)
 
                 current_height = odometry.pose.pose.position.z
                 predicted_height = \
@@ -237,7 +240,7 @@ class TrackRoombaTask(AbstractTask):
 
                 velocity = TwistStamped()
                 velocity.header.frame_id = 'level_quad'
-                velocity.header.stamp = rospy.Time.now()
+                velocity.header.stamp = world_state.time
                 velocity.twist.linear.x = desired_vel[0]
                 velocity.twist.linear.y = desired_vel[1]
                 velocity.twist.linear.z = desired_vel[2]
@@ -2,11 +2,9 @@
 
 import math
 import rospy
-import tf2_ros
-import tf2_geometry_msgs
 import threading
 
-from geometry_msgs.msg import TwistStamped, PointStamped, Point
+from geometry_msgs.msg import TwistStamped
 
 from .abstract_task import AbstractTask
 
@@ -41,7 +39,6 @@ class VelocityTask(AbstractTask):
         self._lock = threading.RLock()
 
         try:
-            self._TRANSFORM_TIMEOUT = rospy.get_param('~transform_timeout')
             self._MAX_TRANSLATION_SPEED = rospy.get_param('~max_translation_speed')
             self._MAX_Z_VELOCITY = rospy.get_param('~max_z_velocity')
             self._MAX_TIME_DURATION = rospy.Duration(rospy.get_param('~max_velocity_time_duration'))
@@ -72,35 +69,35 @@ class VelocityTask(AbstractTask):
 
         self._linear_motion_profile_generator = self.topic_buffer.get_linear_motion_profile_generator()
 
-    def get_desired_command(self):
+    def get_desired_command(self, world_state):
         with self._lock:
 
             if self._canceled:
                 return (TaskCanceled(),)
 
             if (self._state == VelocityTaskState.init):
-                if not self.topic_buffer.has_odometry_message():
+                if not world_state.has_odometry_message():
                     self._state = VelocityTaskState.waiting
                 else:
                     self._state = VelocityTaskState.moving
-                    self._start_time = rospy.Time.now()
+                    self._start_time = world_state.time
 
             if (self._state == VelocityTaskState.waiting):
-                if not self.topic_buffer.has_odometry_message():
+                if not world_state.has_odometry_message():
                     return (TaskRunning(), NopCommand())
                 else:
                     self._state = VelocityTaskState.moving
-                    self._start_time = rospy.Time.now()
+                    self._start_time = world_state.time
 
             if self._state == VelocityTaskState.moving:
 
-                if rospy.Time.now() - self._start_time > self._time_duration:
+                if world_state.time - self._start_time > self._time_duration:
                     return (TaskDone(), )
 
                 predicted_motion_point = self._linear_motion_profile_generator.expected_point_at_time(
-                                           rospy.Time.now())
+                                           world_state.time)
 
-                odometry = self.topic_buffer.get_odometry_message()
+                odometry = world_state.odometry
 
                 current_height = odometry.pose.pose.position.z
                 predicted_height = predicted_motion_point.motion_point.pose.position.z
@@ -137,7 +134,7 @@ class VelocityTask(AbstractTask):
 
                 velocity = TwistStamped()
                 velocity.header.frame_id = 'level_quad'
-                velocity.header.stamp = rospy.Time.now()
+                velocity.header.stamp = world_state.time
                 velocity.twist.linear.x = desired_vel[0]
                 velocity.twist.linear.y = desired_vel[1]
                 velocity.twist.linear.z = desired_vel[2]
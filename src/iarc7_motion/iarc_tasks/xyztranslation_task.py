@@ -1,6 +1,5 @@
 import math
 import rospy
-import tf2_ros
 
 from geometry_msgs.msg import TwistStamped
 
@@ -33,7 +32,6 @@ class XYZTranslationTask(AbstractTask):
 
         try:
             self._TRANSLATION_XYZ_TOLERANCE = rospy.get_param('~translation_xyz_tolerance')
-            self._TRANSFORM_TIMEOUT = rospy.get_param('~transform_timeout')
             self._MIN_MANEUVER_HEIGHT = rospy.get_param('~min_maneuver_height')
         except KeyError as e:
             rospy.logerr('Could not lookup a parameter for xyztranslation task')
@@ -51,7 +49,7 @@ class XYZTranslationTask(AbstractTask):
                                                  self._z_position)
         self._state = XYZTranslationTaskState.init
 
-    def get_desired_command(self):
+    def get_desired_command(self, world_state):
         if self._canceled:
             return (TaskCanceled(),)
 
@@ -59,17 +57,13 @@ class XYZTranslationTask(AbstractTask):
             self._state = XYZTranslationTaskState.translate
 
         if self._state == XYZTranslationTaskState.translate:
-            try:
-                transStamped = self.topic_buffer.get_tf_buffer().lookup_transform(
-                        'map',
-                        'quad',
-                        rospy.Time(0),
-                        rospy.Duration(self._TRANSFORM_TIMEOUT))
-            except (tf2_ros.LookupException,
-                    tf2_ros.ConnectivityException,
-                    tf2_ros.ExtrapolationException) as ex:
-                rospy.logerr('XYZTranslation Task: Exception when looking up transform')
-                rospy.logerr(ex.message)
+            transStamped, staleness = self.topic_buffer.get_transform_cache().get_transform(
+                    'map',
+                    'quad',
+                    world_state.time)
+            if not self.topic_buffer.get_transform_cache().is_fresh(staleness):
+                rospy.logerr('XYZTranslation Task: Transform is not available or too old')
+                rospy.logerr('Transform staleness: %s', staleness)
                 return (TaskAborted(msg = 'Exception when looking up transform during xyztranslation'),)
             
             if(transStamped.transform.translation.z > self._MIN_MANEUVER_HEIGHT):
@@ -90,3 +84,6 @@ class XYZTranslationTask(AbstractTask):
     
     def set_incoming_transition(self, transition):
         self._transition = transition
+
+    def shutdown(self):
+        self._path_holder.shutdown()
@@ -1,19 +1,20 @@
 #!/usr/bin/env python
 import rospy
-import threading
-import tf2_geometry_msgs
-import tf2_ros
 import numpy as np
 
 from math import sin, cos, atan2, pi
 
 from iarc7_safety.iarc_safety_exception import IARCSafetyException
-from iarc7_msgs.msg import ObstacleArray
-from geometry_msgs.msg import PointStamped
 
+from iarc_tasks.task_utilities.potential_field import apply_potential_field
+
+# Pushes the drone away from obstacles while no task is running
+#
+# Reads the obstacles from an ObstacleCache shared with the task side
+# obstacle avoider
 class IdleObstacleAvoider(object):
-    def __init__(self):
-        self._lock = threading.RLock()
+    def __init__(self, obstacle_cache):
+        self._obstacle_cache = obstacle_cache
 
         self._avoid_distance = rospy.get_param('~obst_avoid_avoid_distance')
         self._predict_time = rospy.get_param('~obst_avoid_predict_time')
@@ -26,93 +27,33 @@ class IdleObstacleAvoider(object):
         self._obstacle_radius = rospy.get_param("~obst_idle_avoid_radius")
         # Step size used when searching for alternative vectors when the requested vector is unsafe
         self._vector_step_size = rospy.get_param("~obst_avoid_step_size")
-        # Transform timeout
-        self._timeout = rospy.Duration(rospy.get_param("~transform_timeout"))
-        self._obstacle_points = None
-
-        self._tf_buffer = tf2_ros.Buffer()
-        self._tf_listener = tf2_ros.TransformListener(self._tf_buffer)
-
-        with self._lock:
-            self._obstacle_subscriber = rospy.Subscriber("/obstacles", ObstacleArray, self._update_obstacles)
 
     def wait_until_ready(self, startup_timeout):
-        while (rospy.Time.now() == rospy.Time(0) and not rospy.is_shutdown()):
-            # Wait for time to be initialized
-            rospy.sleep(0.005)
-        if rospy.is_shutdown():
-            raise rospy.ROSInterruptException()
-
-        start_time = rospy.Time.now()
-
-        while ((self._obstacle_points is None)
-               and rospy.Time.now() < start_time + startup_timeout
-               and not rospy.is_shutdown()):
-            rospy.sleep(0.005)
-        if rospy.Time.now() >= start_time + startup_timeout:
-            raise IARCFatalSafetyException('SafetyMonitor timed out on startup')
-        if rospy.is_shutdown():
-            raise rospy.ROSInterruptException()
-
-    def _update_obstacles(self, obstacles):
-        with self._lock:
-            self._obstacle_points = []
-            try:
-                # Convert each obstacle into a numpy vector from the quad frame
-                transform = self._tf_buffer.lookup_transform('level_quad', obstacles.header.frame_id, obstacles.header.stamp, self._timeout)
-                for obstacle in obstacles.obstacles:
-                    obstacle_point = PointStamped(header=obstacle.odom.header, point=obstacle.odom.pose.pose.position)
-                    obstacle_point = tf2_geometry_msgs.do_transform_point(obstacle_point, transform)
-                    obstacle_point = np.array([obstacle_point.point.x, obstacle_point.point.y])
-                    self._obstacle_points.append(obstacle_point)
-            except (tf2_ros.LookupException,
-                    tf2_ros.ConnectivityException,
-                    tf2_ros.ExtrapolationException) as ex:
-                rospy.logwarn("ObstacleAvoider Couldn't lookup transform from {} to level_quad".format(obstacles.header.frame_id))
+        self._obstacle_cache.wait_until_ready(startup_timeout)
 
     def get_distance_to_obstacle(self):
-        with self._lock:
-            return min([float('Inf')]
-                     + [np.linalg.norm(obstacle)
-                        for obstacle in self._obstacle_points])
+        obstacle_points = self._obstacle_cache.get_obstacle_points()
+        return min([float('Inf')]
+                 + [np.linalg.norm(obstacle)
+                    for obstacle in obstacle_points])
 
     def get_safest(self, curr_vel):
         #original_vector_magnitude = np.linalg.norm(desired_vector[:2])
         #original_vector_direction = atan2(desired_vector[1], desired_vector[0])
         curr_vel = np.array(curr_vel)
-        desired_vector = np.array([0, 0, 0], dtype=np.float)
-        with self._lock:
-            for obstacle in self._obstacle_points:
-                if np.linalg.norm(obstacle) == 0:
-                    unit_vector = np.array([1, 0, 0])
-                else:
-                    unit_vector = obstacle / np.linalg.norm(obstacle)
-                away_unit_vector = -unit_vector
-
-                turn_dir = np.array([0, 0, np.cross(obstacle, curr_vel)])
-                if np.linalg.norm(turn_dir) < 1e-6:
-                    turn_dir = np.array([0, 0, 1])
-
-                side_vector = np.cross(turn_dir, obstacle)
-                unit_side = side_vector / np.linalg.norm(side_vector)
-
-                rel_vel = np.dot(unit_vector, curr_vel)
-                violation = max(0,
-                                self._avoid_distance
-                              - np.linalg.norm(obstacle)
-                              + rel_vel * self._predict_time)
-
-                # Push away
-                desired_vector[:2] += away_unit_vector \
-                        * self._response_strength * violation**2
-
-                # Push around
-                desired_vector += unit_side * violation * 0.3
-
-            # Decide which acceleration to use
-            dv = np.linalg.norm(curr_vel - desired_vector[:2])
-            acceleration = max(min(1.0, dv * 3), 0.1)
-            return desired_vector, acceleration
+        desired_vector = apply_potential_field(
+            self._obstacle_cache.get_obstacle_points(),
+            curr_vel,
+            np.array([0, 0, 0], dtype=np.float),
+            self._avoid_distance,
+            self._predict_time,
+            self._response_strength,
+            0.3)
+
+        # Decide which acceleration to use
+        dv = np.linalg.norm(curr_vel - desired_vector[:2])
+        acceleration = max(min(1.0, dv * 3), 0.1)
+        return desired_vector, acceleration
         #with self._lock:
         #    regions = []
         #    startOpenRegion = None
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+
+import threading
+
+from diagnostic_msgs.msg import DiagnosticStatus, KeyValue
+
+from iarc7_motion.control_loop_scheduler import monotonic_time
+
+
+# A lock that records how long threads wait for it and how long it is held
+#
+# Works as a drop in replacement for threading.RLock (or threading.Lock when
+# reentrant is False) including use in with statements. For a reentrant lock
+# the hold time is measured from the outermost acquire to the matching
+# release.
+#
+# The statistics are only updated by the thread holding the lock, so reading
+# them needs no extra locking, readers may just see a slightly stale value.
+# Every lock registers itself so that get_lock_diagnostics can report all of
+# them.
+class InstrumentedLock(object):
+    _all_locks = []
+    _all_locks_lock = threading.Lock()
+
+    def __init__(self, name, reentrant=True):
+        self._name = name
+        self._lock = threading.RLock() if reentrant else threading.Lock()
+
+        # Only modified by the thread holding the lock
+        self._depth = 0
+        self._acquired_time = None
+
+        self._acquisitions = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._total_hold = 0.0
+        self._max_hold = 0.0
+
+        with InstrumentedLock._all_locks_lock:
+            InstrumentedLock._all_locks.append(self)
+
+    def acquire(self, blocking=True):
+        start = monotonic_time()
+        if not self._lock.acquire(blocking):
+            return False
+
+        self._depth += 1
+        if self._depth == 1:
+            self._acquired_time = monotonic_time()
+            wait = self._acquired_time - start
+            self._acquisitions += 1
+            self._total_wait += wait
+            self._max_wait = max(self._max_wait, wait)
+        return True
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            hold = monotonic_time() - self._acquired_time
+            self._total_hold += hold
+            self._max_hold = max(self._max_hold, hold)
+        self._lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+    def get_name(self):
+        return self._name
+
+    # Get the number of acquisitions and the total and max wait and hold
+    # times in seconds
+    def get_stats(self):
+        return (self._acquisitions,
+                self._total_wait,
+                self._max_wait,
+                self._total_hold,
+                self._max_hold)
+
+    def get_diagnostic_status(self):
+        acquisitions, total_wait, max_wait, total_hold, max_hold = \
+            self.get_stats()
+
+        status = DiagnosticStatus()
+        status.level = DiagnosticStatus.OK
+        status.name = 'lock: ' + self._name
+        status.hardware_id = 'none'
+        status.message = 'Lock statistics'
+
+        values = [('acquisitions', acquisitions),
+                  ('mean wait time', total_wait / max(acquisitions, 1)),
+                  ('max wait time', max_wait),
+                  ('mean hold time', total_hold / max(acquisitions, 1)),
+                  ('max hold time', max_hold)]
+        status.values = [KeyValue(key, str(value)) for key, value in values]
+        return status
+
+
+# Get a DiagnosticStatus for every InstrumentedLock that has been created
+def get_lock_diagnostics():
+    with InstrumentedLock._all_locks_lock:
+        locks = list(InstrumentedLock._all_locks)
+    return [lock.get_diagnostic_status() for lock in locks]
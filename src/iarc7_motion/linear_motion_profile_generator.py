@@ -3,82 +3,34 @@
 import rospy
 import numpy as np
 
+from diagnostic_msgs.msg import DiagnosticStatus, KeyValue
 from geometry_msgs.msg import PoseStamped
 
 from nav_msgs.msg import Path
 
 from iarc7_msgs.msg import MotionPointStamped, MotionPointStampedArray
 
-
-# Convert a 3 element numpy array to a Vector3 message
-def np_to_msg(array, msg):
-    msg.x = array[0]
-    msg.y = array[1]
-    msg.z = array[2]
-    return msg
-
-
-# Convert a Vector3 message to 3 element numpy array
-def msg_to_np(msg):
-    return np.array([msg.x, msg.y, msg.z])
-
-
-# Interpolate two values
-def interpolate(first, second, fraction):
-    return fraction * (second - first) + first
-
-
-# Interpolate two motion points
-def interpolate_motion_points(first, second, time):
-    fraction = ((time - first.header.stamp) /
-                (second.header.stamp - first.header.stamp))
-
-    result = MotionPointStamped()
-    result.header.stamp = time
-
-    result.motion_point.pose.position.x = interpolate(
-        first.motion_point.pose.position.x,
-        second.motion_point.pose.position.x, fraction)
-    result.motion_point.pose.position.y = interpolate(
-        first.motion_point.pose.position.y,
-        second.motion_point.pose.position.y, fraction)
-    result.motion_point.pose.position.z = interpolate(
-        first.motion_point.pose.position.z,
-        second.motion_point.pose.position.z, fraction)
-
-    result.motion_point.twist.linear.x = interpolate(
-        first.motion_point.twist.linear.x, second.motion_point.twist.linear.x,
-        fraction)
-    result.motion_point.twist.linear.y = interpolate(
-        first.motion_point.twist.linear.y, second.motion_point.twist.linear.y,
-        fraction)
-    result.motion_point.twist.linear.z = interpolate(
-        first.motion_point.twist.linear.z, second.motion_point.twist.linear.z,
-        fraction)
-
-    result.motion_point.accel.linear.x = interpolate(
-        first.motion_point.accel.linear.x, second.motion_point.accel.linear.x,
-        fraction)
-    result.motion_point.accel.linear.y = interpolate(
-        first.motion_point.accel.linear.y, second.motion_point.accel.linear.y,
-        fraction)
-    result.motion_point.accel.linear.z = interpolate(
-        first.motion_point.accel.linear.z, second.motion_point.accel.linear.z,
-        fraction)
-
-    return result
+from iarc7_motion.motion_profile import MotionProfile, np_to_msg, msg_to_np
 
 
 # Generates fully defined motion profiles
+#
+# Plans are generated from the motion coordinator thread while tasks and the
+# idle obstacle avoider read the last plan from their own threads. The last
+# plan is an immutable MotionProfile that is replaced with a single reference
+# assignment, so readers always see a complete plan without taking a lock.
 class LinearMotionProfileGenerator(object):
     def __init__(self,
                  start_motion_point,
                  target_accel=None,
                  max_target_accel=None,
                  plan_duration=None,
-                 profile_timestep=None):
-        self._last_motion_plan = MotionPointStampedArray()
-        self._last_motion_plan.motion_points = [start_motion_point]
+                 profile_timestep=None,
+                 reuse_tolerance=None,
+                 profile_mode=None,
+                 jerk=None):
+        self._last_motion_plan = MotionProfile.from_motion_point(
+            start_motion_point)
 
         try:
             if target_accel is None:
@@ -105,16 +57,50 @@ class LinearMotionProfileGenerator(object):
             else:
                 self._PROFILE_TIMESTEP = profile_timestep
 
+            if reuse_tolerance is None:
+                self._REUSE_TOLERANCE = rospy.get_param(
+                    '~linear_motion_profile_reuse_tolerance')
+            else:
+                self._REUSE_TOLERANCE = reuse_tolerance
+
+            # Either 'linear' for constant acceleration ramps or 's_curve'
+            # for jerk limited ramps
+            if profile_mode is None:
+                self._PROFILE_MODE = rospy.get_param(
+                    '~linear_motion_profile_mode')
+            else:
+                self._PROFILE_MODE = profile_mode
+
+            if jerk is None:
+                self._JERK = rospy.get_param('~linear_motion_profile_jerk')
+            else:
+                self._JERK = jerk
+
         except KeyError as e:
             rospy.logerr(
                 'Could not lookup a parameter for linear motion profile generator'
             )
             raise
 
+        if self._PROFILE_MODE not in _PROFILE_MODES:
+            raise ValueError('Unknown linear motion profile mode: {}'.format(
+                self._PROFILE_MODE))
+
         self._last_stamp = rospy.Time.now()
 
-        self._override_start_position = None
-        self._override_start_velocity = None
+        # Start point override as a (position, velocity) tuple of Vector3s
+        self._override_start = None
+
+        # Target velocity, acceleration and profile mode that the last plan
+        # was built for
+        self._last_command = None
+
+        # Number of plans requested and number of plans that were served by
+        # extending the last plan
+        self._plan_requests = 0
+        self._plan_reuses = 0
+
+        self._message_pool = _PlanMessagePool()
 
     linear_motion_profile_generator = None
 
@@ -125,84 +111,132 @@ class LinearMotionProfileGenerator(object):
                 MotionPointStamped())
         return LinearMotionProfileGenerator.linear_motion_profile_generator
 
-    # Get a starting motion point for a given time
+    # Get the starting position, velocity and acceleration for a given time
+    #
+    # The acceleration is zeroed if the start velocity is overridden, since
+    # the acceleration of the last plan no longer applies
     def _get_start_point(self,
                          time,
                          override_start_position,
                          override_start_velocity):
 
-        start_motion_point = self.expected_point_at_time(time)
+        # state_at_time returns new arrays for the position and velocity,
+        # so they can be modified without touching the last plan
+        p_start, v_start, a_start = self._last_motion_plan.state_at_time(
+            time.to_sec())
 
         # Apply a saved off overridden start point first
-        if self._override_start_position is not None:
-            if self._override_start_position.x is not None:
-                start_motion_point.motion_point.pose.position.x = self._override_start_position.x
-            if self._override_start_position.y is not None:
-                start_motion_point.motion_point.pose.position.y = self._override_start_position.y
-            if self._override_start_position.z is not None:
-                start_motion_point.motion_point.pose.position.z = self._override_start_position.z
-            self._override_start_position = None
-
-        if self._override_start_velocity is not None:
-            if self._override_start_velocity.x is not None:
-                start_motion_point.motion_point.twist.linear.x = self._override_start_velocity.x
-            if self._override_start_velocity.y is not None:
-                start_motion_point.motion_point.twist.linear.y = self._override_start_velocity.y
-            if self._override_start_velocity.z is not None:
-                start_motion_point.motion_point.twist.linear.z = self._override_start_velocity.z
-            self._override_start_velocity = None
+        override_start = self._override_start
+        self._override_start = None
+        if override_start is not None:
+            _apply_override(p_start, override_start[0])
+            _apply_override(v_start, override_start[1])
+            if _has_override(override_start[1]):
+                a_start = np.zeros(3)
 
         # Apply the passed in overriden start point second
-        if override_start_position.x is not None:
-            start_motion_point.motion_point.pose.position.x = override_start_position.x
-        if override_start_position.y is not None:
-            start_motion_point.motion_point.pose.position.y = override_start_position.y
-        if override_start_position.z is not None:
-            start_motion_point.motion_point.pose.position.z = override_start_position.z
-
-        if override_start_velocity.x is not None:
-            start_motion_point.motion_point.twist.linear.x = override_start_velocity.x
-        if override_start_velocity.y is not None:
-            start_motion_point.motion_point.twist.linear.y = override_start_velocity.y
-        if override_start_velocity.z is not None:
-            start_motion_point.motion_point.twist.linear.z = override_start_velocity.z
-
-        return start_motion_point
+        _apply_override(p_start, override_start_position)
+        _apply_override(v_start, override_start_velocity)
+        if _has_override(override_start_velocity):
+            a_start = np.zeros(3)
+
+        return p_start, v_start, a_start
 
     def set_start_point(self, start_point_command):
-        self._override_start_position = start_point_command.start_position
-        self._override_start_velocity = start_point_command.start_velocity
+        self._override_start = (start_point_command.start_position,
+                                start_point_command.start_velocity)
+
+    # Get the last generated plan
+    #
+    # The plan is an immutable snapshot, it stays valid and unchanged after
+    # newer plans are generated
+    def get_motion_plan(self):
+        return self._last_motion_plan
 
     def expected_point_at_time(self, time):
-        # Make sure a starting point newer than the last sent time is sent
-        for i in range(1, len(self._last_motion_plan.motion_points)):
-            if self._last_motion_plan.motion_points[i].header.stamp > time:
-                first_point = self._last_motion_plan.motion_points[i - 1]
-                second_point = self._last_motion_plan.motion_points[i]
-                return interpolate_motion_points(first_point, second_point,
-                                                 time)
-        # A point was not sent before the buffer ran out
-        # Use the oldest and reset the timestamp
-        self._last_motion_plan.motion_points[
-            -1].header.stamp = rospy.Time.now()
-        return self._last_motion_plan.motion_points[-1]
+        return self._last_motion_plan.motion_point_at_time(time)
+
+    # Get the expected states at an array of times in seconds
+    #
+    # Returns (N, 3) arrays of positions, velocities and accelerations from
+    # the last plan. All of the times are evaluated against the same plan.
+    def expected_states_at_times(self, times):
+        return self._last_motion_plan.states_at_times(times)
+
+    # Get the number of plans requested and the number of those that reused
+    # the last plan
+    def get_plan_reuse_counts(self):
+        return self._plan_requests, self._plan_reuses
+
+    # Get a list with a DiagnosticStatus of the plan reuse counts, for the
+    # control loop diagnostics
+    def get_diagnostics(self):
+        requests, reuses = self.get_plan_reuse_counts()
+
+        status = DiagnosticStatus()
+        status.level = DiagnosticStatus.OK
+        status.name = 'linear motion profile generator'
+        status.hardware_id = 'none'
+        status.message = 'Plan reuse statistics'
+
+        values = [('plan requests', requests),
+                  ('plan reuses', reuses),
+                  ('reuse rate', reuses / float(max(requests, 1)))]
+        status.values = [KeyValue(key, str(value)) for key, value in values]
+        return [status]
+
+    # Extend the last plan if it was built for the same command and has
+    # already settled at the target velocity
+    #
+    # Regenerating the plan in that case would produce the same constant
+    # velocity profile, so the last plan is continued from the start time
+    # instead. Returns None if the last plan can not be reused.
+    def _extend_last_plan(self,
+                          start_time,
+                          velocity_command,
+                          v_desired,
+                          acceleration,
+                          profile_mode):
+        if self._last_command is None or self._override_start is not None:
+            return None
+
+        if (_has_override(velocity_command.start_position)
+            or _has_override(velocity_command.start_velocity)):
+            return None
+
+        last_v_desired, last_acceleration, last_profile_mode = \
+            self._last_command
+        if (profile_mode != last_profile_mode
+            or abs(acceleration - last_acceleration) > self._REUSE_TOLERANCE
+            or np.max(np.abs(v_desired - last_v_desired)) > self._REUSE_TOLERANCE):
+            return None
+
+        plan = self._last_motion_plan
+        t = start_time.to_sec()
+        if t < plan.start_time:
+            return None
+
+        # The plan has to be holding the target velocity from the start time
+        # until its end
+        for state_time in (t, plan.end_time):
+            _, v, a = plan.state_at_time(state_time)
+            if (np.any(a != 0.0)
+                or np.max(np.abs(v - v_desired)) > self._REUSE_TOLERANCE):
+                return None
+
+        return plan.extended(t, t + self._PLAN_DURATION)
 
     # Get a motion plan that attempts to achieve a given velocity target
+    #
+    # The plan is returned as a MotionProfile, use sample_plan and
+    # get_plan_message to turn it into messages that can be published
+    #
+    # The command's profile_mode selects between a constant acceleration ramp
+    # and a jerk limited S-curve, the profile mode param is used if it is None
     def get_velocity_plan(self, velocity_command):
 
-        # Get the stating motion point for the time that the velocity is desired
-        start_point = self._get_start_point(
-            velocity_command.target_twist.header.stamp,
-            velocity_command.start_position,
-            velocity_command.start_velocity)
-
-        self._last_stamp = velocity_command.target_twist.header.stamp
-
-        p_start = msg_to_np(start_point.motion_point.pose.position)
-        v_start = msg_to_np(start_point.motion_point.twist.linear)
+        start_time = velocity_command.target_twist.header.stamp
         v_desired = msg_to_np(velocity_command.target_twist.twist.linear)
-        v_delta = v_desired - v_start
-
 
         acceleration = self._TARGET_ACCEL if velocity_command.acceleration is None \
                                           else velocity_command.acceleration
@@ -214,6 +248,63 @@ class LinearMotionProfileGenerator(object):
                           Requested: {} Limit {}'.format(acceleration,
                                                          self._MAX_TARGET_ACCEL))
 
+        profile_mode = self._PROFILE_MODE if velocity_command.profile_mode is None \
+                                          else velocity_command.profile_mode
+
+        if profile_mode not in _PROFILE_MODES:
+            rospy.logerr('iarc7_motion: linear motion profile generator '
+                         'unknown profile mode requested: {}, using {}'.format(
+                             profile_mode, self._PROFILE_MODE))
+            profile_mode = self._PROFILE_MODE
+
+        self._plan_requests += 1
+        self._last_stamp = start_time
+
+        plan = self._extend_last_plan(start_time,
+                                      velocity_command,
+                                      v_desired,
+                                      acceleration,
+                                      profile_mode)
+        if plan is not None:
+            self._plan_reuses += 1
+            self._last_motion_plan = plan
+            return plan
+
+        # Get the stating point for the time that the velocity is desired
+        p_start, v_start, a_start = self._get_start_point(
+            start_time,
+            velocity_command.start_position,
+            velocity_command.start_velocity)
+
+        v_delta = v_desired - v_start
+
+        if profile_mode == 's_curve':
+            plan = self._get_s_curve_plan(start_time,
+                                          p_start,
+                                          v_start,
+                                          a_start,
+                                          v_delta,
+                                          acceleration)
+        else:
+            plan = self._get_linear_plan(start_time,
+                                         p_start,
+                                         v_start,
+                                         v_delta,
+                                         acceleration)
+
+        self._last_command = (v_desired, acceleration, profile_mode)
+        self._last_motion_plan = plan
+        return plan
+
+    # Get a plan that accelerates at a constant rate towards the
+    # desired velocity
+    def _get_linear_plan(self,
+                         start_time,
+                         p_start,
+                         v_start,
+                         v_delta,
+                         acceleration):
+
         # Assign a direction to the target acceleration
         if np.linalg.norm(v_delta) != 0.0:
             a_target = acceleration * v_delta / np.linalg.norm(v_delta)
@@ -224,90 +315,255 @@ class LinearMotionProfileGenerator(object):
         acceleration_time = min(
             np.linalg.norm(v_delta) / acceleration, self._PLAN_DURATION)
 
-        # Use the rest of the profile duration to hold the velocity
-        steady_velocity_time = self._PLAN_DURATION - acceleration_time
-
-        # Calculate the number of discrete steps spent in each state
-        accel_steps = np.floor(acceleration_time / self._PROFILE_TIMESTEP)
-        vel_steps = np.floor(steady_velocity_time / self._PROFILE_TIMESTEP)
-
-        # Initialize the velocities array with the starting velocity
-        velocities = []
-
-        # Generate velocities corresponding to the acceleration period
-        if accel_steps > 0:
-            accel_times = np.linspace(
-                0.0, accel_steps * self._PROFILE_TIMESTEP, accel_steps + 1)
-            velocities.extend([
-                a_target * accel_time + v_start for accel_time in accel_times
-            ])
-
-        # Add the velocities for the steady velocity period
-        velocities.extend([v_desired for i in range(0, int(vel_steps))])
-
-        velocities = np.array(velocities)
-
-        # Differentiate velocities to get the accelerations
-        # This results in an array one element shorter than
-        # the velocities array
-        accelerations = np.diff(velocities, axis=0) / self._PROFILE_TIMESTEP
-
-        for i in range(0, accelerations.shape[0]):
-            if np.linalg.norm(accelerations[i]) > 1.01 * acceleration:
-                rospy.logerr(
-                    'Linear Motion Profile generator produced an acceleration greater than the maximum allowed'
-                )
-                rospy.logerr('i {} accel steps {} vel steps {}'.format(
-                    i, accel_steps, vel_steps))
-                rospy.logerr('accel step times {}'.format(accel_times))
-                rospy.logerr('v_d {} v_s {} a_t {}'.format(
-                    v_desired, v_start, a_target))
-                rospy.logerr('acceleration time {} v time {}'.format(
-                    acceleration_time, steady_velocity_time))
-                rospy.logerr('acceleration {} velocity {} {}'.format(
-                    accelerations[i], velocities[i], velocities[i + 1]))
-
-        # Integrate the velocities to get the position deltas
-        # This results in an array the same length as the velocities array
-        # But the positions correspond to the velocities one index higher than
-        # the given positio index
-        positions = (
-            np.cumsum(velocities, axis=0) * self._PROFILE_TIMESTEP + p_start)
-
-        plan = MotionPointStampedArray()
-        pose_only_plan = Path()
-        pose_only_plan.header.stamp = rospy.Time.now()
-        pose_only_plan.header.frame_id = 'map'
-
-        # Fill out the first motion point since it follows different
-        # rules than the rest
-        motion_point = MotionPointStamped()
-        motion_point.header.stamp = start_point.header.stamp
-        np_to_msg(accelerations[0], motion_point.motion_point.accel.linear)
-        np_to_msg(v_start, motion_point.motion_point.twist.linear)
-        np_to_msg(p_start, motion_point.motion_point.pose.position)
-
-        plan.motion_points.append(motion_point)
-        pose = PoseStamped()
-        pose.header.stamp = motion_point.header.stamp
-        pose.pose = motion_point.motion_point.pose
-        pose_only_plan.poses.append(pose)
-
-        # Generate the motion profile for all the remaining velocities and accelerations
-        for i in range(1, velocities.shape[0] - 1):
+        # The rest of the profile duration is used to hold the velocity
+        plan = MotionProfile.from_constant_acceleration(
+            start_time.to_sec(),
+            start_time.to_sec() + self._PLAN_DURATION,
+            p_start,
+            v_start,
+            a_target,
+            acceleration_time,
+            acceleration)
+
+        return plan
+
+    # Get a plan that ramps the acceleration at a constant jerk, holds it at
+    # most at the acceleration limit and ramps it back to zero as the
+    # desired velocity is reached
+    #
+    # The ramp is solved along the direction of the velocity change. Only the
+    # part of the starting acceleration along that direction is kept, so the
+    # acceleration is continuous while the direction of the command holds.
+    def _get_s_curve_plan(self,
+                          start_time,
+                          p_start,
+                          v_start,
+                          a_start,
+                          v_delta,
+                          acceleration):
+        delta_v = np.linalg.norm(v_delta)
+        if delta_v != 0.0:
+            direction = v_delta / delta_v
+            a0 = min(max(np.dot(a_start, direction), -acceleration),
+                     acceleration)
+            phases = [(duration, jerk * direction)
+                      for duration, jerk in _s_curve_phases(delta_v,
+                                                            a0,
+                                                            acceleration,
+                                                            self._JERK)]
+        else:
+            direction = np.zeros(3)
+            a0 = 0.0
+            phases = []
+
+        return MotionProfile.from_jerk_phases(
+            start_time.to_sec(),
+            start_time.to_sec() + self._PLAN_DURATION,
+            p_start,
+            v_start,
+            a0 * direction,
+            phases,
+            acceleration)
+
+    # Sample a motion plan at the profile timestep
+    #
+    # Returns arrays of times in seconds and (N, 3) positions, velocities
+    # and accelerations
+    def sample_plan(self, plan):
+        times, positions, velocities, accelerations = plan.sample(
+            self._PROFILE_TIMESTEP)
+
+        errors = validate_plan(times,
+                               positions,
+                               velocities,
+                               accelerations,
+                               1.01 * plan.max_acceleration)
+        for description, indices in errors:
+            rospy.logerr('Linear Motion Profile generator produced {}'.format(
+                description))
+            i = indices[0]
+            rospy.logerr('{} samples, first i {} time {} acceleration {} '
+                         'velocity {}'.format(indices.shape[0],
+                                              i,
+                                              times[i],
+                                              accelerations[i],
+                                              velocities[i]))
+
+        return times, positions, velocities, accelerations
+
+    # Build a MotionPointStampedArray from a sampled plan
+    def get_plan_message(self, times, positions, velocities, accelerations):
+        return self._message_pool.fill_plan(times,
+                                            positions,
+                                            velocities,
+                                            accelerations)
+
+    # Build a Path from a sampled plan
+    def get_path_message(self, times, positions):
+        return self._message_pool.fill_path(times, positions)
+
+
+_PROFILE_MODES = ('linear', 's_curve')
+
+
+# Solve a jerk limited change in velocity along one axis
+#
+# Starting with an acceleration of a0, reach a velocity change of delta_v >= 0
+# with zero acceleration at the end, while keeping the acceleration within
+# +-max_accel and the jerk within +-jerk. Returns a list of
+# (duration, jerk) phases: ramp to the peak acceleration, hold it, and ramp
+# back to zero.
+def _s_curve_phases(delta_v, a0, max_accel, jerk):
+    # If ramping a0 straight down to zero already passes the desired velocity
+    # change the peak acceleration has to be negative
+    if a0 > 0.0 and a0**2 / (2.0 * jerk) > delta_v:
+        # The peak is below a0 in magnitude so it can not hit the limit
+        peak = -np.sqrt((a0**2 - 2.0 * jerk * delta_v) / 2.0)
+        hold_time = 0.0
+    else:
+        peak = np.sqrt((2.0 * jerk * delta_v + a0**2) / 2.0)
+        hold_time = 0.0
+        if peak > max_accel:
+            peak = max_accel
+            hold_time = (delta_v
+                         - (2.0 * max_accel**2 - a0**2) / (2.0 * jerk)) \
+                        / max_accel
+
+    return [(abs(peak - a0) / jerk, np.sign(peak - a0) * jerk),
+            (hold_time, 0.0),
+            (abs(peak) / jerk, -np.sign(peak) * jerk)]
+
+
+# Check a sampled plan for invalid samples
+#
+# Each check runs on the whole plan at once. Returns a list of
+# (description, indices) tuples, one for each failed check, where indices is
+# an array of the offending sample indices. The list is empty for a valid
+# plan.
+def validate_plan(times, positions, velocities, accelerations, max_accel):
+    errors = []
+
+    finite = (np.isfinite(times)
+              & np.all(np.isfinite(positions), axis=1)
+              & np.all(np.isfinite(velocities), axis=1)
+              & np.all(np.isfinite(accelerations), axis=1))
+    if not np.all(finite):
+        errors.append(('a NaN or infinite value',
+                       np.flatnonzero(~finite)))
+
+    # Compare squared norms to avoid a square root per sample, NaNs compare
+    # false here and are reported by the check above
+    accel_norms_squared = np.einsum('ij,ij->i', accelerations, accelerations)
+    too_large = accel_norms_squared > max_accel**2
+    if np.any(too_large):
+        errors.append(('an acceleration greater than the maximum allowed',
+                       np.flatnonzero(too_large)))
+
+    not_increasing = np.diff(times) <= 0.0
+    if np.any(not_increasing):
+        errors.append(('timestamps that are not increasing',
+                       np.flatnonzero(not_increasing) + 1))
+
+    return errors
+
+
+# Split an array of times in seconds into lists of integer secs and nsecs
+def split_stamps(times):
+    secs = np.floor(times)
+    nsecs = np.round((times - secs) * 1e9)
+    carry = nsecs >= 1e9
+    secs[carry] += 1
+    nsecs[carry] -= 1e9
+    return secs.astype(np.int64).tolist(), nsecs.astype(np.int64).tolist()
+
+
+# Pool of plan messages that are refilled for every published plan
+#
+# The message objects are reused between plans, so a message returned from
+# the pool is only valid until the next call. rospy serializes messages inside
+# of publish so this is safe as long as the messages are not kept around after
+# they are published.
+class _PlanMessagePool(object):
+    def __init__(self):
+        self._motion_points = []
+        self._poses = []
+        self._motion_point_array = MotionPointStampedArray()
+        self._path = Path()
+        self._path.header.frame_id = 'map'
+
+    # Fill out a MotionPointStampedArray from arrays of times in seconds
+    # and (N, 3) positions, velocities and accelerations
+    def fill_plan(self, times, positions, velocities, accelerations):
+        size = times.shape[0]
+        while len(self._motion_points) < size:
             motion_point = MotionPointStamped()
-            motion_point.header.stamp = (
-                start_point.header.stamp +
-                rospy.Duration(i * self._PROFILE_TIMESTEP))
-            np_to_msg(accelerations[i], motion_point.motion_point.accel.linear)
-            np_to_msg(velocities[i], motion_point.motion_point.twist.linear)
-            np_to_msg(positions[i - 1],
-                      motion_point.motion_point.pose.position)
-            plan.motion_points.append(motion_point)
+            motion_point.header.stamp = rospy.Time()
+            self._motion_points.append(motion_point)
+
+        secs, nsecs = split_stamps(times)
+
+        # Lists of python floats are much faster to read element by element
+        # than numpy arrays
+        positions = positions.tolist()
+        velocities = velocities.tolist()
+        accelerations = accelerations.tolist()
+
+        for i in range(0, size):
+            motion_point = self._motion_points[i]
+            motion_point.header.stamp.secs = secs[i]
+            motion_point.header.stamp.nsecs = nsecs[i]
+
+            position = motion_point.motion_point.pose.position
+            position.x, position.y, position.z = positions[i]
+            velocity = motion_point.motion_point.twist.linear
+            velocity.x, velocity.y, velocity.z = velocities[i]
+            acceleration = motion_point.motion_point.accel.linear
+            acceleration.x, acceleration.y, acceleration.z = accelerations[i]
+
+        if len(self._motion_point_array.motion_points) != size:
+            self._motion_point_array.motion_points = self._motion_points[:size]
+
+        return self._motion_point_array
+
+    # Fill out a Path from arrays of times in seconds and (N, 3) positions
+    def fill_path(self, times, positions):
+        size = times.shape[0]
+        while len(self._poses) < size:
             pose = PoseStamped()
-            pose.header.stamp = motion_point.header.stamp
-            pose.pose = motion_point.motion_point.pose
-            pose_only_plan.poses.append(pose)
+            pose.header.stamp = rospy.Time()
+            self._poses.append(pose)
 
-        self._last_motion_plan = plan
-        return plan, pose_only_plan
+        secs, nsecs = split_stamps(times)
+        positions = positions.tolist()
+
+        for i in range(0, size):
+            pose = self._poses[i]
+            pose.header.stamp.secs = secs[i]
+            pose.header.stamp.nsecs = nsecs[i]
+
+            position = pose.pose.position
+            position.x, position.y, position.z = positions[i]
+
+        if len(self._path.poses) != size:
+            self._path.poses = self._poses[:size]
+        self._path.header.stamp = rospy.Time.now()
+
+        return self._path
+
+
+# Check if any field of a Vector3 override is set
+def _has_override(override):
+    return (override.x is not None
+            or override.y is not None
+            or override.z is not None)
+
+
+# Overwrite the elements of a 3 element numpy array with the
+# non None fields of a Vector3
+def _apply_override(array, override):
+    if override.x is not None:
+        array[0] = override.x
+    if override.y is not None:
+        array[1] = override.y
+    if override.z is not None:
+        array[2] = override.z
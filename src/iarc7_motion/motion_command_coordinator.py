@@ -1,9 +1,7 @@
 #!/usr/bin/env python
 import actionlib
-import numpy as np
 import rospy
 import sys
-import threading
 import traceback
 
 from actionlib_msgs.msg import GoalStatus
@@ -28,11 +26,15 @@ from state_monitor import StateMonitor
 from transition_data import TransitionData
 from iarc_task_action_server import IarcTaskActionServer
 from idle_obstacle_avoider import IdleObstacleAvoider
+from control_loop_scheduler import ControlLoopScheduler
+from iarc7_motion.instrumented_lock import InstrumentedLock, get_lock_diagnostics
+from iarc7_motion.linear_motion_profile_generator import LinearMotionProfileGenerator
+from iarc7_motion.odometry_hub import OdometryHub
 
 import iarc_tasks.task_states as task_states
 import iarc_tasks.task_commands as task_commands
 
-from iarc_tasks.abstract_task import AbstractTask
+from iarc_tasks.task_utilities.task_topic_buffer import TaskTopicBuffer
 
 class MotionCommandCoordinator(object):
 
@@ -48,16 +50,15 @@ class MotionCommandCoordinator(object):
         self._time_of_last_task = None
         self._timeout_vel_sent = False
 
-        # to keep things thread safe
-        self._lock = threading.RLock()
-
         # handles monitoring of state of drone
         self._state_monitor = StateMonitor()
 
         # handles communicating between tasks and LLM
         self._task_command_handler = TaskCommandHandler()
 
-        self._idle_obstacle_avoider = IdleObstacleAvoider()
+        # shares the obstacles and transforms that the tasks use
+        self._idle_obstacle_avoider = IdleObstacleAvoider(
+            TaskTopicBuffer.get_task_topic_buffer().get_obstacle_cache())
         self._avoid_magnitude = rospy.get_param("~obst_avoid_magnitude")
         self._kickout_distance = rospy.get_param('~kickout_distance')
         self._new_task_distance = rospy.get_param('~new_task_distance')
@@ -65,6 +66,9 @@ class MotionCommandCoordinator(object):
 
         # safety
         self._safety_client = SafetyClient('motion_command_coordinator')
+        # guards _safety_land_complete separately from the loop so that the
+        # safety land callback never waits on a task step
+        self._safety_lock = InstrumentedLock('motion coordinator safety')
         self._safety_land_complete = False
         self._safety_land_requested = False
 
@@ -79,14 +83,41 @@ class MotionCommandCoordinator(object):
             self._task_timeout = rospy.Duration(rospy.get_param('~task_timeout'))
             # startup timeout
             self._startup_timeout = rospy.Duration(rospy.get_param('~startup_timeout'))
+            # control loop scheduling and overrun handling
+            overrun_policy = rospy.get_param('~control_loop_overrun_policy')
+            stats_window = rospy.get_param('~control_loop_stats_window')
+            diagnostics_period = rospy.get_param('~control_loop_diagnostics_period')
+            degraded_rate = rospy.get_param('~control_loop_degraded_rate')
+            recovery_iterations = rospy.get_param('~control_loop_recovery_iterations')
+            min_wakeup_interval = rospy.get_param('~control_loop_min_wakeup_interval')
+            # run the loop as soon as new odometry arrives
+            wake_on_odometry = rospy.get_param('~wake_on_odometry')
         except KeyError as e:
             rospy.logerr('Could not lookup a parameter for motion coordinator')
             raise
 
-    def run(self):
         # rate limiting of updates of motion coordinator
-        rate = rospy.Rate(self._update_rate)
+        self._scheduler = ControlLoopScheduler('motion_command_coordinator: control loop',
+                                               self._update_rate,
+                                               overrun_policy,
+                                               stats_window,
+                                               diagnostics_period,
+                                               degraded_rate,
+                                               recovery_iterations,
+                                               min_wakeup_interval)
+
+        self._scheduler.add_diagnostics_source(get_lock_diagnostics)
+        self._scheduler.add_diagnostics_source(
+            LinearMotionProfileGenerator.get_linear_motion_profile_generator().get_diagnostics)
+
+        # new goals and cancels wake the loop up right away
+        self._action_server.set_wakeup_callback(self._scheduler.wake)
+
+        if wake_on_odometry:
+            OdometryHub.get_odometry_hub().add_listener(
+                self._odometry_callback)
 
+    def run(self):
         # waiting for dependencies to be ready
         while rospy.Time.now() == rospy.Time(0) and not rospy.is_shutdown():
             rospy.sleep(0.005)
@@ -102,110 +133,124 @@ class MotionCommandCoordinator(object):
                 self._startup_timeout - (rospy.Time.now() - start_time))
         self._idle_obstacle_avoider.wait_until_ready(
                 self._startup_timeout - (rospy.Time.now() - start_time))
-        AbstractTask().topic_buffer.wait_until_ready(
+        TaskTopicBuffer.get_task_topic_buffer().wait_until_ready(
                 self._startup_timeout - (rospy.Time.now() - start_time))
 
         # forming bond with safety client
         if not self._safety_client.form_bond():
             raise IARCFatalSafetyException('Motion Coordinator could not form bond with safety client')
 
+        self._scheduler.start()
         while not rospy.is_shutdown():
-            with self._lock:
-                # Exit immediately if fatal
-                if self._safety_client.is_fatal_active():
-                    raise IARCFatalSafetyException('Safety Client is fatal active')
-                elif self._safety_land_complete:
-                    return
-
-                # Land if put into safety mode
-                if self._safety_client.is_safety_active() and not self._safety_land_requested:
-                    # Request landing
-                    goal = QuadMoveGoal(movement_type="land", preempt=True)
-                    self._action_client.send_goal(goal,
-                            done_cb=self._safety_task_complete_callback)
-                    rospy.logwarn('motion coordinator attempting to execute safety land')
-                    self._safety_land_requested = True
-                    self._state_monitor.signal_safety_active()
-
-                # set the time of last task to now if we have not seen a task yet
-                if not self._first_task_seen:
-                    self._time_of_last_task = rospy.Time.now()
-                    self._first_task_seen = True
-
-                closest_obstacle_dist = self._idle_obstacle_avoider.get_distance_to_obstacle()
-
-                if self._task is None and self._action_server.has_new_task():
-                    new_task = self._action_server.get_new_task()
-
-                    if not self._state_monitor.check_transition(new_task):
-                        rospy.logerr('Illegal task transition request requested in motion coordinator. Aborting requested task.')
-                        self._action_server.set_aborted()
-                    elif not closest_obstacle_dist >= self._new_task_distance:
-                        rospy.logerr('Attempt to start task too close to obstacle.'
-                                + ' Aborting requested task.')
-                        self._action_server.set_aborted()
-                    else:
-                        self._time_of_last_task = None
-                        self._task = new_task
-                        self._task_command_handler.new_task(new_task, self._get_current_transition())
-
-                if self._task is not None:
-                    task_canceled = False
-                    if self._action_server.is_canceled():
-                        task_canceled = self._task_command_handler.cancel_task()
-
-                    if not task_canceled and closest_obstacle_dist < self._kickout_distance:
-                        # Abort current task
-                        task_canceled = self._task_command_handler.abort_task(
-                                'Too close to obstacle')
-
-                    # if canceling task did not result in an error
-                    if not task_canceled:
-                        self._task_command_handler.run()
-
-                    task_state = self._task_command_handler.get_state()
-
-                    # handles state of task, motion coordinator, and action server
-                    if isinstance(task_state, task_states.TaskCanceled):
-                        self._action_server.set_canceled()
-                        rospy.logwarn('Task was canceled')
-                        self._task = None
-                    elif isinstance(task_state, task_states.TaskAborted):
-                        rospy.logwarn('Task aborted with: %s', task_state.msg)
-                        self._action_server.set_aborted()
-                        self._task = None
-                    elif isinstance(task_state, task_states.TaskFailed):
-                        rospy.logwarn('Task failed with: %s', task_state.msg)
-                        self._action_server.set_succeeded(False)
-                        self._task = None
-                    elif isinstance(task_state, task_states.TaskDone):
-                        self._action_server.set_succeeded(True)
-                        self._task = None
-                    elif not isinstance(task_state, task_states.TaskRunning):
-                        rospy.logerr("Invalid task state returned, aborting task")
-                        self._action_server.set_aborted()
-                        self._task = None
-                        task_state = task_states.TaskAborted(msg='Invalid task state returned')
-
-                    # as soon as we set a task to None, start time
-                    # and send ending state to State Monitor
-                    if self._task is None:
-                        self._time_of_last_task = rospy.Time.now()
-                        self._timeout_vel_sent = False
-                        self._state_monitor.set_last_task_end_state(task_state)
-                # No task is running, run obstacle avoider
+            # Exit immediately if fatal
+            with self._safety_lock:
+                safety_land_complete = self._safety_land_complete
+
+            if self._safety_client.is_fatal_active():
+                raise IARCFatalSafetyException('Safety Client is fatal active')
+            elif safety_land_complete:
+                return
+
+            # Land if put into safety mode
+            if self._safety_client.is_safety_active() and not self._safety_land_requested:
+                # Request landing
+                goal = QuadMoveGoal(movement_type="land", preempt=True)
+                self._action_client.send_goal(goal,
+                        done_cb=self._safety_task_complete_callback)
+                rospy.logwarn('motion coordinator attempting to execute safety land')
+                self._safety_land_requested = True
+                self._state_monitor.signal_safety_active()
+
+            # set the time of last task to now if we have not seen a task yet
+            if not self._first_task_seen:
+                self._time_of_last_task = rospy.Time.now()
+                self._first_task_seen = True
+
+            closest_obstacle_dist = self._idle_obstacle_avoider.get_distance_to_obstacle()
+
+            if self._task is None and self._action_server.has_new_task():
+                new_task = self._action_server.get_new_task()
+
+                if not self._state_monitor.check_transition(new_task):
+                    rospy.logerr('Illegal task transition request requested in motion coordinator. Aborting requested task.')
+                    self._action_server.set_aborted()
+                    new_task.shutdown()
+                elif not closest_obstacle_dist >= self._new_task_distance:
+                    rospy.logerr('Attempt to start task too close to obstacle.'
+                            + ' Aborting requested task.')
+                    self._action_server.set_aborted()
+                    new_task.shutdown()
                 else:
-                    vel = AbstractTask.topic_buffer.get_linear_motion_profile_generator().expected_point_at_time(rospy.Time.now()).motion_point.twist.linear
-                    vel_vec_2d = np.array([vel.x, vel.y], dtype=np.float)
-                    avoid_vector, acceleration = self._idle_obstacle_avoider.get_safest(vel_vec_2d)
-                    avoid_twist = TwistStamped()
-                    avoid_twist.header.stamp = rospy.Time.now()
-                    avoid_twist.twist.linear.x = avoid_vector[0]
-                    avoid_twist.twist.linear.y = avoid_vector[1]
-                    self._task_command_handler.send_timeout(avoid_twist, acceleration=acceleration)
-                    rospy.logwarn_throttle(1.0, 'Task running timeout. Running obstacle avoider')
-
-            rate.sleep()
+                    self._time_of_last_task = None
+                    self._task = new_task
+                    self._task_command_handler.new_task(
+                        new_task,
+                        self._get_current_transition(),
+                        self._action_server.get_current_goal_time())
+
+            if self._task is not None:
+                task = self._task
+                task_canceled = False
+                if self._action_server.is_canceled():
+                    task_canceled = self._task_command_handler.cancel_task()
+
+                if not task_canceled and closest_obstacle_dist < self._kickout_distance:
+                    # Abort current task
+                    task_canceled = self._task_command_handler.abort_task(
+                            'Too close to obstacle')
+
+                # if canceling task did not result in an error
+                if not task_canceled:
+                    # one snapshot of the topics per tick so the task
+                    # sees a consistent view of the world
+                    world_state = TaskTopicBuffer.get_task_topic_buffer().get_world_state()
+                    self._task_command_handler.run(world_state)
+
+                task_state = self._task_command_handler.get_state()
+
+                # handles state of task, motion coordinator, and action server
+                if isinstance(task_state, task_states.TaskCanceled):
+                    self._action_server.set_canceled()
+                    rospy.logwarn('Task was canceled')
+                    self._task = None
+                elif isinstance(task_state, task_states.TaskAborted):
+                    rospy.logwarn('Task aborted with: %s', task_state.msg)
+                    self._action_server.set_aborted()
+                    self._task = None
+                elif isinstance(task_state, task_states.TaskFailed):
+                    rospy.logwarn('Task failed with: %s', task_state.msg)
+                    self._action_server.set_succeeded(False)
+                    self._task = None
+                elif isinstance(task_state, task_states.TaskDone):
+                    self._action_server.set_succeeded(True)
+                    self._task = None
+                elif not isinstance(task_state, task_states.TaskRunning):
+                    rospy.logerr("Invalid task state returned, aborting task")
+                    self._action_server.set_aborted()
+                    self._task = None
+                    task_state = task_states.TaskAborted(msg='Invalid task state returned')
+
+                # as soon as we set a task to None, start time
+                # and send ending state to State Monitor
+                if self._task is None:
+                    task.shutdown()
+                    self._time_of_last_task = rospy.Time.now()
+                    self._timeout_vel_sent = False
+                    self._state_monitor.set_last_task_end_state(task_state)
+            # No task is running, run obstacle avoider
+            else:
+                plan = TaskTopicBuffer.get_task_topic_buffer().get_linear_motion_profile_generator().get_motion_plan()
+                _, vel, _ = plan.state_at_time(rospy.get_time())
+                vel_vec_2d = vel[:2]
+                avoid_vector, acceleration = self._idle_obstacle_avoider.get_safest(vel_vec_2d)
+                avoid_twist = TwistStamped()
+                avoid_twist.header.stamp = rospy.Time.now()
+                avoid_twist.twist.linear.x = avoid_vector[0]
+                avoid_twist.twist.linear.y = avoid_vector[1]
+                self._task_command_handler.send_timeout(avoid_twist, acceleration=acceleration)
+                rospy.logwarn_throttle(1.0, 'Task running timeout. Running obstacle avoider')
+
+            self._scheduler.sleep()
 
     # fills out the Intermediary State for the task
     def _get_current_transition(self):
@@ -215,9 +260,13 @@ class MotionCommandCoordinator(object):
         state.timeout_sent = self._timeout_vel_sent
         return self._state_monitor.fill_out_transition(state)
 
+    # wakes the control loop up when new odometry arrives
+    def _odometry_callback(self, odometry):
+        self._scheduler.wake()
+
     # callback for safety task completition
     def _safety_task_complete_callback(self, status, response):
-        with self._lock:
+        with self._safety_lock:
             if response.success:
                 rospy.logwarn('Motion Coordinator supposedly safely landed the aircraft')
             else:
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+
+import struct
+import numpy as np
+
+from iarc7_msgs.msg import MotionPointStamped, MotionPointStampedArray
+
+from iarc7_motion.linear_motion_profile_generator import split_stamps
+
+# Numpy formats for the fixed size ROS primitive types
+_PRIMITIVE_FORMATS = {'bool': '<u1',
+                      'byte': '<i1',
+                      'char': '<u1',
+                      'int8': '<i1',
+                      'uint8': '<u1',
+                      'int16': '<i2',
+                      'uint16': '<u2',
+                      'int32': '<i4',
+                      'uint32': '<u4',
+                      'int64': '<i8',
+                      'uint64': '<u8',
+                      'float32': '<f4',
+                      'float64': '<f8'}
+
+_VECTOR_FIELDS = ('x', 'y', 'z')
+
+
+# Get the wire layout of a message as a list of (field name, numpy format)
+#
+# Field names are the dotted path to the field. Strings are only supported
+# when they are empty, in which case they serialize to a zero length field.
+def _message_layout(msg, prefix=''):
+    fields = []
+    for slot, slot_type in zip(msg.__slots__, msg._slot_types):
+        name = prefix + slot
+        if slot_type in _PRIMITIVE_FORMATS:
+            fields.append((name, _PRIMITIVE_FORMATS[slot_type]))
+        elif slot_type == 'time':
+            fields.append((name + '.secs', '<u4'))
+            fields.append((name + '.nsecs', '<u4'))
+        elif slot_type == 'duration':
+            fields.append((name + '.secs', '<i4'))
+            fields.append((name + '.nsecs', '<i4'))
+        elif slot_type == 'string':
+            fields.append((name + '.length', '<u4'))
+        elif '[' in slot_type:
+            raise ValueError('Arrays are not supported in the motion point '
+                             'layout: {}'.format(name))
+        else:
+            fields.extend(_message_layout(getattr(msg, slot), name + '.'))
+    return fields
+
+
+# MotionPointStampedArray that writes out bytes that were already serialized
+class _SerializedMotionPointStampedArray(MotionPointStampedArray):
+    __slots__ = ['_serialized']
+
+    def __init__(self):
+        super(_SerializedMotionPointStampedArray, self).__init__()
+        self._serialized = b''
+
+    def serialize(self, buff):
+        buff.write(self._serialized)
+
+
+# Serializes sampled motion plans straight from numpy arrays
+#
+# The wire layout of a MotionPointStamped is computed once from the generated
+# message class and the plan is packed into a numpy record array with that
+# layout. The output is byte for byte what genpy produces for a
+# MotionPointStampedArray filled with the same values, which is checked by
+# test/test_motion_point_serializer.py.
+#
+# Raises ValueError if the message layout is not supported.
+class MotionPointArraySerializer(object):
+    def __init__(self):
+        if MotionPointStampedArray.__slots__ != ['motion_points']:
+            raise ValueError('Unsupported MotionPointStampedArray layout')
+
+        self._dtype = np.dtype(_message_layout(MotionPointStamped()))
+        self._records = np.zeros(0, dtype=self._dtype)
+        self._message = _SerializedMotionPointStampedArray()
+
+    # Serialize a sampled plan
+    #
+    # Takes arrays of times in seconds and (N, 3) positions, velocities and
+    # accelerations, returns the serialized MotionPointStampedArray
+    def serialize(self, times, positions, velocities, accelerations):
+        size = times.shape[0]
+        if self._records.shape[0] != size:
+            self._records = np.zeros(size, dtype=self._dtype)
+        records = self._records
+
+        secs, nsecs = split_stamps(times)
+        records['header.stamp.secs'] = secs
+        records['header.stamp.nsecs'] = nsecs
+
+        for i in range(0, 3):
+            field = _VECTOR_FIELDS[i]
+            records['motion_point.pose.position.' + field] = positions[:, i]
+            records['motion_point.twist.linear.' + field] = velocities[:, i]
+            records['motion_point.accel.linear.' + field] = accelerations[:, i]
+
+        return struct.pack('<I', size) + records.tobytes()
+
+    # Get a message that can be published in place of a
+    # MotionPointStampedArray
+    #
+    # The message is reused, so it is only valid until the next call
+    def to_message(self, times, positions, velocities, accelerations):
+        self._message._serialized = self.serialize(times,
+                                                   positions,
+                                                   velocities,
+                                                   accelerations)
+        return self._message
@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+
+import numpy as np
+
+from iarc7_msgs.msg import MotionPointStamped
+
+
+# A motion profile made of polynomial segments
+#
+# Each segment starts at a time in segment_times and is described by the
+# position, velocity and acceleration at its start and a constant jerk. The
+# state inside of a segment is then p + v * t + a * t^2 / 2 + j * t^3 / 6
+# where t is the time since the start of the segment. Times are float64
+# seconds. Jerks default to zero, which gives piecewise constant
+# accelerations.
+#
+# Evaluating the profile is exact and does not depend on any sampling
+# resolution, the profile is only sampled when it is turned into messages.
+#
+# Profiles are immutable once constructed. The arrays are marked read only so
+# that a profile can be shared between threads without locks or copies, a new
+# plan is published by building a new profile and swapping the reference.
+class MotionProfile(object):
+    def __init__(self,
+                 segment_times,
+                 positions,
+                 velocities,
+                 accelerations,
+                 end_time,
+                 max_acceleration=0.0,
+                 jerks=None):
+        self._segment_times = np.array(segment_times, dtype=np.float64)
+        self._positions = np.array(positions, dtype=np.float64).reshape(-1, 3)
+        self._velocities = np.array(velocities, dtype=np.float64).reshape(-1, 3)
+        self._accelerations = np.array(accelerations,
+                                       dtype=np.float64).reshape(-1, 3)
+        if jerks is None:
+            self._jerks = np.zeros(self._accelerations.shape)
+        else:
+            self._jerks = np.array(jerks, dtype=np.float64).reshape(-1, 3)
+        self._end_time = float(end_time)
+        self._max_acceleration = max_acceleration
+
+        self._segment_times.flags.writeable = False
+        self._positions.flags.writeable = False
+        self._velocities.flags.writeable = False
+        self._accelerations.flags.writeable = False
+        self._jerks.flags.writeable = False
+
+    # Build a profile that holds a single motion point forever
+    @staticmethod
+    def from_motion_point(motion_point):
+        stamp = motion_point.header.stamp.to_sec()
+        return MotionProfile(
+            [stamp],
+            [msg_to_np(motion_point.motion_point.pose.position)],
+            [msg_to_np(motion_point.motion_point.twist.linear)],
+            [msg_to_np(motion_point.motion_point.accel.linear)],
+            stamp)
+
+    # Build a profile that accelerates at a constant rate for
+    # acceleration_time seconds and then holds the reached velocity
+    # until the end time
+    @staticmethod
+    def from_constant_acceleration(start_time,
+                                   end_time,
+                                   p_start,
+                                   v_start,
+                                   a_target,
+                                   acceleration_time,
+                                   max_acceleration):
+        segment_times = [start_time]
+        positions = [p_start]
+        velocities = [v_start]
+        accelerations = [a_target]
+
+        if acceleration_time < end_time - start_time:
+            segment_times.append(start_time + acceleration_time)
+            positions.append(p_start
+                             + v_start * acceleration_time
+                             + 0.5 * a_target * acceleration_time**2)
+            velocities.append(v_start + a_target * acceleration_time)
+            accelerations.append(np.zeros(3))
+
+        return MotionProfile(segment_times,
+                             positions,
+                             velocities,
+                             accelerations,
+                             end_time,
+                             max_acceleration)
+
+    # Build a profile from a starting state and a list of
+    # (duration, jerk) phases
+    #
+    # The state at the start of each phase is found by integrating the
+    # phases before it. After the last phase the reached velocity is held
+    # until the end time, phases that start after the end time are dropped.
+    @staticmethod
+    def from_jerk_phases(start_time,
+                         end_time,
+                         p_start,
+                         v_start,
+                         a_start,
+                         phases,
+                         max_acceleration):
+        segment_times = []
+        positions = []
+        velocities = []
+        accelerations = []
+        jerks = []
+
+        t = start_time
+        p = np.array(p_start, dtype=np.float64)
+        v = np.array(v_start, dtype=np.float64)
+        a = np.array(a_start, dtype=np.float64)
+        for duration, jerk in phases:
+            if t >= end_time:
+                break
+            if duration <= 0.0:
+                continue
+
+            segment_times.append(t)
+            positions.append(p)
+            velocities.append(v)
+            accelerations.append(a)
+            jerks.append(jerk)
+
+            p = (p + v * duration + 0.5 * a * duration**2
+                 + jerk * duration**3 / 6.0)
+            v = v + a * duration + 0.5 * jerk * duration**2
+            a = a + jerk * duration
+            t = t + duration
+
+        if t < end_time or not segment_times:
+            segment_times.append(t)
+            positions.append(p)
+            velocities.append(v)
+            accelerations.append(np.zeros(3))
+            jerks.append(np.zeros(3))
+
+        return MotionProfile(segment_times,
+                             positions,
+                             velocities,
+                             accelerations,
+                             end_time,
+                             max_acceleration,
+                             jerks)
+
+    @property
+    def start_time(self):
+        return self._segment_times[0]
+
+    @property
+    def end_time(self):
+        return self._end_time
+
+    @property
+    def max_acceleration(self):
+        return self._max_acceleration
+
+    # Get the position, velocity and acceleration at a time in seconds
+    # Times outside of the profile are clamped to the start and end
+    def state_at_time(self, t):
+        t = min(max(t, self._segment_times[0]), self._end_time)
+        return self._state_in_segment(self._segment_index(t), t)
+
+    # Get a profile that follows this one from start_time to end_time
+    #
+    # Segments that end before start_time are dropped and the last segment is
+    # continued past the current end time if needed. This profile is left
+    # unchanged.
+    def extended(self, start_time, end_time):
+        start_time = max(start_time, self._segment_times[0])
+        i = self._segment_index(start_time)
+        p, v, a = self._state_in_segment(i, start_time)
+
+        return MotionProfile(
+            np.concatenate(([start_time], self._segment_times[i + 1:])),
+            np.concatenate(([p], self._positions[i + 1:])),
+            np.concatenate(([v], self._velocities[i + 1:])),
+            np.concatenate(([a], self._accelerations[i + 1:])),
+            end_time,
+            self._max_acceleration,
+            self._jerks[i:])
+
+    # Get the index of the segment that contains a time
+    def _segment_index(self, t):
+        return max(np.searchsorted(self._segment_times, t, side='right') - 1, 0)
+
+    # Evaluate segment i at a time in seconds
+    def _state_in_segment(self, i, t):
+        dt = t - self._segment_times[i]
+
+        j = self._jerks[i]
+        a = self._accelerations[i] + j * dt
+        v = (self._velocities[i]
+             + self._accelerations[i] * dt
+             + 0.5 * j * dt**2)
+        p = (self._positions[i]
+             + self._velocities[i] * dt
+             + 0.5 * self._accelerations[i] * dt**2
+             + j * dt**3 / 6.0)
+        return p, v, a
+
+    # Get the positions, velocities and accelerations at an array of times
+    # in seconds
+    #
+    # Returns (N, 3) arrays, times outside of the profile are clamped to the
+    # start and end like in state_at_time
+    def states_at_times(self, times):
+        times = np.clip(np.asarray(times, dtype=np.float64),
+                        self._segment_times[0],
+                        self._end_time)
+
+        segments = np.maximum(
+            np.searchsorted(self._segment_times, times, side='right') - 1, 0)
+        dt = (times - self._segment_times[segments])[:, np.newaxis]
+
+        jerks = self._jerks[segments]
+        accelerations = self._accelerations[segments] + jerks * dt
+        velocities = (self._velocities[segments]
+                      + self._accelerations[segments] * dt
+                      + 0.5 * jerks * dt**2)
+        positions = (self._positions[segments]
+                     + self._velocities[segments] * dt
+                     + 0.5 * self._accelerations[segments] * dt**2
+                     + jerks * dt**3 / 6.0)
+
+        return positions, velocities, accelerations
+
+    # Get a motion point stamped with the given rospy.Time
+    def motion_point_at_time(self, time):
+        p, v, a = self.state_at_time(time.to_sec())
+
+        motion_point = MotionPointStamped()
+        motion_point.header.stamp = time
+        np_to_msg(p, motion_point.motion_point.pose.position)
+        np_to_msg(v, motion_point.motion_point.twist.linear)
+        np_to_msg(a, motion_point.motion_point.accel.linear)
+        return motion_point
+
+    # Sample the profile every timestep seconds from the start to the end
+    #
+    # Returns arrays of times, positions, velocities and accelerations
+    def sample(self, timestep):
+        steps = int(np.round((self._end_time - self.start_time) / timestep))
+        times = self.start_time + timestep * np.arange(steps + 1)
+
+        positions, velocities, accelerations = self.states_at_times(times)
+        return times, positions, velocities, accelerations
+
+
+# Convert a 3 element numpy array to a Vector3 message
+def np_to_msg(array, msg):
+    msg.x = array[0]
+    msg.y = array[1]
+    msg.z = array[2]
+    return msg
+
+
+# Convert a Vector3 message to 3 element numpy array
+def msg_to_np(msg):
+    return np.array([msg.x, msg.y, msg.z])
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+import rospy
+import tf2_ros
+import numpy as np
+
+from iarc7_safety.iarc_safety_exception import IARCFatalSafetyException
+from iarc7_msgs.msg import ObstacleArray
+
+from iarc_tasks.task_utilities.transform_utilities import (transform_to_matrix,
+                                                           transform_points)
+
+# The one subscriber to /obstacles in the process
+#
+# Every ObstacleArray is transformed into the level_quad frame once when it
+# arrives and stored as an (N, 2) array of horizontal positions, which the
+# idle obstacle avoider and the task obstacle avoider both read from. The
+# array is replaced as a whole and never modified after it is stored, so
+# readers can use it without locking.
+#
+# The transform is converted to a matrix once per message and applied to all
+# of the obstacles with one matrix product. The matrix for the last frame
+# and stamp is kept, so arrays that share a stamp do not look it up again.
+#
+# The callback never waits on TF. If the transform at the stamp of the array
+# is not in the buffer yet the latest transform from the TransformCache is
+# used instead, as long as it is not too old.
+class ObstacleCache(object):
+    def __init__(self, tf_buffer, transform_cache):
+        self._tf_buffer = tf_buffer
+        self._transform_cache = transform_cache
+        self._obstacle_points = None
+
+        # (frame, stamp) and the level_quad matrix of the last transform
+        self._transform_key = None
+        self._transform_matrix = None
+
+        self._obstacle_subscriber = rospy.Subscriber('/obstacles',
+                                                     ObstacleArray,
+                                                     self._update_obstacles)
+
+    def wait_until_ready(self, startup_timeout):
+        while (rospy.Time.now() == rospy.Time(0) and not rospy.is_shutdown()):
+            # Wait for time to be initialized
+            rospy.sleep(0.005)
+        if rospy.is_shutdown():
+            raise rospy.ROSInterruptException()
+
+        start_time = rospy.Time.now()
+
+        while ((self._obstacle_points is None)
+               and rospy.Time.now() < start_time + startup_timeout
+               and not rospy.is_shutdown()):
+            rospy.sleep(0.005)
+        if rospy.Time.now() >= start_time + startup_timeout:
+            raise IARCFatalSafetyException('ObstacleCache timed out on startup')
+        if rospy.is_shutdown():
+            raise rospy.ROSInterruptException()
+
+    def has_obstacle_message(self):
+        return self._obstacle_points is not None
+
+    # Get the latest obstacles as a read only (N, 2) array of positions in
+    # the level_quad frame, empty if no obstacles have been received
+    def get_obstacle_points(self):
+        obstacle_points = self._obstacle_points
+        if obstacle_points is None:
+            return _NO_OBSTACLES
+        return obstacle_points
+
+    def _update_obstacles(self, obstacles):
+        matrix = self._get_transform_matrix(obstacles.header.frame_id,
+                                            obstacles.header.stamp)
+        if matrix is None:
+            obstacle_points = np.zeros((0, 2))
+        else:
+            # Convert all of the obstacles into numpy vectors from the quad
+            # frame at once
+            positions = [(obstacle.odom.pose.pose.position.x,
+                          obstacle.odom.pose.pose.position.y,
+                          obstacle.odom.pose.pose.position.z)
+                         for obstacle in obstacles.obstacles]
+            obstacle_points = transform_points(matrix, positions)[:, :2]
+
+        self._obstacle_points = _read_only(
+            np.ascontiguousarray(obstacle_points))
+
+    # Get the matrix that transforms from frame to level_quad at stamp
+    #
+    # Returns None if the transform is not available
+    def _get_transform_matrix(self, frame, stamp):
+        key = (frame, stamp)
+        if key == self._transform_key:
+            return self._transform_matrix
+
+        try:
+            transform = self._tf_buffer.lookup_transform('level_quad', frame, stamp)
+        except (tf2_ros.LookupException,
+                tf2_ros.ConnectivityException,
+                tf2_ros.ExtrapolationException) as ex:
+            transform, staleness = self._transform_cache.get_transform(
+                'level_quad', frame, stamp)
+            if not self._transform_cache.is_fresh(staleness):
+                rospy.logwarn("ObstacleCache: Couldn't lookup transform from {} to level_quad".format(frame))
+                return None
+
+        self._transform_matrix = transform_to_matrix(transform)
+        self._transform_key = key
+        return self._transform_matrix
+
+
+def _read_only(array):
+    array.flags.writeable = False
+    return array
+
+_NO_OBSTACLES = _read_only(np.zeros((0, 2)))
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+
+import threading
+import traceback
+
+import rospy
+
+from nav_msgs.msg import Odometry
+
+
+# The one subscriber to /odometry/filtered in the process
+#
+# Everything that needs the drone odometry registers a listener here instead
+# of creating its own subscriber, so every message is deserialized once and
+# short lived objects like the planners of a task do not leave subscribers
+# behind. Listeners are called on the subscriber thread in the order they
+# were added, and have to be removed with remove_listener once they are no
+# longer needed.
+class OdometryHub(object):
+    odometry_hub = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._odometry = None
+
+        self._odometry_sub = rospy.Subscriber('/odometry/filtered',
+                                              Odometry,
+                                              self._receive_odometry)
+
+    @staticmethod
+    def get_odometry_hub():
+        if OdometryHub.odometry_hub is None:
+            OdometryHub.odometry_hub = OdometryHub()
+        return OdometryHub.odometry_hub
+
+    # Call listener with every odometry message received from now on
+    def add_listener(self, listener):
+        with self._lock:
+            # Copy on write so the callback can iterate without the lock
+            self._listeners = self._listeners + [listener]
+
+    def remove_listener(self, listener):
+        with self._lock:
+            listeners = list(self._listeners)
+            try:
+                listeners.remove(listener)
+            except ValueError:
+                rospy.logwarn('OdometryHub: Attempt to remove a listener '
+                              'that was not registered')
+                return
+            self._listeners = listeners
+
+    def get_listener_count(self):
+        return len(self._listeners)
+
+    # Get the latest odometry message or None if none has been received
+    def get_odometry(self):
+        return self._odometry
+
+    def _receive_odometry(self, odometry):
+        self._odometry = odometry
+        for listener in self._listeners:
+            try:
+                listener(odometry)
+            except Exception as e:
+                rospy.logerr('OdometryHub: Exception in odometry listener')
+                rospy.logerr(str(e))
+                rospy.logerr(traceback.format_exc())
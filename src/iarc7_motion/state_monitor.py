@@ -3,7 +3,6 @@ import actionlib
 from enum import Enum
 import rospy
 import sys
-import threading
 import traceback
 
 from geometry_msgs.msg import TwistStamped
@@ -18,6 +17,9 @@ from iarc7_safety.iarc_safety_exception import (IARCSafetyException,
 
 import iarc_tasks.task_states as task_states
 
+from iarc7_motion.instrumented_lock import InstrumentedLock
+from iarc7_motion.odometry_hub import OdometryHub
+
 from iarc_tasks.takeoff_task import TakeoffTask
 from iarc_tasks.land_task import LandTask
 from iarc_tasks.test_task import TestTask
@@ -59,7 +61,10 @@ class StateMonitor(object):
         self._last_task_end_state = None
 
         # to keep things thread safe
-        self._lock = threading.RLock()
+        # the sensor data from the subscribers and the state of the drone are
+        # guarded separately so the callbacks never wait on a state transition
+        self._data_lock = InstrumentedLock('state monitor data')
+        self._state_lock = InstrumentedLock('state monitor state')
 
         # info needed to do sanity checking and state monitoring
         self._roomba_status_sub = rospy.Subscriber(
@@ -70,8 +75,7 @@ class StateMonitor(object):
             '/obstacles', ObstacleArray,
             self._receive_obstacle_status)
 
-        self._current_velocity_sub = rospy.Subscriber(
-            '/odometry/filtered', Odometry,
+        OdometryHub.get_odometry_hub().add_listener(
             self._receive_drone_odometry)
 
         self._drone_arm_status = rospy.Subscriber(
@@ -88,7 +92,7 @@ class StateMonitor(object):
 
     # checks task transitions before executing it
     def check_transition(self, task):
-        with self._lock:
+        with self._state_lock:
             passed = True
             if self._state == RobotStates.SAFETY_ACTIVE:
                 if not isinstance(task, LandTask):
@@ -119,7 +123,10 @@ class StateMonitor(object):
     # public function to receive last task's ending state
     # and transitions the state of the robot
     def set_last_task_end_state(self, state):
-        with self._lock:
+        with self._data_lock:
+            below_min_maneuver_height = self._BELOW_MIN_MAN_HEIGHT
+
+        with self._state_lock:
             self._last_task_end_state = state
 
             if self._state == RobotStates.SAFETY_ACTIVE:
@@ -144,7 +151,7 @@ class StateMonitor(object):
                 # Hit roomba if canceled might not have taken the drone back up
                 elif (isinstance(self._last_task, TakeoffTask)
                      or isinstance(self._last_task, HitRoombaTask)):
-                    if not self._BELOW_MIN_MAN_HEIGHT:
+                    if not below_min_maneuver_height:
                         self._state = RobotStates.NORMAL
                     else:
                         rospy.logerr('Takeoff did not finish when it was canceled')
@@ -183,7 +190,7 @@ class StateMonitor(object):
 
     # fills out the rest of Intermediary State for the task
     def fill_out_transition(self, state):
-        with self._lock:
+        with self._data_lock:
             state.drone_odometry = self._drone_odometry
             state.roombas = self._roombas
             state.obstacles = self._obstacles
@@ -198,7 +205,7 @@ class StateMonitor(object):
 
 
     def signal_safety_active(self):
-        with self._lock:
+        with self._state_lock:
             self._state = RobotStates.SAFETY_ACTIVE
 
     def wait_until_ready(self, startup_timeout):
@@ -235,19 +242,19 @@ class StateMonitor(object):
             all roombas in sight of drone
     """
     def _receive_drone_odometry(self, data):
-        with self._lock:
+        with self._data_lock:
             self._drone_odometry = data
             self._BELOW_MIN_MAN_HEIGHT = (data.pose.pose.position.z
                             < self._MIN_MANEUVER_HEIGHT)
 
     def _receive_roomba_status(self, data):
-        with self._lock:
+        with self._data_lock:
             self._roombas = data
 
     def _receive_obstacle_status(self, data):
-        with self._lock:
+        with self._data_lock:
             self._obstacles = data
 
     def _receive_arm_status(self, data):
-        with self._lock:
+        with self._data_lock:
             self._arm_status = data
@@ -21,6 +21,8 @@ from iarc7_msgs.msg import TwistStampedArray, OrientationThrottleStamped
 from iarc7_motion.msg import GroundInteractionGoal, GroundInteractionAction
 
 from iarc7_motion.linear_motion_profile_generator import LinearMotionProfileGenerator
+from iarc7_motion.motion_point_serializer import MotionPointArraySerializer
+from iarc7_motion.motion_profile import np_to_msg
 
 class TaskCommandHandler(object):
 
@@ -32,6 +34,8 @@ class TaskCommandHandler(object):
         self._task_state = None
         self._transition = None
         self._last_twist = None
+        self._last_local_plan_time = None
+        self._goal_time = None
 
         self._ground_interaction_task_callback = None
 
@@ -67,9 +71,32 @@ class TaskCommandHandler(object):
 
         self._motion_profile_generator = LinearMotionProfileGenerator.get_linear_motion_profile_generator()
 
+        try:
+            # use the packed serializer for motion point targets
+            fast_serializer = rospy.get_param('~fast_motion_point_serializer')
+            # max rate and point stride for the local_plan visualization
+            self._local_plan_period = rospy.Duration(
+                1.0 / rospy.get_param('~local_plan_publish_rate'))
+            self._local_plan_stride = rospy.get_param('~local_plan_point_stride')
+        except KeyError as e:
+            rospy.logerr('Could not lookup a parameter for task command handler')
+            raise
+
+        self._motion_point_serializer = None
+        if fast_serializer:
+            try:
+                self._motion_point_serializer = MotionPointArraySerializer()
+            except ValueError as e:
+                rospy.logerr('Could not use the fast motion point serializer, '
+                             'falling back to the generated serializer')
+                rospy.logerr(str(e))
+
     # takes in new task from HLM Controller
     # transition is of type TransitionData
-    def new_task(self, task, transition):
+    # goal_time is when the goal for the task was received, it is used to
+    # log the latency until the first motion point is sent
+    def new_task(self, task, transition, goal_time=None):
+        self._goal_time = goal_time
         self._task = task
         self._transition = transition
         self._task_state = task_states.TaskRunning()
@@ -144,8 +171,9 @@ class TaskCommandHandler(object):
         return self._task_state
 
     # main function
-    def run(self):
-        task_commands = self._get_task_command()
+    # world_state is the WorldState snapshot for this tick
+    def run(self, world_state):
+        task_commands = self._get_task_command(world_state)
         for task_command in task_commands:
             try:
                 self._command_implementations[type(task_command)](task_command)
@@ -158,10 +186,10 @@ class TaskCommandHandler(object):
         self._last_task_commands = task_commands
 
     # gets desired command from running task
-    def _get_task_command(self):
+    def _get_task_command(self, world_state):
         if self._task is not None:
             try:
-                task_request = self._task.get_desired_command()
+                task_request = self._task.get_desired_command(world_state)
             except Exception as e:
                 rospy.logerr('Exception getting task command')
                 rospy.logerr(str(e))
@@ -229,8 +257,8 @@ class TaskCommandHandler(object):
         pass
 
     def _handle_velocity_command(self, velocity_command):
-        plan, pose_only_plan = self._motion_profile_generator.get_velocity_plan(velocity_command)
-        self._publish_motion_profile(plan, pose_only_plan)
+        plan = self._motion_profile_generator.get_velocity_plan(velocity_command)
+        self._publish_motion_profile(plan)
 
     def _handle_reset_linear_profile_command(self, reset_command):
         self._motion_profile_generator.set_start_point(reset_command)
@@ -307,16 +335,51 @@ class TaskCommandHandler(object):
             rospy.logerr('Ground interaction done callback received with no task callback available')
 
     """
-    Sends motion point stamped array to LLM
+    Sends motion profile to LLM as a motion point stamped array
 
     Args:
-        motion_point_stamped_array: MotionPointStampedArray
+        plan: MotionProfile
     """
-    def _publish_motion_profile(self, motion_point_stamped_array, path):
-        self._last_twist = motion_point_stamped_array.motion_points[-1].motion_point.twist
-        self._local_plan_pub.publish(path)
+    def _publish_motion_profile(self, plan):
+        times, positions, velocities, accelerations = \
+            self._motion_profile_generator.sample_plan(plan)
+
+        self._last_twist = Twist()
+        np_to_msg(velocities[-1], self._last_twist.linear)
+
+        self._publish_local_plan(times, positions)
+
+        if self._motion_point_serializer is not None:
+            motion_point_stamped_array = self._motion_point_serializer.to_message(
+                times, positions, velocities, accelerations)
+        else:
+            motion_point_stamped_array = self._motion_profile_generator.get_plan_message(
+                times, positions, velocities, accelerations)
         self._motion_point_pub.publish(motion_point_stamped_array)
 
+        if self._goal_time is not None:
+            rospy.loginfo('Goal to first motion point latency: %f ms',
+                          (rospy.Time.now() - self._goal_time).to_sec() * 1000.0)
+            self._goal_time = None
+
+    # Publishes a decimated Path of the plan for visualization
+    #
+    # The Path is only built when something is subscribed to local_plan
+    def _publish_local_plan(self, times, positions):
+        if self._local_plan_pub.get_num_connections() == 0:
+            return
+
+        now = rospy.Time.now()
+        if (self._last_local_plan_time is not None
+            and now - self._last_local_plan_time < self._local_plan_period):
+            return
+        self._last_local_plan_time = now
+
+        stride = self._local_plan_stride
+        self._local_plan_pub.publish(
+            self._motion_profile_generator.get_path_message(
+                times[::stride], positions[::stride]))
+
     # public wrapper for HLM Controller to send timeouts
     def send_timeout(self, twist, acceleration=1.0):
         self._handle_velocity_command(task_commands.VelocityCommand(twist, acceleration=acceleration))
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+import gc
+import os
+import sys
+import unittest
+import rospkg
+import rospy
+import rostest
+
+from iarc7_motion.msg import QuadMoveGoal
+from iarc7_motion.odometry_hub import OdometryHub
+
+# Tasks import their siblings the way motion_command_coordinator.py does,
+# from the directory it is run from
+sys.path.insert(0, os.path.join(rospkg.RosPack().get_path('iarc7_motion'),
+                                'src',
+                                'iarc7_motion'))
+
+from iarc_tasks.xyztranslation_task import XYZTranslationTask
+from iarc_tasks.go_to_roomba_task import GoToRoombaTask
+from iarc_tasks.task_utilities.translate_stop_planner import TranslateStopPlanner
+
+_ITERATIONS = 500
+
+def count_objects(types):
+    return len([o for o in gc.get_objects() if isinstance(o, types)])
+
+def get_odometry_callback_count():
+    subscriber = rospy.impl.registration.get_topic_manager().get_subscriber_impl(
+        '/odometry/filtered')
+    if subscriber is None:
+        return 0
+    return len(subscriber.callbacks)
+
+# Builds and shuts down the tasks that own a planner with an odometry hub
+# listener, needs the coordinator and task params loaded by
+# odometry_hub_leak.test
+class OdometryHubLeakTest(unittest.TestCase):
+    def setUp(self):
+        self.hub = OdometryHub.get_odometry_hub()
+        self.task_types = (XYZTranslationTask,
+                           GoToRoombaTask,
+                           TranslateStopPlanner)
+
+        # Warm up so the shared topic buffer is not counted as a leak
+        self.build_tasks(10)
+
+    def build_tasks(self, count):
+        for i in range(count):
+            tasks = [XYZTranslationTask(QuadMoveGoal(movement_type='xyztranslate',
+                                                     x_position=float(i),
+                                                     z_position=1.0)),
+                     GoToRoombaTask(QuadMoveGoal(movement_type='go_to_roomba',
+                                                 frame_id='roomba{}'.format(i)))]
+            for task in tasks:
+                task.shutdown()
+        gc.collect()
+
+    def test_shutdown_removes_listeners(self):
+        listeners = self.hub.get_listener_count()
+        self.build_tasks(_ITERATIONS)
+        self.assertEqual(self.hub.get_listener_count(), listeners)
+
+    # Every listener shares the hub's one subscriber callback
+    def test_single_odometry_subscriber(self):
+        self.build_tasks(_ITERATIONS)
+        self.assertEqual(get_odometry_callback_count(), 1)
+
+    def test_shutdown_releases_tasks(self):
+        objects = count_objects(self.task_types)
+        self.build_tasks(_ITERATIONS)
+        self.assertEqual(count_objects(self.task_types), objects)
+
+if __name__ == '__main__':
+    rospy.init_node('odometry_hub_leak')
+    rostest.rosrun('iarc7_motion', 'odometry_hub_leak', OdometryHubLeakTest)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+import unittest
+import numpy as np
+
+from io import BytesIO
+
+from iarc7_msgs.msg import MotionPointStamped, MotionPointStampedArray
+
+from iarc7_motion.linear_motion_profile_generator import split_stamps
+from iarc7_motion.motion_point_serializer import MotionPointArraySerializer
+
+# Serialize a plan with the generated genpy serializer
+def genpy_serialize(times, positions, velocities, accelerations):
+    message = MotionPointStampedArray()
+    secs, nsecs = split_stamps(times)
+    for i in range(0, times.shape[0]):
+        motion_point = MotionPointStamped()
+        motion_point.header.stamp.secs = secs[i]
+        motion_point.header.stamp.nsecs = nsecs[i]
+        for j, field in enumerate(('x', 'y', 'z')):
+            setattr(motion_point.motion_point.pose.position,
+                    field, positions[i, j])
+            setattr(motion_point.motion_point.twist.linear,
+                    field, velocities[i, j])
+            setattr(motion_point.motion_point.accel.linear,
+                    field, accelerations[i, j])
+        message.motion_points.append(motion_point)
+
+    buff = BytesIO()
+    message.serialize(buff)
+    return buff.getvalue()
+
+class MotionPointSerializerTest(unittest.TestCase):
+    def setUp(self):
+        self.serializer = MotionPointArraySerializer()
+        self.random = np.random.RandomState(7)
+
+    def random_plan(self, size):
+        start = self.random.uniform(0.0, 2e9)
+        times = start + np.sort(self.random.uniform(0.0, 10.0, size))
+        values = self.random.randn(3, size, 3) * 100.0
+        return (times,) + tuple(values)
+
+    def assert_matches_genpy(self, plan):
+        self.assertEqual(genpy_serialize(*plan), self.serializer.serialize(*plan))
+
+    def test_empty_plan(self):
+        self.assert_matches_genpy(self.random_plan(0))
+
+    def test_single_point_plan(self):
+        for _ in range(0, 20):
+            self.assert_matches_genpy(self.random_plan(1))
+
+    def test_random_plans(self):
+        for size in self.random.randint(2, 300, 50):
+            self.assert_matches_genpy(self.random_plan(size))
+
+    # The record buffer is reused between plans of the same size
+    def test_reused_buffer(self):
+        first = self.random_plan(25)
+        self.serializer.serialize(*self.random_plan(25))
+        self.assert_matches_genpy(first)
+        self.assert_matches_genpy(self.random_plan(3))
+
+    # Values with special float bit patterns pass through untouched
+    def test_special_values(self):
+        times, positions, velocities, accelerations = self.random_plan(4)
+        positions[0] = (np.inf, -np.inf, -0.0)
+        velocities[1] = (np.finfo(np.float64).max, np.finfo(np.float64).tiny, 0.0)
+        self.assert_matches_genpy((times, positions, velocities, accelerations))
+
+    def test_to_message(self):
+        plan = self.random_plan(10)
+        buff = BytesIO()
+        self.serializer.to_message(*plan).serialize(buff)
+        self.assertEqual(genpy_serialize(*plan), buff.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()
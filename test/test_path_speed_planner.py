@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+import unittest
+import numpy as np
+
+from iarc7_motion.iarc_tasks.task_utilities.path_speed_planner import plan_path_speeds
+
+_MAX_SPEED = 1.0
+_MAX_Z_SPEED = 0.5
+_ACCELERATION = 1.0
+_CORNER_TOLERANCE = 0.1
+
+def plan(points, start_speed=0.0):
+    return plan_path_speeds(points,
+                            start_speed,
+                            _MAX_SPEED,
+                            _MAX_Z_SPEED,
+                            _ACCELERATION,
+                            _CORNER_TOLERANCE)
+
+# Half of the angle the path turns through at each corner
+def get_half_turns(points):
+    segments = np.diff(points, axis=0)
+    directions = segments / np.linalg.norm(segments, axis=1)[:, np.newaxis]
+    cos_turns = np.clip(np.sum(directions[:-1] * directions[1:], axis=1),
+                        -1.0,
+                        1.0)
+    return np.arccos(cos_turns) / 2.0
+
+class PathSpeedPlannerTest(unittest.TestCase):
+    def setUp(self):
+        self.random = np.random.RandomState(3)
+
+    # Every arc fits on the segments next to it and stays within the corner
+    # tolerance, and the speed at each corner is one the drone can hold
+    # around the arc
+    def assert_blends_within_tolerance(self, points, blend_distances, speeds):
+        points = np.asarray(points, dtype=np.float64)
+        lengths = np.linalg.norm(np.diff(points, axis=0), axis=1)
+        self.assertEqual(blend_distances[0], 0.0)
+        self.assertEqual(blend_distances[-1], 0.0)
+        self.assertTrue(np.all(blend_distances[:-1] + blend_distances[1:]
+                               <= lengths * (1.0 + 1e-9)))
+
+        for half_turn, blend, speed in zip(get_half_turns(points),
+                                           blend_distances[1:-1],
+                                           speeds[1:-1]):
+            if half_turn <= 1e-6:
+                self.assertEqual(blend, 0.0)
+                continue
+            radius = blend / np.tan(half_turn)
+            miss = radius * (1.0 / np.cos(half_turn) - 1.0)
+            self.assertLessEqual(miss, _CORNER_TOLERANCE * (1.0 + 1e-9))
+            self.assertLessEqual(speed**2,
+                                 _ACCELERATION * radius * (1.0 + 1e-9))
+
+    # Every speed change happens on the straight part of a segment between
+    # the arcs at no more than the acceleration
+    def assert_achievable(self, points, blend_distances, speeds):
+        lengths = np.linalg.norm(np.diff(points, axis=0), axis=1)
+        straight_lengths = lengths - blend_distances[:-1] - blend_distances[1:]
+        self.assertTrue(np.all(
+            np.abs(np.diff(speeds**2))
+            <= 2.0 * _ACCELERATION * np.maximum(straight_lengths, 0.0) + 1e-9))
+
+    def assert_valid_plan(self, points, start_speed):
+        blend_distances, speeds, segment_speeds = plan(points, start_speed)
+        self.assertEqual(len(blend_distances), len(points))
+        self.assertEqual(len(speeds), len(points))
+        self.assertEqual(len(segment_speeds), len(points) - 1)
+        self.assertLessEqual(speeds[0], start_speed)
+        self.assertEqual(speeds[-1], 0.0)
+        self.assertTrue(np.all(speeds[:-1] <= segment_speeds))
+        self.assertTrue(np.all(speeds[1:] <= segment_speeds))
+        self.assert_blends_within_tolerance(points, blend_distances, speeds)
+        self.assert_achievable(points, blend_distances, speeds)
+        return blend_distances, speeds, segment_speeds
+
+    def test_straight_path(self):
+        points = np.array(((0.0, 0.0, 1.0), (2.0, 0.0, 1.0), (4.0, 0.0, 1.0)))
+        blend_distances, speeds, segment_speeds = self.assert_valid_plan(
+            points, 0.5)
+        np.testing.assert_array_equal(blend_distances, np.zeros(3))
+        np.testing.assert_allclose(speeds, (0.5, _MAX_SPEED, 0.0))
+        np.testing.assert_allclose(segment_speeds, (_MAX_SPEED, _MAX_SPEED))
+
+    # A segment too short to stop on brings the speed down before it
+    def test_stop_on_short_segment(self):
+        points = np.array(((0.0, 0.0, 1.0), (2.0, 0.0, 1.0), (2.1, 0.0, 1.0)))
+        _, speeds, _ = self.assert_valid_plan(points, _MAX_SPEED)
+        self.assertAlmostEqual(speeds[1], np.sqrt(2.0 * _ACCELERATION * 0.1))
+
+    def test_right_angle_corner(self):
+        points = np.array(((0.0, 0.0, 1.0), (3.0, 0.0, 1.0), (3.0, 3.0, 1.0)))
+        blend_distances, speeds, _ = self.assert_valid_plan(points, 0.0)
+
+        # The long segments leave the tolerance as the only limit on the arc
+        radius = _CORNER_TOLERANCE / (np.sqrt(2.0) - 1.0)
+        self.assertAlmostEqual(blend_distances[1], radius)
+        self.assertAlmostEqual(speeds[1], np.sqrt(_ACCELERATION * radius))
+
+    # Zig zags with segments shorter than the arcs the tolerance allows,
+    # so every arc is cut down to half of the segments next to it and the
+    # arcs meet with no straight part to change speed on
+    def test_overlapping_blends(self):
+        points = np.array([(0.1 * i, 0.1 * (i % 2), 1.0) for i in range(8)])
+        blend_distances, speeds, _ = self.assert_valid_plan(points, 0.0)
+
+        lengths = np.linalg.norm(np.diff(points, axis=0), axis=1)
+        np.testing.assert_allclose(blend_distances[1:-1],
+                                   np.minimum(lengths[:-1], lengths[1:]) / 2.0)
+        np.testing.assert_allclose(speeds[1:-1], speeds[1])
+
+    # A climb too steep for the vertical speed limit slows the segment down
+    def test_climbing_segment(self):
+        points = np.array(((0.0, 0.0, 1.0), (1.0, 0.0, 3.0), (3.0, 0.0, 3.0)))
+        _, speeds, segment_speeds = self.assert_valid_plan(points, _MAX_SPEED)
+        self.assertAlmostEqual(segment_speeds[0],
+                               _MAX_Z_SPEED * np.sqrt(5.0) / 2.0)
+        self.assertAlmostEqual(segment_speeds[1], _MAX_SPEED)
+        self.assertLessEqual(speeds[0], segment_speeds[0])
+
+    def test_random_paths(self):
+        for _ in range(0, 200):
+            count = self.random.randint(2, 10)
+            points = self.random.uniform(-3.0, 3.0, (count, 3))
+            if self.random.randint(2):
+                # Short segments so the arcs overlap
+                points = np.cumsum(
+                    self.random.uniform(-0.2, 0.2, (count, 3)), axis=0)
+            self.assert_valid_plan(points,
+                                   self.random.uniform(0.0, _MAX_SPEED))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+import unittest
+import numpy as np
+
+from iarc7_motion.iarc_tasks.task_utilities.potential_field import apply_potential_field
+
+_AVOID_DISTANCE = 1.5
+_PREDICT_TIME = 0.5
+_RESPONSE_STRENGTH = 2.0
+_SIDE_STRENGTH = 0.5
+
+# The per obstacle loop that the obstacle avoiders used before the field was
+# vectorized
+def reference_potential_field(obstacles, curr_vel, desired_vector):
+    curr_vel = np.array(curr_vel)
+    desired_vector = np.array(desired_vector)
+    for obstacle in obstacles:
+        unit_vector = obstacle / np.linalg.norm(obstacle)
+        away_unit_vector = -unit_vector
+
+        turn_dir = np.array([0, 0, np.cross(obstacle, curr_vel)])
+        if np.linalg.norm(turn_dir) < 1e-6:
+            turn_dir = np.array([0, 0, 1])
+
+        side_vector = np.cross(turn_dir, obstacle)
+        unit_side = side_vector / np.linalg.norm(side_vector)
+
+        rel_vel = np.dot(unit_vector, curr_vel)
+        violation = max(0,
+                        _AVOID_DISTANCE
+                      - np.linalg.norm(obstacle)
+                      + rel_vel * _PREDICT_TIME)
+
+        # Push away
+        desired_vector[:2] += away_unit_vector \
+                * _RESPONSE_STRENGTH * violation**2
+
+        # Push around
+        desired_vector += unit_side * violation * _SIDE_STRENGTH
+    return desired_vector
+
+def potential_field(obstacles, curr_vel, desired_vector):
+    return apply_potential_field(obstacles,
+                                 curr_vel,
+                                 desired_vector,
+                                 _AVOID_DISTANCE,
+                                 _PREDICT_TIME,
+                                 _RESPONSE_STRENGTH,
+                                 _SIDE_STRENGTH)
+
+class PotentialFieldTest(unittest.TestCase):
+    def setUp(self):
+        self.random = np.random.RandomState(0)
+
+    # The loop takes its norms with a BLAS dot product, which can round
+    # differently than the plain sqrt used by the vectorized field
+    def assert_matches_reference(self, obstacles, curr_vel, desired_vector):
+        np.testing.assert_allclose(
+            potential_field(obstacles, curr_vel, desired_vector),
+            reference_potential_field(obstacles, curr_vel, desired_vector),
+            rtol=1e-12,
+            atol=1e-12)
+
+    def test_random_obstacles(self):
+        for count in [1, 4, 40, 400]:
+            for _ in range(0, 50):
+                obstacles = self.random.uniform(-3.0, 3.0, (count, 2))
+                curr_vel = self.random.uniform(-2.0, 2.0, 2)
+                desired_vector = self.random.uniform(-1.0, 1.0, 3)
+                self.assert_matches_reference(obstacles,
+                                              curr_vel,
+                                              desired_vector)
+
+    # With no turn direction from the velocity the field turns left
+    def test_obstacle_along_velocity(self):
+        for _ in range(0, 50):
+            obstacles = self.random.uniform(-3.0, 3.0, (10, 2))
+            obstacles[0] = (1.0, 0.0)
+            curr_vel = (self.random.uniform(-2.0, 2.0), 0.0)
+            desired_vector = self.random.uniform(-1.0, 1.0, 3)
+            self.assert_matches_reference(obstacles,
+                                          curr_vel,
+                                          desired_vector)
+
+    def test_no_obstacles(self):
+        desired_vector = np.array((0.5, -0.25, 1.0))
+        np.testing.assert_array_equal(
+            potential_field(np.zeros((0, 2)), (1.0, 0.0), desired_vector),
+            desired_vector)
+
+    def test_distant_obstacles(self):
+        obstacles = np.array(((10.0, 0.0), (0.0, -10.0), (-7.0, 7.0)))
+        desired_vector = np.array((0.5, -0.25, 1.0))
+        np.testing.assert_array_equal(
+            potential_field(obstacles, (1.0, 0.0), desired_vector),
+            desired_vector)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+import unittest
+import numpy as np
+import rospy
+
+from iarc7_motion.iarc_tasks.task_utilities.synchronized_profile import SynchronizedProfile
+
+_START_TIME = rospy.Time(100.0)
+_MAX_SPEED = 1.0
+_ACCELERATION = 1.5
+_TIME_STEP = 0.01
+
+# Positions and velocities of a profile sampled every _TIME_STEP seconds
+# from the start to the end
+def sample_profile(profile):
+    times = np.arange(0.0, profile.duration + _TIME_STEP / 2.0, _TIME_STEP)
+    times[-1] = profile.duration
+    samples = [profile.sample(_START_TIME + rospy.Duration(t)) for t in times]
+    return (times,
+            np.array([positions for positions, _ in samples]),
+            np.array([velocities for _, velocities in samples]))
+
+class SynchronizedProfileTest(unittest.TestCase):
+    def setUp(self):
+        self.random = np.random.RandomState(11)
+
+    def random_profile(self, max_start_speed):
+        start = self.random.uniform(-3.0, 3.0, 3)
+        target = self.random.uniform(-3.0, 3.0, 3)
+        velocity = self.random.uniform(-1.0, 1.0, 3)
+        velocity *= (self.random.uniform(0.0, max_start_speed)
+                     / np.linalg.norm(velocity))
+        profile = SynchronizedProfile(_START_TIME,
+                                      start,
+                                      velocity,
+                                      target,
+                                      _MAX_SPEED,
+                                      _ACCELERATION)
+        return profile, start, velocity, target
+
+    def assert_within_acceleration_limit(self, profile):
+        times, _, velocities = sample_profile(profile)
+        # Finite differences average the acceleration over each step, so
+        # they can not be over the limit unless the profile is
+        accelerations = (np.diff(velocities, axis=0)
+                         / np.diff(times)[:, np.newaxis])
+        self.assertLessEqual(np.max(np.linalg.norm(accelerations, axis=1)),
+                             _ACCELERATION * (1.0 + 1e-6))
+
+    def assert_within_speed_limit(self, profile):
+        _, _, velocities = sample_profile(profile)
+        self.assertLessEqual(np.max(np.linalg.norm(velocities, axis=1)),
+                             _MAX_SPEED * (1.0 + 1e-6))
+
+    def assert_starts_and_stops(self, profile, start, velocity, target):
+        _, positions, velocities = sample_profile(profile)
+        np.testing.assert_allclose(positions[0], start, atol=1e-9)
+        np.testing.assert_allclose(velocities[0], velocity, atol=1e-9)
+        np.testing.assert_allclose(positions[-1], target, atol=1e-9)
+        np.testing.assert_allclose(velocities[-1], np.zeros(3), atol=1e-9)
+
+        # Just before the end every axis is still on its way to the target
+        positions, _ = profile.sample(
+            _START_TIME + rospy.Duration(profile.duration - 1e-6))
+        np.testing.assert_allclose(positions, target, atol=1e-5)
+
+    def test_rest_to_rest(self):
+        for _ in range(0, 30):
+            profile, start, velocity, target = self.random_profile(0.0)
+            self.assert_starts_and_stops(profile, start, velocity, target)
+            self.assert_within_acceleration_limit(profile)
+            self.assert_within_speed_limit(profile)
+
+    def test_moving_start(self):
+        for _ in range(0, 60):
+            profile, start, velocity, target = self.random_profile(1.0)
+            self.assert_starts_and_stops(profile, start, velocity, target)
+            self.assert_within_acceleration_limit(profile)
+            self.assert_within_speed_limit(profile)
+
+    def test_fast_moving_start(self):
+        for _ in range(0, 60):
+            profile, start, velocity, target = self.random_profile(2.0)
+            self.assert_starts_and_stops(profile, start, velocity, target)
+            self.assert_within_acceleration_limit(profile)
+
+    # A moving axis is scaled under its starting speed and is still slowing
+    # down when the other axes reach their speed limits
+    def test_moving_start_speed_limit(self):
+        profile = SynchronizedProfile(_START_TIME,
+                                      (-2.7, -2.0, 0.6),
+                                      (0.7, -0.4, -0.5),
+                                      (0.6, -1.8, 1.1),
+                                      _MAX_SPEED,
+                                      _ACCELERATION)
+        self.assert_starts_and_stops(profile,
+                                     (-2.7, -2.0, 0.6),
+                                     (0.7, -0.4, -0.5),
+                                     (0.6, -1.8, 1.1))
+        self.assert_within_acceleration_limit(profile)
+        self.assert_within_speed_limit(profile)
+
+    def test_start_on_target(self):
+        profile = SynchronizedProfile(_START_TIME,
+                                      (1.0, 2.0, 3.0),
+                                      (0.0, 0.0, 0.0),
+                                      (1.0, 2.0, 3.0),
+                                      _MAX_SPEED,
+                                      _ACCELERATION)
+        self.assertEqual(profile.duration, 0.0)
+        positions, velocities = profile.sample(_START_TIME)
+        np.testing.assert_allclose(positions, (1.0, 2.0, 3.0))
+        np.testing.assert_allclose(velocities, np.zeros(3))
+
+    # Moving through the target the profile has to stop past it and come
+    # back
+    def test_overshoot(self):
+        profile = SynchronizedProfile(_START_TIME,
+                                      (0.0, 0.0, 0.0),
+                                      (1.0, 0.5, 0.0),
+                                      (0.1, 0.0, 0.0),
+                                      _MAX_SPEED,
+                                      _ACCELERATION)
+        self.assert_starts_and_stops(profile,
+                                     (0.0, 0.0, 0.0),
+                                     (1.0, 0.5, 0.0),
+                                     (0.1, 0.0, 0.0))
+        self.assert_within_acceleration_limit(profile)
+
+if __name__ == '__main__':
+    unittest.main()